@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile
 from pydantic import BaseModel, EmailStr, Field
 
 from ..core.auth import AuthContext, get_current_user
-from ..services import supabase_client
+from ..services import recipient_cache, supabase_client
 from ..services.credit_grants import list_credit_grants
 from ..core.settings import get_settings
 from ..services.supabase_client import get_storage
@@ -186,6 +186,7 @@ def update_profile(payload: ProfileUpdateRequest, user: AuthContext = Depends(ge
     updated = supabase_client.upsert_profile(
         user.user_id, email=payload.email, display_name=payload.display_name, avatar_url=payload.avatar_url
     )
+    recipient_cache.invalidate_recipient_email(user.user_id)
     logger.info("account.profile.updated", extra={"user_id": user.user_id})
     return updated
 
@@ -220,6 +221,7 @@ async def upload_avatar(
 
     avatar_url = public_url.get("publicUrl") if isinstance(public_url, dict) else public_url
     updated = supabase_client.upsert_profile(user.user_id, email=None, display_name=None, avatar_url=avatar_url)
+    recipient_cache.invalidate_recipient_email(user.user_id)
     logger.info("account.avatar.updated", extra={"user_id": user.user_id, "avatar_url": avatar_url})
     return updated
 
@@ -1,11 +1,16 @@
 import json
 import logging
+import os
 import time
 import uuid
+from pathlib import Path
 from typing import Dict, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 from ..clients.external import (
     BatchFileUploadResponse,
@@ -19,9 +24,20 @@ from ..clients.external import (
     VerifyEmailResponse,
 )
 from ..core.auth import AuthContext, get_current_user
+from ..core.http_cache import CONDITIONAL_CACHE_CONTROL, conditional_json_response, if_none_match_satisfied
 from ..core.settings import get_settings
-from ..services.file_processing import _column_letters_to_index
-from ..services.upload_notifications import process_bulk_upload_webhook
+from ..services import storage, task_results_store, upload_dedup, webhook_inbox
+from ..services.domain_clustering import cluster_emails
+from ..services.email_syntax import INVALID_SYNTAX_STATUS, is_plausible_email, partition_emails
+from ..services.enriched_downloads import OUTPUT_MEDIA_TYPES, build_enriched_download
+from ..services.file_processing import FileProcessingError, _column_letters_to_index
+from ..services.file_processing_pool import (
+    FileJobFailedError,
+    FileJobTimeoutError,
+    ParsedEmailsFile,
+    parse_upload_file,
+)
+from ..services.upload_notifications import process_bulk_upload_webhook, verify_bulk_upload_signature
 
 router = APIRouter(prefix="/api", tags=["tasks"])
 logger = logging.getLogger(__name__)
@@ -34,6 +50,22 @@ class UploadFileMetadata(BaseModel):
     remove_duplicates: bool = True
 
 
+class RejectedEmail(BaseModel):
+    email: str
+    status: str = INVALID_SYNTAX_STATUS
+
+
+class ManualTaskResponse(TaskResponse):
+    rejected_emails: list[RejectedEmail] = []
+
+
+class UploadTaskResponse(BatchFileUploadResponse):
+    # rejected_emails is a bounded sample; rejected_count covers the whole file.
+    rejected_count: int = 0
+    rejected_emails: list[RejectedEmail] = []
+    skipped_disposable_count: int = 0
+
+
 class LatestUploadResponse(BaseModel):
     task_id: str
     file_name: str
@@ -217,6 +249,102 @@ def normalize_email_column_mapping(email_column: str) -> tuple[str, int]:
     return str(index + 1), index
 
 
+def _keep_original_upload(*, user_id: str, task_id: str, item: dict) -> None:
+    try:
+        storage.persist_original_upload(
+            user_id=user_id,
+            task_id=task_id,
+            file_name=item["file"].filename or "upload",
+            source_path=item["persisted"].path,
+            email_column_index=item["email_column_index"],
+            first_row_has_labels=item["metadata"].first_row_has_labels,
+            skip_disposable=get_settings().email_skip_disposable,
+        )
+    except OSError as exc:
+        # The upstream task already exists; losing the local copy only disables enriched downloads.
+        logger.error(
+            "route.tasks.upload.original_save_failed",
+            extra={"user_id": user_id, "task_id": task_id, "error": str(exc)},
+        )
+
+
+def _save_submission_order(*, user_id: str, task_id: str, emails: list) -> None:
+    try:
+        storage.persist_submission_order(user_id, task_id, [str(email).strip().lower() for email in emails])
+    except OSError as exc:
+        # The task exists upstream; without the mapping its jobs are listed in submission order.
+        logger.error(
+            "route.tasks.submission_order_save_failed",
+            extra={"user_id": user_id, "task_id": task_id, "error": str(exc)},
+        )
+
+
+def _upload_parse_options(item: dict, run_length: int) -> dict:
+    """Every option that changes which emails are read from an upload and how they are sent upstream."""
+    settings = get_settings()
+    return {
+        "first_row_has_labels": item["metadata"].first_row_has_labels,
+        "syntax_filter": settings.email_syntax_prefilter,
+        "canonical_dedup": settings.email_canonical_dedup,
+        "skip_disposable": settings.email_skip_disposable,
+        "run_length": run_length,
+    }
+
+
+async def _parse_upload(*, user_id: str, item: dict, parse_options: dict) -> ParsedEmailsFile:
+    """
+    Parse a staged upload in the file-processing pool and write the CSV that is sent upstream.
+
+    Only the parsed emails are forwarded, in domain-clustered order when ``run_length`` is set.
+    """
+    source = item["persisted"].path
+    metadata = item["metadata"]
+    item["emails_path"] = source.with_name(f"{source.name}.emails.jsonl")
+    item["upstream_path"] = source.with_name(f"{source.name}.upstream.csv")
+    try:
+        parsed = await parse_upload_file(
+            source,
+            filename=item["file"].filename or "upload",
+            email_column=metadata.email_column,
+            # Always deduplicated: enriched output joins results back onto every original row anyway.
+            remove_duplicates=True,
+            max_emails=None,
+            emails_path=item["emails_path"],
+            upstream_path=item["upstream_path"],
+            **parse_options,
+        )
+    except FileProcessingError as exc:
+        logger.warning(
+            "route.tasks.upload.parse_failed",
+            extra={"user_id": user_id, "file_name": item["file"].filename, "error": str(exc), "details": exc.details},
+        )
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except FileJobTimeoutError as exc:
+        logger.warning("route.tasks.upload.parse_timeout", extra={"user_id": user_id, "file_name": item["file"].filename})
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Reading the file took too long") from exc
+    except FileJobFailedError as exc:
+        logger.error(
+            "route.tasks.upload.parse_job_failed",
+            extra={"user_id": user_id, "file_name": item["file"].filename, "error": str(exc)},
+        )
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to read the file") from exc
+    logger.info(
+        "route.tasks.upload.parsed",
+        extra={
+            "user_id": user_id,
+            "file_name": item["file"].filename,
+            "email_count": parsed.email_count,
+            "rejected_count": parsed.rejected_count,
+            "disposable_count": parsed.disposable_count,
+            "role_based_count": parsed.role_based_count,
+            "skipped_disposable_count": parsed.skipped_disposable_count,
+            "engine": parsed.engine,
+            "run_length": parse_options["run_length"],
+        },
+    )
+    return parsed
+
+
 @router.post("/tasks/webhooks/bulk-upload", name="bulk_upload_tasks_webhook")
 async def bulk_upload_tasks_webhook(request: Request):
     raw_body = await request.body()
@@ -226,6 +354,16 @@ async def bulk_upload_tasks_webhook(request: Request):
         logger.warning("route.tasks.bulk_upload_webhook.invalid_json", extra={"error": str(exc)})
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook payload") from exc
 
+    if webhook_inbox.is_enabled():
+        verify_bulk_upload_signature(raw_body, request.headers)
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook payload")
+        event_id, created = await webhook_inbox.enqueue_event(payload, raw_body)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"received": True, "queued": created, "event_id": event_id},
+        )
+
     result = await process_bulk_upload_webhook(payload=payload, raw_body=raw_body, headers=request.headers)
     return result
 
@@ -243,6 +381,9 @@ async def verify_email(
     if batch_id is not None and (not isinstance(batch_id, str) or not batch_id.strip()):
         logger.warning("route.verify.invalid_batch_id", extra={"user_id": user.user_id, "batch_id": batch_id})
         batch_id = None
+    if get_settings().email_syntax_prefilter and not is_plausible_email(str(email).strip()):
+        logger.info("route.verify.syntax_rejected", extra={"user_id": user.user_id, "email": email})
+        return VerifyEmailResponse(email=str(email), status=INVALID_SYNTAX_STATUS, message="Rejected by local syntax check")
     try:
         result = await client.verify_email(email=email)
         logger.info("route.verify", extra={"user_id": user.user_id, "email": email})
@@ -271,7 +412,7 @@ async def verify_email(
         raise HTTPException(status_code=exc.status_code, detail=exc.details or exc.args[0])
 
 
-@router.post("/tasks", response_model=TaskResponse)
+@router.post("/tasks", response_model=ManualTaskResponse)
 async def create_task(
     payload: dict,
     user_id: Optional[str] = None,
@@ -307,17 +448,42 @@ async def create_task(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="user_id is not supported for manual task creation.",
         )
+    submitted_emails = emails
+    rejected_emails: list[str] = []
+    if settings.email_syntax_prefilter:
+        candidates = [email.strip() if isinstance(email, str) else str(email) for email in emails]
+        submitted_emails, rejected_emails = partition_emails(candidates)
+        if rejected_emails:
+            logger.info(
+                "route.tasks.create.syntax_rejected",
+                extra={"user_id": user.user_id, "rejected": len(rejected_emails), "accepted": len(submitted_emails)},
+            )
+        if not submitted_emails:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": "no_valid_emails",
+                    "rejected_emails": [RejectedEmail(email=email).model_dump() for email in rejected_emails],
+                },
+            )
+    run_length = settings.submission_domain_run_length
+    upstream_emails = cluster_emails(submitted_emails, run_length) if run_length else submitted_emails
     try:
         target_user_id = user.user_id
-        manual_emails = [email.strip() for email in emails if isinstance(email, str) and email.strip()]
-        result = await client.create_task(emails=emails, webhook_url=webhook_url)
+        manual_emails = [email.strip() for email in submitted_emails if isinstance(email, str) and email.strip()]
+        result = await client.create_task(emails=upstream_emails, webhook_url=webhook_url)
         if result.id:
             logger.info(
                 "route.tasks.create.manual_emails_skipped",
                 extra={"user_id": target_user_id, "task_id": result.id, "email_count": len(manual_emails)},
             )
-        logger.info("route.tasks.create", extra={"user_id": target_user_id, "count": len(emails)})
-        return result
+            if upstream_emails != submitted_emails:
+                _save_submission_order(user_id=target_user_id, task_id=result.id, emails=submitted_emails)
+        logger.info("route.tasks.create", extra={"user_id": target_user_id, "count": len(submitted_emails)})
+        return ManualTaskResponse(
+            **result.model_dump(),
+            rejected_emails=[RejectedEmail(email=email) for email in rejected_emails],
+        )
     except HTTPException:
         raise
     except ExternalAPIError as exc:
@@ -335,6 +501,7 @@ async def create_task(
 
 @router.get("/tasks", response_model=TaskListResponse)
 async def list_tasks(
+    request: Request,
     limit: int = 10,
     offset: int = 0,
     refresh: bool = False,
@@ -382,7 +549,7 @@ async def list_tasks(
                 "duration_ms": round((time.time() - start) * 1000, 2),
             },
         )
-        return external_result
+        return conditional_json_response(request, external_result)
     except ExternalAPIError as exc:
         level = logger.warning if exc.status_code in (401, 403) else logger.error
         level(
@@ -471,9 +638,18 @@ async def get_latest_uploads(
 
 @router.get("/tasks/{task_id}/jobs", response_model=TaskJobsResponse)
 async def list_task_jobs(
+    request: Request,
+    background_tasks: BackgroundTasks,
     task_id: uuid.UUID,
     limit: int = 10,
     offset: int = 0,
+    email_status: Optional[str] = None,
+    domain: Optional[str] = None,
+    is_role_based: Optional[bool] = None,
+    is_disposable: Optional[bool] = None,
+    is_catchall: Optional[bool] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
     user: AuthContext = Depends(get_current_user),
     client: ExternalAPIClient = Depends(get_user_external_client),
 ):
@@ -482,7 +658,80 @@ async def list_task_jobs(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="limit must be greater than zero")
     if offset < 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="offset must be greater than or equal to zero")
+    if sort is not None and sort not in task_results_store.JOB_SORT_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort must be one of: {', '.join(task_results_store.JOB_SORT_COLUMNS)}",
+        )
     task_id_str = str(task_id)
+    local_query_requested = bool(email_status or domain or sort or descending) or any(
+        flag is not None for flag in (is_role_based, is_disposable, is_catchall)
+    )
+    if local_query_requested and not task_results_store.is_enabled():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Filtering and sorting are not available because the task results store is disabled",
+        )
+
+    # Plain paging is answered from the upstream while a completed task is copied into the store after the
+    # response; filters and sorting need the stored rows, so those requests wait for the copy.
+    stored = await task_results_store.ensure_task_loaded(
+        client,
+        user_id=user.user_id,
+        task_id=task_id_str,
+        background=None if local_query_requested else background_tasks,
+    )
+    if stored:
+        local_result = await run_in_threadpool(
+            task_results_store.query_task_jobs,
+            user.user_id,
+            task_id_str,
+            limit=limit,
+            offset=offset,
+            email_status=email_status,
+            domain=domain,
+            is_role_based=is_role_based,
+            is_disposable=is_disposable,
+            is_catchall=is_catchall,
+            sort=sort or "position",
+            descending=descending,
+        )
+        if local_result is not None:
+            logger.info(
+                "route.tasks.jobs.local",
+                extra={
+                    "user_id": user.user_id,
+                    "task_id": task_id_str,
+                    "limit": limit,
+                    "offset": offset,
+                    "count": local_result.count,
+                    "returned": len(local_result.jobs or []),
+                    "duration_ms": round((time.time() - start) * 1000, 2),
+                },
+            )
+            return conditional_json_response(request, local_result)
+    if local_query_requested:
+        state = await run_in_threadpool(task_results_store.task_state, user.user_id, task_id_str)
+        logger.info(
+            "route.tasks.jobs.local_query_unavailable",
+            extra={"user_id": user.user_id, "task_id": task_id_str, "state": state},
+        )
+        if state == task_results_store.STATE_TOO_LARGE:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="This task is too large to filter or sort",
+            )
+        if state == task_results_store.STATE_LOADING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Task results are still being prepared, try again shortly",
+                headers={"Retry-After": "5"},
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Filtering and sorting are available once the task has completed",
+        )
+
     try:
         result = await client.list_task_jobs(task_id_str, limit=limit, offset=offset)
         logger.info(
@@ -496,7 +745,7 @@ async def list_task_jobs(
                 "duration_ms": round((time.time() - start) * 1000, 2),
             },
         )
-        return result
+        return conditional_json_response(request, result)
     except ExternalAPIError as exc:
         level = logger.warning if exc.status_code in (401, 403) else logger.error
         level(
@@ -524,6 +773,7 @@ async def list_task_jobs(
 
 @router.get("/tasks/{task_id}", response_model=TaskDetailResponse)
 async def get_task_detail(
+    request: Request,
     task_id: uuid.UUID,
     user: AuthContext = Depends(get_current_user),
     api_key_id: Optional[str] = None,
@@ -541,7 +791,7 @@ async def get_task_detail(
                 "duration_ms": round((time.time() - start) * 1000, 2),
             },
         )
-        return result
+        return conditional_json_response(request, result)
     except HTTPException:
         raise
     except ExternalAPIError as exc:
@@ -569,7 +819,7 @@ async def get_task_detail(
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Upstream tasks service error") from exc
 
 
-@router.post("/tasks/upload", response_model=list[BatchFileUploadResponse])
+@router.post("/tasks/upload", response_model=list[UploadTaskResponse])
 async def upload_task_file(
     request: Request,
     files: list[UploadFile] = File(...),
@@ -580,7 +830,7 @@ async def upload_task_file(
     user: AuthContext = Depends(get_current_user),
     client: ExternalAPIClient = Depends(get_user_external_client),
 ):
-    responses: list[BatchFileUploadResponse] = []
+    responses: list[UploadTaskResponse] = []
     target_user_id = user.user_id
     resolved_webhook_url = _resolve_bulk_upload_webhook_url(
         request=request,
@@ -632,119 +882,167 @@ async def upload_task_file(
     if len(set(upload_names)) != len(upload_names):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Duplicate file names detected")
 
+    max_upload_bytes = get_settings().upload_max_mb * 1024 * 1024
     prepared_uploads = []
-    for file in files:
-        metadata = metadata_by_name.get(file.filename or "")
-        if not metadata:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing file metadata")
-        if metadata.remove_duplicates or not metadata.first_row_has_labels:
-            logger.info(
-                "route.tasks.upload.flags_ignored",
-                extra={
-                    "user_id": target_user_id,
-                    "file_name": file.filename,
-                    "remove_duplicates": metadata.remove_duplicates,
-                    "first_row_has_labels": metadata.first_row_has_labels,
-                },
+    try:
+        for file in files:
+            metadata = metadata_by_name.get(file.filename or "")
+            if not metadata:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing file metadata")
+            email_column_value, email_column_index = normalize_email_column_mapping(metadata.email_column)
+            # Staged under a unique name so concurrent uploads of the same file name cannot collide.
+            persisted = await storage.persist_upload_file(
+                file,
+                target_user_id,
+                max_upload_bytes,
+                target_name=f"incoming-{uuid.uuid4().hex}-{os.path.basename(file.filename or 'upload')}",
             )
-        email_column_value, email_column_index = normalize_email_column_mapping(metadata.email_column)
-        data = await file.read()
-        prepared_uploads.append(
-            {
-                "file": file,
-                "metadata": metadata,
-                "data": data,
-                "email_column_value": email_column_value,
-                "email_column_index": email_column_index,
-            }
-        )
-
-    for item in prepared_uploads:
-        try:
-            result = await client.upload_batch_file(
-                filename=item["file"].filename or "upload",
-                content=item["data"],
-                webhook_url=resolved_webhook_url,
-                email_column=item["email_column_value"],
+            prepared_uploads.append(
+                {
+                    "file": file,
+                    "metadata": metadata,
+                    "persisted": persisted,
+                    "email_column_value": email_column_value,
+                    "email_column_index": email_column_index,
+                }
             )
-            task_id = result.task_id
-            if not task_id:
-                logger.error(
-                    "route.tasks.upload.missing_task_id",
-                    extra={
-                        "user_id": target_user_id,
-                        "file_name": item["file"].filename,
-                        "upload_id": result.upload_id,
-                    },
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_502_BAD_GATEWAY, detail="Task id missing from upload response"
+
+        dedup_window_seconds = get_settings().upload_dedup_window_seconds
+        run_length = get_settings().submission_domain_run_length
+        for item in prepared_uploads:
+            fingerprint = None
+            parse_options = _upload_parse_options(item, run_length)
+            if dedup_window_seconds:
+                # The file type picks the parser, so identical bytes under another extension are a new upload.
+                fingerprint = upload_dedup.upload_fingerprint(
+                    target_user_id,
+                    item["persisted"].sha256,
+                    item["email_column_value"],
+                    {**parse_options, "file_type": Path(item["file"].filename or "").suffix.lower()},
                 )
-            if result.email_count is None:
-                logger.error(
-                    "route.tasks.upload.missing_email_count",
+                previous = await upload_dedup.claim_upload(fingerprint)
+                if previous is not None:
+                    logger.info(
+                        "route.tasks.upload.duplicate",
+                        extra={
+                            "user_id": target_user_id,
+                            "file_name": item["file"].filename,
+                            "task_id": previous.get("task_id"),
+                            "upload_id": previous.get("upload_id"),
+                        },
+                    )
+                    responses.append(UploadTaskResponse(**previous))
+                    continue
+            try:
+                parsed = await _parse_upload(user_id=target_user_id, item=item, parse_options=parse_options)
+                with item["upstream_path"].open("rb") as content:
+                    result = await client.upload_batch_file(
+                        filename=f"{Path(item['file'].filename or 'upload').stem}.csv",
+                        content=content,
+                        webhook_url=resolved_webhook_url,
+                        email_column="1",
+                    )
+                task_id = result.task_id
+                if not task_id:
+                    logger.error(
+                        "route.tasks.upload.missing_task_id",
+                        extra={
+                            "user_id": target_user_id,
+                            "file_name": item["file"].filename,
+                            "upload_id": result.upload_id,
+                        },
+                    )
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY, detail="Task id missing from upload response"
+                    )
+                if result.email_count is None:
+                    logger.error(
+                        "route.tasks.upload.missing_email_count",
+                        extra={
+                            "user_id": target_user_id,
+                            "file_name": item["file"].filename,
+                            "task_id": task_id,
+                            "upload_id": result.upload_id,
+                        },
+                    )
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                        detail="Email count missing from upload response",
+                    )
+                email_count = int(result.email_count)
+                if get_settings().upload_keep_originals:
+                    _keep_original_upload(user_id=target_user_id, task_id=task_id, item=item)
+                if run_length:
+                    original_emails = await run_in_threadpool(list, parsed.iter_emails())
+                    _save_submission_order(user_id=target_user_id, task_id=task_id, emails=original_emails)
+                logger.info(
+                    "route.tasks.upload",
                     extra={
                         "user_id": target_user_id,
                         "file_name": item["file"].filename,
                         "task_id": task_id,
                         "upload_id": result.upload_id,
+                        "email_count": email_count,
                     },
                 )
-                raise HTTPException(
-                    status_code=status.HTTP_502_BAD_GATEWAY,
-                    detail="Email count missing from upload response",
-                )
-            email_count = int(result.email_count)
-            logger.info(
-                "route.tasks.upload",
-                extra={
-                    "user_id": target_user_id,
-                    "file_name": item["file"].filename,
-                    "task_id": task_id,
-                    "upload_id": result.upload_id,
-                    "email_count": email_count,
-                },
-            )
-            responses.append(
-                BatchFileUploadResponse(
-                    filename=result.filename or item["file"].filename,
+                response = UploadTaskResponse(
+                    filename=item["file"].filename or result.filename,
                     task_id=task_id,
                     upload_id=result.upload_id,
                     uploaded_at=result.uploaded_at,
                     status=result.status,
                     message=result.message,
                     email_count=email_count,
+                    rejected_count=parsed.rejected_count,
+                    rejected_emails=[RejectedEmail(email=email) for email in parsed.rejected_samples],
+                    skipped_disposable_count=parsed.skipped_disposable_count,
                 )
-            )
-        except HTTPException as exc:
-            raise exc
-        except ExternalAPIError as exc:
-            if exc.status_code in (401, 403):
-                logger.warning(
-                    "route.tasks.upload.unauthorized",
-                    extra={"user_id": target_user_id, "status_code": exc.status_code, "details": exc.details},
+                responses.append(response)
+                if fingerprint:
+                    upload_dedup.record_upload(fingerprint, response.model_dump(), dedup_window_seconds)
+            except HTTPException as exc:
+                raise exc
+            except ExternalAPIError as exc:
+                if exc.status_code in (401, 403):
+                    logger.warning(
+                        "route.tasks.upload.unauthorized",
+                        extra={"user_id": target_user_id, "status_code": exc.status_code, "details": exc.details},
+                    )
+                raise HTTPException(status_code=exc.status_code, detail=exc.details or exc.args[0])
+            except Exception as exc:  # noqa: BLE001
+                logger.exception(
+                    "route.tasks.upload.exception",
+                    extra={"user_id": target_user_id, "file_name": item["file"].filename, "error": str(exc)},
                 )
-            raise HTTPException(status_code=exc.status_code, detail=exc.details or exc.args[0])
-        except Exception as exc:  # noqa: BLE001
-            logger.exception(
-                "route.tasks.upload.exception",
-                extra={"user_id": target_user_id, "file_name": item["file"].filename, "error": str(exc)},
-            )
-            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Unable to upload file") from exc
+                raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Unable to upload file") from exc
+            finally:
+                if fingerprint:
+                    upload_dedup.release_upload(fingerprint)
+
+    finally:
+        for item in prepared_uploads:
+            item["persisted"].path.unlink(missing_ok=True)
+            for key in ("emails_path", "upstream_path"):
+                if key in item:
+                    item[key].unlink(missing_ok=True)
 
     return responses
 
 
 @router.get("/tasks/{task_id}/download")
 async def download_task_results(
+    request: Request,
     task_id: uuid.UUID,
     file_format: Optional[str] = Query(default=None, alias="format"),
+    mode: Optional[str] = Query(default=None),
     user_id: Optional[str] = None,
     user: AuthContext = Depends(get_current_user),
     client: ExternalAPIClient = Depends(get_user_external_client),
 ):
     target_user_id = user.user_id
     task_id_str = str(task_id)
+    if mode is not None and mode != "enriched":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="mode must be 'enriched' when provided")
     if user_id:
         if user.role != "admin":
             logger.warning(
@@ -758,8 +1056,39 @@ async def download_task_results(
             extra={"admin_user_id": user.user_id, "target_user_id": target_user_id},
         )
 
+    if mode == "enriched":
+        output_path, output_name = await build_enriched_download(
+            client,
+            viewer_user_id=user.user_id,
+            owner_user_id=target_user_id,
+            task_id=task_id_str,
+        )
+        logger.info(
+            "route.tasks.download.enriched",
+            extra={"user_id": target_user_id, "task_id": task_id_str, "file_name": output_name},
+        )
+        return FileResponse(
+            output_path,
+            media_type=OUTPUT_MEDIA_TYPES.get(output_path.suffix.lower(), "application/octet-stream"),
+            filename=output_name,
+            background=BackgroundTask(output_path.unlink, missing_ok=True),
+        )
+
+    # Forward the browser's validators so the upstream can answer 304 without re-rendering the file.
+    conditional_headers = {
+        name: value
+        for name, value in (
+            ("If-None-Match", request.headers.get("if-none-match")),
+            ("If-Modified-Since", request.headers.get("if-modified-since")),
+        )
+        if value
+    }
     try:
-        download: DownloadedFile = await client.download_task_results(task_id=task_id_str, file_format=file_format)
+        download: DownloadedFile = await client.download_task_results(
+            task_id=task_id_str,
+            file_format=file_format,
+            conditional_headers=conditional_headers or None,
+        )
     except ExternalAPIError as exc:
         logger.warning(
             "route.tasks.download.external_failed",
@@ -774,6 +1103,19 @@ async def download_task_results(
             status_code=exc.status_code, detail=exc.details or "Unable to fetch task download"
         ) from exc
 
+    validator_headers: dict[str, str] = {}
+    if download.etag:
+        validator_headers["ETag"] = download.etag
+        validator_headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+    if download.last_modified:
+        validator_headers["Last-Modified"] = download.last_modified
+    if download.not_modified or if_none_match_satisfied(request.headers.get("if-none-match"), download.etag):
+        logger.info(
+            "route.tasks.download.not_modified",
+            extra={"user_id": target_user_id, "task_id": task_id_str, "format": file_format},
+        )
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers)
+
     content_type = download.content_type
     if not content_type:
         logger.warning(
@@ -782,7 +1124,7 @@ async def download_task_results(
         )
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Upstream download missing content type")
 
-    response_headers: dict[str, str] = {}
+    response_headers: dict[str, str] = dict(validator_headers)
     content_disposition = download.content_disposition
     if content_disposition:
         response_headers["Content-Disposition"] = content_disposition
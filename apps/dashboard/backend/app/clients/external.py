@@ -1,6 +1,7 @@
 import logging
+import os
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional, Union
 
 import httpx
 from pydantic import BaseModel, Field
@@ -174,6 +175,9 @@ class DownloadedFile:
     content: bytes
     content_type: Optional[str] = None
     content_disposition: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
 
 
 class BatchFileUploadResponse(BaseModel):
@@ -382,19 +386,21 @@ class ExternalAPIClient:
     async def upload_batch_file(
         self,
         filename: str,
-        content: bytes,
+        content: Union[bytes, BinaryIO],
         webhook_url: Optional[str] = None,
         email_column: Optional[str] = None,
     ) -> BatchFileUploadResponse:
-        if len(content) > self.max_upload_bytes:
+        """Upload a batch file; ``content`` may be bytes or an open binary file, which is streamed."""
+        size = len(content) if isinstance(content, bytes) else os.fstat(content.fileno()).st_size
+        if size > self.max_upload_bytes:
             logger.warning(
                 "external_api.upload_file_too_large",
-                extra={"file_name": filename, "file_size": len(content), "max_bytes": self.max_upload_bytes},
+                extra={"file_name": filename, "file_size": size, "max_bytes": self.max_upload_bytes},
             )
             raise ExternalAPIError(
                 status_code=400,
                 message="File exceeds maximum allowed size",
-                details={"filename": filename, "size": len(content), "max_bytes": self.max_upload_bytes},
+                details={"filename": filename, "size": size, "max_bytes": self.max_upload_bytes},
             )
 
         files = {"file": (filename, content, "application/octet-stream")}
@@ -408,9 +414,23 @@ class ExternalAPIClient:
     async def get_upload_status(self, upload_id: str) -> UploadStatusResponse:
         return await self._get(f"/tasks/batch/uploads/{upload_id}", UploadStatusResponse)
 
-    async def download_task_results(self, task_id: str, file_format: Optional[str] = None) -> DownloadedFile:
+    async def download_task_results(
+        self,
+        task_id: str,
+        file_format: Optional[str] = None,
+        conditional_headers: Optional[Dict[str, str]] = None,
+    ) -> DownloadedFile:
         params = {"format": file_format} if file_format else None
-        response = await self._request("GET", f"/tasks/{task_id}/download", params=params)
+        response = await self._request(
+            "GET", f"/tasks/{task_id}/download", params=params, headers=conditional_headers or {}
+        )
+        if response.status_code == 304:
+            return DownloadedFile(
+                content=b"",
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+                not_modified=True,
+            )
         if response.status_code >= 400:
             detail = None
             try:
@@ -426,6 +446,8 @@ class ExternalAPIClient:
             content=response.content,
             content_type=response.headers.get("content-type"),
             content_disposition=response.headers.get("content-disposition"),
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
         )
 
     async def list_api_keys(
@@ -8,6 +8,7 @@ from fastapi import Depends, Header, HTTPException, Request, status
 from jwt import InvalidTokenError
 from pydantic import BaseModel
 
+from . import token_cache
 from .settings import get_settings
 from ..services import supabase_client
 
@@ -140,19 +141,34 @@ def _get_current_user(
         )
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing auth token")
 
-    try:
-        claims = _decode_supabase_jwt(token, settings.supabase_jwt_secret)
-    except InvalidTokenError:
-        jwks_url = f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
-        claims = _decode_supabase_jwt_with_jwks(token, jwks_url)
-    user_id = claims.get("sub") or claims.get("user_id")
-    if not user_id:
-        logger.warning("auth.missing_sub", extra={"claims_keys": list(claims.keys())})
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth token")
+    cache_key = token_cache.token_key(token, settings.supabase_jwt_secret)
+    verified = token_cache.get_verified_token(cache_key)
+    if verified is None:
+        try:
+            claims = _decode_supabase_jwt(token, settings.supabase_jwt_secret)
+        except InvalidTokenError:
+            jwks_url = f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+            claims = _decode_supabase_jwt_with_jwks(token, jwks_url)
+        user_id = claims.get("sub") or claims.get("user_id")
+        if not user_id:
+            logger.warning("auth.missing_sub", extra={"claims_keys": list(claims.keys())})
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth token")
+        role_claim, role_source = _extract_role_claim(claims)
+        email_confirmed = _claims_email_confirmed(claims)
+        token_cache.store_verified_token(
+            cache_key,
+            user_id=user_id,
+            claims=claims,
+            role_claim=role_claim,
+            role_source=role_source,
+            email_confirmed=email_confirmed,
+        )
+    else:
+        user_id, claims = verified.user_id, verified.claims
+        role_claim, role_source = verified.role_claim, verified.role_source
+        email_confirmed = verified.email_confirmed
 
     role = "user"
-    role_source = None
-    role_claim, role_source = _extract_role_claim(claims)
     if role_claim:
         if role_claim == "admin":
             role = "admin"
@@ -176,10 +192,12 @@ def _get_current_user(
             "has_authorization": bool(authorization),
             "role": role,
             "role_source": role_source,
+            "cached": verified is not None,
         },
     )
-    if require_confirmed_email:
+    if require_confirmed_email and not email_confirmed:
         enforce_email_confirmed(user_id, claims)
+        token_cache.mark_email_confirmed(cache_key)
     return AuthContext(user_id=user_id, claims=claims, token=token, role=role)
 
 
@@ -0,0 +1,46 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(body: bytes) -> str:
+    # Weak validator: the same JSON may be served gzip-encoded or not, so byte-identity is not promised.
+    return f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _opaque_tag(value: str) -> str:
+    trimmed = value.strip()
+    return trimmed[2:] if trimmed.startswith("W/") else trimmed
+
+
+def if_none_match_satisfied(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _opaque_tag(etag)
+    return any(_opaque_tag(candidate) == target for candidate in if_none_match.split(",") if candidate.strip())
+
+
+def conditional_json_response(request: Request, payload: BaseModel) -> Response:
+    """
+    Serialize a response model and answer 304 when the caller already holds the same representation.
+
+    The body is rendered exactly as the app's default ORJSONResponse would render it, and the ETag
+    is computed over those bytes.
+    """
+    response = ORJSONResponse(jsonable_encoder(payload), headers={"Cache-Control": CONDITIONAL_CACHE_CONTROL})
+    etag = compute_etag(response.body)
+    if if_none_match_satisfied(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL},
+        )
+    response.headers["ETag"] = etag
+    return response
@@ -23,6 +23,8 @@ class Settings(BaseSettings):
     supabase_jwt_secret: str
     supabase_anon_key: Optional[str] = None
     supabase_auth_cookie_name: str
+    auth_token_cache_size: int = 4096
+    auth_token_cache_expiry_margin_seconds: float = 30.0
     external_api_jwt_ttl_seconds: Optional[int] = None
     external_api_admin_key: Optional[str] = None
 
@@ -37,7 +39,24 @@ class Settings(BaseSettings):
     upload_poll_attempts: int = 3
     upload_poll_interval_seconds: float = 2.0
     upload_poll_page_size: int = 20
+    upload_keep_originals: bool = False
+    upload_retention_days: float = 30.0
+    upload_dedup_window_seconds: int = 900
+    submission_domain_run_length: int = 0
+    email_syntax_prefilter: bool = True
+    email_canonical_dedup: bool = False
+    email_classification_index_path: Optional[str] = None
+    email_skip_disposable: bool = False
     overview_metrics_timeout_seconds: float = 8.0
+    task_results_store_path: Optional[str] = None
+    task_results_store_max_mb: int = 256
+    task_results_store_page_size: int = 500
+    task_results_store_recheck_seconds: float = 30.0
+    response_gzip_min_bytes: int = 1024
+    response_gzip_level: int = 6
+    file_processing_workers: int = 2
+    file_processing_timeout_seconds: float = 300.0
+    output_join_memory_budget_mb: int = 256
 
     signup_bonus_credits: Optional[int] = None
     signup_bonus_max_account_age_seconds: Optional[int] = None
@@ -51,12 +70,33 @@ class Settings(BaseSettings):
     smtp_from_email: Optional[str] = None
     smtp_from_name: Optional[str] = None
     smtp_reply_to: Optional[str] = None
+    smtp_pool_size: int = 2
+    smtp_pool_idle_seconds: float = 60.0
     bulk_upload_email_subject_completed: Optional[str] = None
     bulk_upload_email_subject_failed: Optional[str] = None
     bulk_upload_email_body_completed: Optional[str] = None
     bulk_upload_email_body_failed: Optional[str] = None
+    bulk_upload_email_subject_digest: Optional[str] = None
+    bulk_upload_email_body_digest: Optional[str] = None
+    bulk_upload_digest_window_seconds: float = 0.0
+    bulk_upload_digest_max_attempts: int = 5
+    bulk_upload_digest_retry_seconds: float = 30.0
+    notification_recipient_cache_ttl_seconds: float = 300.0
     bulk_upload_webhook_url: Optional[str] = None
     bulk_upload_webhook_secret_key: Optional[str] = Field(default=None, alias="WEBHOOK_SECRET_KEY")
+    webhook_inbox_path: Optional[str] = None
+    webhook_inbox_workers: int = 2
+    webhook_inbox_max_attempts: int = 8
+    webhook_inbox_retry_seconds: float = 5.0
+    webhook_inbox_poll_seconds: float = 1.0
+    webhook_inbox_lease_seconds: float = 60.0
+    email_outbox_path: Optional[str] = None
+    email_outbox_workers: int = 2
+    email_outbox_rate_per_second: float = 5.0
+    email_outbox_max_attempts: int = 8
+    email_outbox_retry_seconds: float = 30.0
+    email_outbox_poll_seconds: float = 1.0
+    email_outbox_lease_seconds: float = 60.0
     sales_contact_user_rate_limit_requests: int = 5
     sales_contact_ip_rate_limit_requests: int = 20
     sales_contact_rate_limit_window_seconds: int = 300
@@ -108,6 +148,13 @@ class Settings(BaseSettings):
         "sales_contact_user_rate_limit_requests",
         "sales_contact_ip_rate_limit_requests",
         "sales_contact_rate_limit_window_seconds",
+        "task_results_store_max_mb",
+        "task_results_store_page_size",
+        "webhook_inbox_workers",
+        "webhook_inbox_max_attempts",
+        "email_outbox_workers",
+        "email_outbox_max_attempts",
+        "bulk_upload_digest_max_attempts",
     )
     @classmethod
     def positive_int(cls, value):
@@ -115,20 +162,61 @@ class Settings(BaseSettings):
             raise ValueError("must be greater than zero")
         return value
 
-    @field_validator("upload_poll_interval_seconds")
+    @field_validator(
+        "upload_poll_interval_seconds",
+        "task_results_store_recheck_seconds",
+        "bulk_upload_digest_window_seconds",
+        "notification_recipient_cache_ttl_seconds",
+        "smtp_pool_idle_seconds",
+        "email_outbox_rate_per_second",
+        "auth_token_cache_expiry_margin_seconds",
+    )
     @classmethod
     def non_negative(cls, value):
         if value < 0:
             raise ValueError("must be non-negative")
         return value
 
-    @field_validator("overview_metrics_timeout_seconds")
+    @field_validator(
+        "overview_metrics_timeout_seconds",
+        "file_processing_timeout_seconds",
+        "webhook_inbox_retry_seconds",
+        "webhook_inbox_poll_seconds",
+        "webhook_inbox_lease_seconds",
+        "email_outbox_retry_seconds",
+        "email_outbox_poll_seconds",
+        "email_outbox_lease_seconds",
+        "bulk_upload_digest_retry_seconds",
+        "upload_retention_days",
+    )
     @classmethod
     def positive_timeout(cls, value):
         if value <= 0:
             raise ValueError("must be greater than zero")
         return value
 
+    @field_validator(
+        "response_gzip_min_bytes",
+        "file_processing_workers",
+        "output_join_memory_budget_mb",
+        "upload_dedup_window_seconds",
+        "submission_domain_run_length",
+        "smtp_pool_size",
+        "auth_token_cache_size",
+    )
+    @classmethod
+    def non_negative_int(cls, value):
+        if value < 0:
+            raise ValueError("must be non-negative")
+        return value
+
+    @field_validator("response_gzip_level")
+    @classmethod
+    def gzip_level_range(cls, value):
+        if value < 1 or value > 9:
+            raise ValueError("must be between 1 and 9")
+        return value
+
     @field_validator("signup_bonus_credits", "signup_bonus_max_account_age_seconds")
     @classmethod
     def positive_optional(cls, value):
@@ -0,0 +1,119 @@
+"""
+Bounded cache of verified Supabase access tokens.
+
+A dashboard session sends the same bearer token with every request, and verifying it costs an
+HMAC check (or an RSA check through JWKS when HS256 fails) plus, for tokens without a confirmation
+claim, a Supabase lookup of the auth user. Verified tokens are remembered by a hash of the token
+and the JWT secret, together with their claims, role claim and confirmed-email status, until
+AUTH_TOKEN_CACHE_EXPIRY_MARGIN_SECONDS before their ``exp``. Tokens without ``exp`` are never
+cached, and neither is an unconfirmed email (the user may confirm at any moment).
+
+Callers get their own copy of the cached claims, so mutating them never changes what later
+requests see. Hit and miss counts are available through ``token_cache_stats`` and are logged as
+``auth.token_cache.stats`` every STATS_LOG_EVERY lookups.
+"""
+
+import copy
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+STATS_LOG_EVERY = 1000
+
+
+@dataclass
+class VerifiedToken:
+    user_id: str
+    claims: Dict[str, Any]
+    role_claim: Optional[str]
+    role_source: Optional[str]
+    email_confirmed: bool
+    expires_at: float
+
+
+_CACHE: "OrderedDict[str, VerifiedToken]" = OrderedDict()
+_CACHE_LOCK = Lock()
+_STATS = {"hits": 0, "misses": 0}
+
+
+def token_key(token: str, secret: str) -> str:
+    return hashlib.sha256(f"{secret}\0{token}".encode("utf-8")).hexdigest()
+
+
+def get_verified_token(key: str, now: Optional[float] = None) -> Optional[VerifiedToken]:
+    if not get_settings().auth_token_cache_size:
+        return None
+    now = time.time() if now is None else now
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del _CACHE[key]
+            entry = None
+        if entry is None:
+            _STATS["misses"] += 1
+        else:
+            _CACHE.move_to_end(key)
+            _STATS["hits"] += 1
+            entry = replace(entry, claims=copy.deepcopy(entry.claims))
+        stats = {**_STATS, "size": len(_CACHE)}
+    if (stats["hits"] + stats["misses"]) % STATS_LOG_EVERY == 0:
+        logger.info("auth.token_cache.stats", extra=stats)
+    return entry
+
+
+def store_verified_token(
+    key: str,
+    *,
+    user_id: str,
+    claims: Dict[str, Any],
+    role_claim: Optional[str],
+    role_source: Optional[str],
+    email_confirmed: bool,
+) -> None:
+    settings = get_settings()
+    exp = claims.get("exp")
+    if not settings.auth_token_cache_size or not isinstance(exp, (int, float)):
+        return
+    expires_at = exp - settings.auth_token_cache_expiry_margin_seconds
+    if expires_at <= time.time():
+        return
+    entry = VerifiedToken(
+        user_id=user_id,
+        claims=copy.deepcopy(claims),
+        role_claim=role_claim,
+        role_source=role_source,
+        email_confirmed=email_confirmed,
+        expires_at=expires_at,
+    )
+    with _CACHE_LOCK:
+        _CACHE.pop(key, None)
+        _CACHE[key] = entry
+        while len(_CACHE) > settings.auth_token_cache_size:
+            _CACHE.popitem(last=False)
+
+
+def mark_email_confirmed(key: str) -> None:
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is not None:
+            entry.email_confirmed = True
+
+
+def token_cache_stats() -> Dict[str, int]:
+    with _CACHE_LOCK:
+        return {**_STATS, "size": len(_CACHE)}
+
+
+def clear_token_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _STATS["hits"] = 0
+        _STATS["misses"] = 0
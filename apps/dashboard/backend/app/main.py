@@ -1,5 +1,9 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from .core.logging import configure_logging
@@ -14,6 +18,13 @@ from .api.debug import router as debug_router
 from .api.auth import router as auth_router
 from .api.credits import router as credits_router
 from .api.sales import router as sales_router
+from .services.email_outbox import run_email_outbox
+from .services.file_processing_pool import start_file_processing_pool, stop_file_processing_pool
+from .services.notification_digest import run_notification_digest
+from .services.smtp_mailer import close_smtp_pool
+from .services.storage import run_upload_retention
+from .services.upload_notifications import handle_bulk_upload_event
+from .services.webhook_inbox import run_webhook_inbox
 
 
 def create_app() -> FastAPI:
@@ -26,7 +37,23 @@ def create_app() -> FastAPI:
         log_file_backup_count=settings.log_file_backup_count,
     )
 
-    app = FastAPI(title="Email Verification Backend", version="0.1.0")
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        start_file_processing_pool(settings.file_processing_workers, settings.file_processing_timeout_seconds)
+        try:
+            async with run_upload_retention(), run_email_outbox(), run_notification_digest():
+                async with run_webhook_inbox(handle_bulk_upload_event):
+                    yield
+        finally:
+            close_smtp_pool()
+            stop_file_processing_pool()
+
+    app = FastAPI(
+        title="Email Verification Backend",
+        version="0.1.0",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
 
     app.add_middleware(
         CORSMiddleware,
@@ -35,6 +62,12 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Large task payloads (jobs, verification steps) compress well; small responses are sent as-is.
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.response_gzip_min_bytes,
+        compresslevel=settings.response_gzip_level,
+    )
 
     @app.get("/health")
     def health() -> dict[str, str]:
@@ -0,0 +1,71 @@
+"""
+Optional pyarrow reader for the email column of CSV uploads.
+
+pyarrow is listed in requirements.txt, but the parser still works without it. The streaming reader
+tokenizes the file in C and projects only the selected column, one block at a time, so memory stays
+bounded by the block size. Trimming, syntax filtering and de-duplication then run on the values in
+the same collector the row-based parser uses, so both engines give identical results. When the
+reader rejects the file partway through (ragged rows, invalid UTF-8, ...), it raises
+``ColumnarReadError`` and the caller parses the file again row by row.
+"""
+
+import logging
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - exercised only when pyarrow is absent
+    pa = None
+    pa_csv = None
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE_BYTES = 1 << 20
+
+
+class ColumnarReadError(Exception):
+    pass
+
+
+def is_available() -> bool:
+    return pa is not None
+
+
+def iter_csv_column(
+    source: Union[bytes, Path],
+    *,
+    column_index: int,
+    delimiter: str,
+    quotechar: str,
+    doublequote: bool,
+    skip_header: bool,
+) -> Iterator[str]:
+    """Yield the raw values of one CSV column in file order, one reader block at a time."""
+    column_name = f"f{column_index}"
+    try:
+        reader = pa_csv.open_csv(
+            pa.BufferReader(source) if isinstance(source, (bytes, bytearray)) else str(source),
+            read_options=pa_csv.ReadOptions(autogenerate_column_names=True, block_size=BLOCK_SIZE_BYTES),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=delimiter,
+                quote_char=quotechar or False,
+                double_quote=doublequote,
+                newlines_in_values=True,
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=[column_name],
+                column_types={column_name: pa.string()},
+                strings_can_be_null=False,
+            ),
+        )
+        skip_header_value = skip_header
+        for batch in reader:
+            values = batch.column(0)
+            if skip_header_value and len(values):
+                values, skip_header_value = values.slice(1), False
+            yield from values.to_pylist()
+    except (pa.ArrowInvalid, pa.ArrowKeyError, OSError) as exc:
+        logger.info("file.columnar.fallback", extra={"reason": str(exc)[:200]})
+        raise ColumnarReadError(str(exc)) from exc
@@ -0,0 +1,77 @@
+"""
+Domain-clustered submission ordering for verification tasks.
+
+The upstream probes mailboxes over SMTP, so a list in spreadsheet order makes it hop between
+thousands of mail servers. ``cluster_order`` regroups addresses by domain (first-seen domain
+order, stable inside each domain) and interleaves the groups ``run_length`` addresses at a time,
+so consecutive probes share a connection without sending one MX a long unbroken burst.
+
+The original order is saved per task (``storage.persist_submission_order``) and
+``OriginalPositions`` maps stored jobs back onto it, so results are listed in the order the
+customer submitted them.
+"""
+
+from array import array
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def email_domain(value: object) -> str:
+    return str(value).strip().rpartition("@")[2].lower()
+
+
+def cluster_order(domains: Iterable[str], run_length: int) -> array:
+    """
+    Return the submission order as original indexes: ``order[i]`` is the item submitted i-th.
+
+    Domains take turns in first-seen order, each emitting up to ``run_length`` items per turn.
+    """
+    if run_length <= 0:
+        raise ValueError("run_length must be greater than zero")
+    groups: Dict[str, array] = {}
+    for index, domain in enumerate(domains):
+        group = groups.get(domain)
+        if group is None:
+            group = groups[domain] = array("I")
+        group.append(index)
+    order = array("I")
+    active = list(groups.values())
+    cursor = 0
+    while active:
+        remaining = []
+        for group in active:
+            order.extend(group[cursor : cursor + run_length])
+            if len(group) > cursor + run_length:
+                remaining.append(group)
+        active = remaining
+        cursor += run_length
+    return order
+
+
+def cluster_emails(emails: Sequence[T], run_length: int) -> List[T]:
+    return [emails[index] for index in cluster_order((email_domain(email) for email in emails), run_length)]
+
+
+class OriginalPositions:
+    """
+    Map jobs of a clustered task back to their original positions by email.
+
+    Repeated emails take successive positions. Jobs whose email is not in the saved order
+    (the upstream may normalize addresses) are placed after every known position.
+    """
+
+    def __init__(self, emails: Sequence[str]) -> None:
+        self._size = len(emails)
+        self._positions: Dict[str, Deque[int]] = {}
+        for index, email in enumerate(emails):
+            key = email.strip().lower()
+            if key:
+                self._positions.setdefault(key, deque()).append(index)
+
+    def resolve(self, email: Optional[str], fallback: int) -> int:
+        positions = self._positions.get((email or "").strip().lower())
+        if positions:
+            return positions.popleft()
+        return self._size + fallback
@@ -0,0 +1,73 @@
+"""
+Provider-aware canonical mailbox keys for de-duplication.
+
+Some providers deliver several spellings to one mailbox: Gmail ignores dots in the local part,
+and several large providers document that a ``+tag`` suffix is delivered to the untagged mailbox.
+``canonical_email`` maps every such spelling to one key so the mailbox is verified once; results
+are then fanned back out to each original spelling by looking rows up through the same key.
+Domains without a rule only get lower-cased. Yahoo has no rule on purpose: its ``-`` addresses
+are separate disposable aliases, and ``-`` is also valid inside ordinary Yahoo usernames.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class ProviderRule:
+    strip_dots: bool = False
+    tag_separator: Optional[str] = "+"
+    # Alias domains map onto the provider's primary domain (googlemail.com -> gmail.com).
+    canonical_domain: Optional[str] = None
+
+
+_GMAIL = ProviderRule(strip_dots=True, canonical_domain="gmail.com")
+_MICROSOFT = ProviderRule()
+_APPLE = ProviderRule()
+_PROTON = ProviderRule()
+
+DEFAULT_PROVIDER_RULES: Mapping[str, ProviderRule] = {
+    "gmail.com": _GMAIL,
+    "googlemail.com": _GMAIL,
+    "outlook.com": _MICROSOFT,
+    "hotmail.com": _MICROSOFT,
+    "live.com": _MICROSOFT,
+    "msn.com": _MICROSOFT,
+    "icloud.com": _APPLE,
+    "me.com": _APPLE,
+    "mac.com": _APPLE,
+    "fastmail.com": ProviderRule(),
+    "protonmail.com": _PROTON,
+    "proton.me": _PROTON,
+    "pm.me": _PROTON,
+}
+
+
+def canonical_email(value: str, rules: Mapping[str, ProviderRule] = DEFAULT_PROVIDER_RULES) -> str:
+    """Return the lower-cased mailbox key for ``value`` under the provider rules."""
+    lowered = value.lower()
+    local_part, at, domain = lowered.rpartition("@")
+    if not at:
+        return lowered
+    rule = rules.get(domain)
+    if rule is None:
+        return lowered
+    if rule.tag_separator:
+        local_part = local_part.split(rule.tag_separator, 1)[0]
+    if rule.strip_dots:
+        local_part = local_part.replace(".", "")
+    if not local_part:
+        # "+tag@gmail.com" has no mailbox left; keep the spelling as its own key.
+        return lowered
+    return f"{local_part}@{rule.canonical_domain or domain}"
+
+
+class CanonicalLookup:
+    """Wraps a results lookup keyed by canonical email so any spelling of a mailbox finds its result."""
+
+    def __init__(self, results: Any, rules: Mapping[str, ProviderRule] = DEFAULT_PROVIDER_RULES) -> None:
+        self._results = results
+        self._rules = rules
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._results.get(canonical_email(key, self._rules) if key else key, default)
@@ -0,0 +1,239 @@
+"""
+Local disposable-domain and role-account classification backed by a memory-mapped index.
+
+The index file holds two sorted arrays of 64-bit fingerprints: disposable domains and normalized
+role local parts (``no-reply``, ``No.Reply`` and ``noreply+x`` all normalize to ``noreply``).
+Opening it maps the file and casts it to ``memoryview('Q')``, so startup cost does not grow with
+list size and lookups are binary searches over the mapped pages. Rebuild the file with
+``scripts/build_email_classification_index.py``; point ``EMAIL_CLASSIFICATION_INDEX_PATH`` at it.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from ..core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"EVCIDX01"
+# Output status of rows left out of the upstream task because their domain is disposable.
+SKIPPED_DISPOSABLE_STATUS = "skipped_disposable"
+_HEADER = struct.Struct("<8sQQ")
+
+DEFAULT_ROLE_LOCAL_PARTS = (
+    "abuse",
+    "accounting",
+    "admin",
+    "administrator",
+    "billing",
+    "careers",
+    "contact",
+    "customerservice",
+    "enquiries",
+    "help",
+    "helpdesk",
+    "hello",
+    "hostmaster",
+    "hr",
+    "info",
+    "jobs",
+    "legal",
+    "mail",
+    "marketing",
+    "media",
+    "newsletter",
+    "noc",
+    "noreply",
+    "office",
+    "orders",
+    "postmaster",
+    "press",
+    "privacy",
+    "root",
+    "sales",
+    "security",
+    "service",
+    "support",
+    "team",
+    "webmaster",
+)
+
+
+def _fingerprint(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def normalize_domain(domain: str) -> str:
+    return domain.strip().rstrip(".").lower()
+
+
+def normalize_role_local_part(local_part: str) -> str:
+    base = local_part.strip().lower().split("+", 1)[0]
+    return base.replace(".", "").replace("-", "").replace("_", "")
+
+
+def write_classification_index(
+    path: Path, disposable_domains: Iterable[str], role_local_parts: Iterable[str] = DEFAULT_ROLE_LOCAL_PARTS
+) -> Dict[str, int]:
+    """Build the index file atomically; returns the number of distinct entries per section."""
+    domains = sorted({_fingerprint(normalize_domain(value)) for value in disposable_domains if value.strip()})
+    roles = sorted({_fingerprint(normalize_role_local_part(value)) for value in role_local_parts if value.strip()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp")
+    body = array("Q", domains + roles)
+    if sys.byteorder == "big":
+        body.byteswap()
+    with temp_path.open("wb") as handle:
+        handle.write(_HEADER.pack(INDEX_MAGIC, len(domains), len(roles)))
+        body.tofile(handle)
+    os.replace(temp_path, path)
+    return {"disposable_domains": len(domains), "role_local_parts": len(roles)}
+
+
+@dataclass(frozen=True)
+class EmailClassification:
+    email: str
+    is_disposable: bool
+    is_role_based: bool
+
+
+def _contains(values: Sequence[int], fingerprint: int) -> bool:
+    position = bisect_left(values, fingerprint)
+    return position < len(values) and values[position] == fingerprint
+
+
+class ClassificationIndex:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._views: List[memoryview] = []
+        # The mapping keeps its own duplicate of the descriptor, so the file can be closed right away.
+        with path.open("rb") as handle:
+            try:
+                self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"Classification index is empty: {path}") from None
+        try:
+            magic, domain_count, role_count = _HEADER.unpack_from(self._mmap, 0)
+        except struct.error:
+            magic, domain_count, role_count = b"", 0, 0
+        expected_size = _HEADER.size + 8 * (domain_count + role_count)
+        if magic != INDEX_MAGIC or len(self._mmap) != expected_size:
+            self.close()
+            raise ValueError(f"Invalid classification index: {path}")
+        if sys.byteorder == "little":
+            # The mapped bytes are used directly as uint64 arrays; nothing is copied at load time.
+            root = memoryview(self._mmap)
+            values = root[_HEADER.size :].cast("Q")
+            self._views = [root, values]
+        else:
+            values = array("Q", self._mmap[_HEADER.size :])
+            values.byteswap()
+        self._domains: Sequence[int] = values[:domain_count]
+        self._roles: Sequence[int] = values[domain_count:]
+        if isinstance(values, memoryview):
+            self._views.extend([self._domains, self._roles])
+        self.domain_count = domain_count
+        self.role_count = role_count
+
+    def close(self) -> None:
+        """Unmap the file. Only for indexes no other thread can still be reading."""
+        # Every exported view must be released before the mapping can be closed.
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def is_disposable_domain(self, domain: str) -> bool:
+        # Check the domain and each parent so sub.mailinator.com matches mailinator.com.
+        labels = normalize_domain(domain).split(".")
+        for start in range(len(labels) - 1):
+            if _contains(self._domains, _fingerprint(".".join(labels[start:]))):
+                return True
+        return False
+
+    def is_role_local_part(self, local_part: str) -> bool:
+        return _contains(self._roles, _fingerprint(normalize_role_local_part(local_part)))
+
+    def classify(self, email: str) -> EmailClassification:
+        local_part, _, domain = email.rpartition("@")
+        return EmailClassification(
+            email=email,
+            is_disposable=bool(domain) and self.is_disposable_domain(domain),
+            is_role_based=bool(local_part) and self.is_role_local_part(local_part),
+        )
+
+    def classify_many(self, emails: Iterable[str]) -> List[EmailClassification]:
+        """Batch lookup; domain results are memoized within the batch since uploads repeat domains heavily."""
+        domain_cache: Dict[str, bool] = {}
+        is_role = self.is_role_local_part
+        results: List[EmailClassification] = []
+        for email in emails:
+            local_part, _, domain = email.rpartition("@")
+            disposable = domain_cache.get(domain)
+            if disposable is None:
+                disposable = bool(domain) and self.is_disposable_domain(domain)
+                domain_cache[domain] = disposable
+            results.append(
+                EmailClassification(
+                    email=email,
+                    is_disposable=disposable,
+                    is_role_based=bool(local_part) and is_role(local_part),
+                )
+            )
+        return results
+
+
+_INDEX: Optional[ClassificationIndex] = None
+_INDEX_PATH: Optional[str] = None
+_INDEX_LOCK = Lock()
+
+
+def get_classification_index(path: Optional[str] = None) -> Optional[ClassificationIndex]:
+    """Return the index at ``path`` (default: the configured one), opening it on first use.
+
+    Returns None when no index is configured or the file cannot be read.
+    """
+    global _INDEX, _INDEX_PATH
+    if path is None:
+        path = get_settings().email_classification_index_path
+    if not path:
+        return None
+    with _INDEX_LOCK:
+        if _INDEX is not None and _INDEX_PATH == path:
+            return _INDEX
+        start = time.time()
+        try:
+            index = ClassificationIndex(Path(path))
+        except (OSError, ValueError) as exc:
+            logger.error("email_classification.index_load_failed", extra={"path": path, "error": str(exc)})
+            return None
+        # The previous index is not closed: other threads may still be inside a lookup on its views.
+        # Dropping the reference lets it unmap once the last reader lets go of it.
+        _INDEX, _INDEX_PATH = index, path
+        logger.info(
+            "email_classification.index_loaded",
+            extra={
+                "path": path,
+                "disposable_domains": index.domain_count,
+                "role_local_parts": index.role_count,
+                "duration_ms": round((time.time() - start) * 1000, 2),
+            },
+        )
+        return index
+
+
+def clear_classification_index() -> None:
+    global _INDEX, _INDEX_PATH
+    with _INDEX_LOCK:
+        _INDEX, _INDEX_PATH = None, None
@@ -0,0 +1,286 @@
+"""
+Memory-bounded, case-insensitive email de-duplication for large uploads.
+
+Uniqueness is tracked with 64-bit fingerprints in a flat ``array('Q')`` rather than a set of
+Python strings, and unique emails can be spooled to disk instead of held in a list. Once the
+fingerprint table outgrows its memory budget the deduplicator spills every remaining candidate
+into hash partitions on disk and resolves duplicates one partition at a time, so peak memory
+stays bounded regardless of row count. First-occurrence order is preserved in every mode.
+"""
+
+import hashlib
+import heapq
+import logging
+import struct
+import tempfile
+from array import array
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPILL_PARTITIONS = 64
+
+_SPOOL_HEADER = struct.Struct("<I")
+_PARTITION_HEADER = struct.Struct("<QQI")
+
+
+def email_fingerprint(value: str) -> int:
+    """Return a non-zero 64-bit fingerprint of the lower-cased email (zero marks empty slots)."""
+    digest = hashlib.blake2b(value.lower().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class CompactHashSet:
+    """Open-addressing set of non-zero 64-bit fingerprints stored in a single ``array('Q')``."""
+
+    _MAX_LOAD = 0.6
+
+    def __init__(self, capacity: int = 1024) -> None:
+        size = 1 << max(4, (int(capacity / self._MAX_LOAD)).bit_length())
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, fingerprint: int) -> bool:
+        slots, mask = self._slots, self._mask
+        index = fingerprint & mask
+        while True:
+            current = slots[index]
+            if current == fingerprint:
+                return True
+            if current == 0:
+                return False
+            index = (index + 1) & mask
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._slots) * self._slots.itemsize
+
+    def add(self, fingerprint: int) -> bool:
+        """Insert the fingerprint; return False when it was already present."""
+        slots, mask = self._slots, self._mask
+        index = fingerprint & mask
+        while True:
+            current = slots[index]
+            if current == fingerprint:
+                return False
+            if current == 0:
+                slots[index] = fingerprint
+                self._count += 1
+                if self._count > len(slots) * self._MAX_LOAD:
+                    self._grow()
+                return True
+            index = (index + 1) & mask
+
+    def _grow(self) -> None:
+        old_slots = self._slots
+        size = len(old_slots) * 2
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        slots, mask = self._slots, self._mask
+        for fingerprint in old_slots:
+            if fingerprint == 0:
+                continue
+            index = fingerprint & mask
+            while slots[index] != 0:
+                index = (index + 1) & mask
+            slots[index] = fingerprint
+
+
+class EmailSpool:
+    """
+    Append-only, disk-backed sequence of emails. Iteration yields emails in insertion order;
+    only one pass should be active at a time.
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None) -> None:
+        self._file = tempfile.TemporaryFile(dir=spill_dir)
+        self._count = 0
+        self._at_end = True
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        self._file.flush()
+        self._file.seek(0)
+        self._at_end = False
+        for _ in range(self._count):
+            (length,) = _SPOOL_HEADER.unpack(self._file.read(_SPOOL_HEADER.size))
+            yield self._file.read(length).decode("utf-8")
+
+    def __enter__(self) -> "EmailSpool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def append(self, value: str) -> None:
+        if not self._at_end:
+            self._file.seek(0, 2)
+            self._at_end = True
+        data = value.encode("utf-8")
+        self._file.write(_SPOOL_HEADER.pack(len(data)))
+        self._file.write(data)
+        self._count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+
+EmailCollection = Union[List[str], EmailSpool]
+
+
+def _write_partition_record(handle: BinaryIO, fingerprint: int, sequence: int, data: bytes) -> None:
+    handle.write(_PARTITION_HEADER.pack(fingerprint, sequence, len(data)))
+    handle.write(data)
+
+
+def _read_partition_records(handle: BinaryIO) -> Iterator[Tuple[int, int, bytes]]:
+    handle.flush()
+    handle.seek(0)
+    while True:
+        header = handle.read(_PARTITION_HEADER.size)
+        if not header:
+            return
+        fingerprint, sequence, length = _PARTITION_HEADER.unpack(header)
+        yield fingerprint, sequence, handle.read(length)
+
+
+class EmailDeduplicator:
+    """
+    Collect emails in first-seen order, optionally dropping case-insensitive duplicates.
+
+    ``stream_emails`` selects the output container: a list, or an ``EmailSpool`` on disk.
+    ``memory_budget_bytes`` caps the in-memory fingerprint table; past it the deduplicator
+    switches to hash-partitioned spill files and resolves duplicates in ``finish()``. While
+    spilling, ``unique_count`` is None because uniqueness is only known after resolution.
+    ``key`` maps each email to its de-duplication key (default: the email itself, case-insensitively).
+    """
+
+    def __init__(
+        self,
+        *,
+        remove_duplicates: bool = True,
+        stream_emails: bool = False,
+        memory_budget_bytes: Optional[int] = None,
+        spill_partitions: int = DEFAULT_SPILL_PARTITIONS,
+        spill_dir: Optional[str] = None,
+        key: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        self._remove_duplicates = remove_duplicates
+        self._key = key
+        self._stream_emails = stream_emails
+        self._memory_budget_bytes = memory_budget_bytes
+        self._spill_partitions = spill_partitions
+        self._spill_dir = spill_dir
+        self._fingerprints: Optional[CompactHashSet] = CompactHashSet() if remove_duplicates else None
+        self._output: EmailCollection = self._new_output()
+        self._partitions: Optional[List[BinaryIO]] = None
+        self._sequence = 0
+
+    @property
+    def spilled(self) -> bool:
+        return self._partitions is not None
+
+    @property
+    def unique_count(self) -> Optional[int]:
+        return None if self.spilled else len(self._output)
+
+    def add(self, value: str) -> None:
+        if not self._remove_duplicates:
+            self._output.append(value)
+            return
+        fingerprint = self._fingerprint(value)
+        if self._fingerprints is None:
+            self._spill(fingerprint, value)
+            return
+        if not self._fingerprints.add(fingerprint):
+            return
+        self._output.append(value)
+        if self._memory_budget_bytes is not None and self._fingerprints.nbytes > self._memory_budget_bytes:
+            self._start_spill()
+
+    def finish(self) -> EmailCollection:
+        """Return the unique emails; the caller owns the result (close it when it is a spool)."""
+        if self._partitions is None:
+            return self._output
+        output = self._new_output()
+        try:
+            for value in self._resolve_partitions():
+                output.append(value)
+        except BaseException:
+            if isinstance(output, EmailSpool):
+                output.close()
+            raise
+        finally:
+            self._close_partitions()
+        logger.info("email_dedup.spill_resolved", extra={"unique": len(output), "candidates": self._sequence})
+        return output
+
+    def close(self) -> None:
+        """Release temporary files when the collection is abandoned before ``finish()``."""
+        self._close_partitions()
+        if isinstance(self._output, EmailSpool):
+            self._output.close()
+
+    def _fingerprint(self, value: str) -> int:
+        return email_fingerprint(self._key(value) if self._key is not None else value)
+
+    def _new_output(self) -> EmailCollection:
+        return EmailSpool(self._spill_dir) if self._stream_emails else []
+
+    def _spill(self, fingerprint: int, value: str) -> None:
+        assert self._partitions is not None
+        partition = self._partitions[fingerprint % self._spill_partitions]
+        _write_partition_record(partition, fingerprint, self._sequence, value.encode("utf-8"))
+        self._sequence += 1
+
+    def _start_spill(self) -> None:
+        logger.info(
+            "email_dedup.spill_started",
+            extra={
+                "unique": len(self._output),
+                "fingerprint_bytes": self._fingerprints.nbytes if self._fingerprints is not None else 0,
+                "partitions": self._spill_partitions,
+            },
+        )
+        self._partitions = [tempfile.TemporaryFile(dir=self._spill_dir) for _ in range(self._spill_partitions)]
+        previous = self._output
+        for value in previous:
+            self._spill(self._fingerprint(value), value)
+        if isinstance(previous, EmailSpool):
+            previous.close()
+        self._output = []
+        self._fingerprints = None
+
+    def _resolve_partitions(self) -> Iterator[str]:
+        assert self._partitions is not None
+        runs: List[BinaryIO] = []
+        try:
+            for partition in self._partitions:
+                # Each partition holds roughly 1/N of the fingerprints, so its table fits the budget.
+                seen = CompactHashSet()
+                run = tempfile.TemporaryFile(dir=self._spill_dir)
+                runs.append(run)
+                for fingerprint, sequence, data in _read_partition_records(partition):
+                    if seen.add(fingerprint):
+                        _write_partition_record(run, fingerprint, sequence, data)
+                partition.close()
+            # Partitions were appended in sequence order, so each run is sorted and a k-way merge restores file order.
+            merged = heapq.merge(*(_read_partition_records(run) for run in runs), key=lambda record: record[1])
+            for _, _, data in merged:
+                yield data.decode("utf-8")
+        finally:
+            for run in runs:
+                run.close()
+
+    def _close_partitions(self) -> None:
+        if self._partitions is None:
+            return
+        for partition in self._partitions:
+            partition.close()
+        self._partitions = None
@@ -0,0 +1,476 @@
+"""
+Durable local outbox for notification emails.
+
+When EMAIL_OUTBOX_PATH is configured, the webhook handler writes the email it would have sent to a
+SQLite outbox and then records the idempotency event, instead of talking to SMTP itself. A
+dispatcher started with the app delivers queued messages no faster than
+EMAIL_OUTBOX_RATE_PER_SECOND, retries failures with exponential backoff and marks messages dead
+after EMAIL_OUTBOX_MAX_ATTEMPTS. A failed send therefore no longer releases the idempotency record
+or makes the upstream redeliver the webhook. Each message has a unique key (the idempotency event
+id, or a hash of them for digests), so it is queued at most once. Completions waiting for a digest
+window to close are kept in the same database, so a restart does not lose them. A claimed message
+carries a lease that its worker renews until the send finishes; a message whose lease ran out (its
+worker died or hung) is claimed again, and at startup only such messages are returned to the
+queue. SQLite work runs in worker threads, never on the event loop.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager, closing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, AsyncIterator, Optional, Sequence
+
+import anyio
+
+from ..core.settings import get_settings
+from .smtp_mailer import (
+    DigestEntry,
+    SMTPConfigurationError,
+    SMTPDeliveryError,
+    deliver,
+    send_bulk_upload_digest_email,
+    send_bulk_upload_notification_email,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 3600.0
+SENT_RETENTION_SECONDS = 7 * 24 * 3600
+
+KIND_NOTIFICATION = "bulk_upload_notification"
+KIND_DIGEST = "bulk_upload_digest"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    finished_at REAL,
+    last_error TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+    ON email_outbox (status, next_attempt_at, id);
+CREATE TABLE IF NOT EXISTS email_outbox_digest_entries (
+    event_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    recipient_email TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    due_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_digest_entries_user
+    ON email_outbox_digest_entries (user_id, due_at);
+"""
+
+_STATE_LOCK = Lock()
+_INITIALIZED_PATHS: set[str] = set()
+_WAKE: Optional[anyio.Event] = None
+
+
+@dataclass
+class OutboxMessage:
+    id: int
+    message_key: str
+    kind: str
+    params: dict[str, Any]
+    attempts: int
+
+
+class _RateLimiter:
+    """Spaces sends at least 1/rate seconds apart across all dispatcher workers."""
+
+    def __init__(self, rate_per_second: float) -> None:
+        self._interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self._next_at = 0.0
+        self._lock = anyio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self._interval
+        if delay > 0:
+            await anyio.sleep(delay)
+
+
+def _outbox_path() -> Optional[Path]:
+    configured = (get_settings().email_outbox_path or "").strip()
+    return Path(configured) if configured else None
+
+
+def is_enabled() -> bool:
+    return _outbox_path() is not None
+
+
+def _connect() -> sqlite3.Connection:
+    path = _outbox_path()
+    if path is None:
+        raise RuntimeError("Email outbox is not configured")
+    key = str(path)
+    with _STATE_LOCK:
+        needs_init = key not in _INITIALIZED_PATHS
+    if needs_init:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(key, timeout=10)
+    if needs_init:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(email_outbox)")}
+        if "lease_expires_at" not in columns:
+            # Outboxes created before leases existed.
+            conn.execute("ALTER TABLE email_outbox ADD COLUMN lease_expires_at REAL")
+        conn.commit()
+        with _STATE_LOCK:
+            _INITIALIZED_PATHS.add(key)
+    return conn
+
+
+def _insert_message(conn: sqlite3.Connection, message_key: str, kind: str, params: dict[str, Any]) -> bool:
+    now = time.time()
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO email_outbox (message_key, kind, params, status, created_at, next_attempt_at)"
+        " VALUES (?, ?, ?, 'pending', ?, ?)",
+        (message_key, kind, json.dumps(params), now, now),
+    )
+    created = cursor.rowcount == 1
+    logger.info("email_outbox.enqueued", extra={"message_key": message_key, "kind": kind, "duplicate": not created})
+    return created
+
+
+def _enqueue(message_key: str, kind: str, params: dict[str, Any]) -> bool:
+    with closing(_connect()) as conn:
+        created = _insert_message(conn, message_key, kind, params)
+        conn.commit()
+    return created
+
+
+async def enqueue_notification(
+    *, message_key: str, recipient_email: str, outcome: str, file_name: str, email_count: int
+) -> bool:
+    """Queue one completion email. Returns False when ``message_key`` was already queued."""
+    params = {"recipient_email": recipient_email, "outcome": outcome, "file_name": file_name, "email_count": email_count}
+    created = await anyio.to_thread.run_sync(_enqueue, message_key, KIND_NOTIFICATION, params)
+    if created:
+        wake_dispatcher()
+    return created
+
+
+def withdraw_message(message_key: str) -> bool:
+    """Delete a queued message that no worker has picked up yet. Returns False when it was too late."""
+    with closing(_connect()) as conn:
+        cursor = conn.execute(
+            "DELETE FROM email_outbox WHERE message_key = ? AND status = 'pending' AND attempts = 0", (message_key,)
+        )
+        conn.commit()
+    return cursor.rowcount == 1
+
+
+def _digest_message(
+    event_ids: Sequence[str], recipient_email: str, entries: Sequence[DigestEntry]
+) -> tuple[str, str, dict[str, Any]]:
+    """The outbox message for a closed digest window: a plain notification when it holds one upload."""
+    if len(entries) == 1:
+        entry = entries[0]
+        params = {
+            "recipient_email": recipient_email,
+            "outcome": entry.outcome,
+            "file_name": entry.file_name,
+            "email_count": entry.email_count,
+        }
+        return event_ids[0], KIND_NOTIFICATION, params
+    # Keyed by the idempotency ids it answers for.
+    message_key = "bulk_upload_digest:" + hashlib.sha256("\n".join(sorted(event_ids)).encode("utf-8")).hexdigest()
+    return message_key, KIND_DIGEST, {"recipient_email": recipient_email, "entries": [asdict(entry) for entry in entries]}
+
+
+def add_digest_entry(
+    *, user_id: str, recipient_email: str, entry: DigestEntry, event_id: str, window_seconds: float
+) -> bool:
+    """
+    Persist a completion waiting for the user's digest window, opening the window when none is open.
+    Returns False when ``event_id`` is already waiting.
+    """
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        (open_due_at,) = conn.execute(
+            "SELECT MIN(due_at) FROM email_outbox_digest_entries WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO email_outbox_digest_entries (event_id, user_id, recipient_email, entry, due_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (event_id, user_id, recipient_email, json.dumps(asdict(entry)), open_due_at or now + window_seconds),
+        )
+        conn.commit()
+    return cursor.rowcount == 1
+
+
+def remove_digest_entry(event_id: str) -> bool:
+    with closing(_connect()) as conn:
+        cursor = conn.execute("DELETE FROM email_outbox_digest_entries WHERE event_id = ?", (event_id,))
+        conn.commit()
+    return cursor.rowcount == 1
+
+
+def next_digest_due_at() -> Optional[float]:
+    with closing(_connect()) as conn:
+        return conn.execute("SELECT MIN(due_at) FROM email_outbox_digest_entries").fetchone()[0]
+
+
+def queue_due_digests(now: Optional[float] = None) -> int:
+    """
+    Turn every digest window that has closed into one outbox message. The message is queued and
+    its entries removed in one transaction. Returns the number of windows queued; the caller wakes
+    the dispatcher.
+    """
+    now = time.time() if now is None else now
+    queued = 0
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        user_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT user_id FROM email_outbox_digest_entries GROUP BY user_id HAVING MIN(due_at) <= ?", (now,)
+            )
+        ]
+        for user_id in user_ids:
+            rows = conn.execute(
+                "SELECT event_id, recipient_email, entry FROM email_outbox_digest_entries"
+                " WHERE user_id = ? ORDER BY rowid",
+                (user_id,),
+            ).fetchall()
+            event_ids = [row[0] for row in rows]
+            entries = [DigestEntry(**json.loads(row[2])) for row in rows]
+            # The most recent completion carries the current recipient address.
+            _insert_message(conn, *_digest_message(event_ids, rows[-1][1], entries))
+            conn.execute("DELETE FROM email_outbox_digest_entries WHERE user_id = ?", (user_id,))
+            queued += 1
+        conn.commit()
+    return queued
+
+
+def wake_dispatcher() -> None:
+    """Let idle dispatcher workers look for due messages now. Call from the event loop only."""
+    if _WAKE is not None:
+        _WAKE.set()
+
+
+def claim_next_message(now: Optional[float] = None) -> Optional[OutboxMessage]:
+    now = time.time() if now is None else now
+    lease_expires_at = now + get_settings().email_outbox_lease_seconds
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # A message still 'sending' after its lease ran out was held by a worker that died or hung.
+        row = conn.execute(
+            "SELECT id, message_key, kind, params, attempts FROM email_outbox"
+            " WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND lease_expires_at <= ?)"
+            " ORDER BY next_attempt_at, id LIMIT 1",
+            (now, now),
+        ).fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        message_id, message_key, kind, params, attempts = row
+        conn.execute(
+            "UPDATE email_outbox SET status = 'sending', attempts = attempts + 1, lease_expires_at = ? WHERE id = ?",
+            (lease_expires_at, message_id),
+        )
+        conn.commit()
+    return OutboxMessage(
+        id=message_id, message_key=message_key, kind=kind, params=json.loads(params), attempts=attempts + 1
+    )
+
+
+def renew_lease(message_id: int) -> None:
+    with closing(_connect()) as conn:
+        conn.execute(
+            "UPDATE email_outbox SET lease_expires_at = ? WHERE id = ? AND status = 'sending'",
+            (time.time() + get_settings().email_outbox_lease_seconds, message_id),
+        )
+        conn.commit()
+
+
+def complete_message(message_id: int) -> None:
+    with closing(_connect()) as conn:
+        conn.execute(
+            "UPDATE email_outbox SET status = 'sent', finished_at = ?, last_error = NULL, lease_expires_at = NULL"
+            " WHERE id = ?",
+            (time.time(), message_id),
+        )
+        conn.commit()
+
+
+def fail_message(message: OutboxMessage, error: str) -> str:
+    """Schedule a retry with exponential backoff, or mark the message dead. Returns the new status."""
+    settings = get_settings()
+    now = time.time()
+    dead = message.attempts >= settings.email_outbox_max_attempts
+    delay = min(settings.email_outbox_retry_seconds * 2 ** (message.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+    status = "dead" if dead else "pending"
+    with closing(_connect()) as conn:
+        # Only the latest claim may reschedule: a worker whose lease was taken over must not reset the row.
+        conn.execute(
+            "UPDATE email_outbox SET status = ?, next_attempt_at = ?, finished_at = ?, last_error = ?,"
+            " lease_expires_at = NULL WHERE id = ? AND attempts = ?",
+            (status, now + delay, now if dead else None, error[:2000], message.id, message.attempts),
+        )
+        conn.commit()
+    return status
+
+
+def recover_interrupted_messages(now: Optional[float] = None) -> int:
+    """
+    Return messages left 'sending' by a stopped process to the queue. Messages whose lease is still
+    being renewed belong to another live process and are left alone.
+    """
+    now = time.time() if now is None else now
+    with closing(_connect()) as conn:
+        cursor = conn.execute(
+            "UPDATE email_outbox SET status = 'pending', lease_expires_at = NULL"
+            " WHERE status = 'sending' AND (lease_expires_at IS NULL OR lease_expires_at <= ?)",
+            (now,),
+        )
+        conn.commit()
+    return cursor.rowcount
+
+
+def prune_sent_messages(now: Optional[float] = None) -> int:
+    cutoff = (time.time() if now is None else now) - SENT_RETENTION_SECONDS
+    with closing(_connect()) as conn:
+        cursor = conn.execute(
+            "DELETE FROM email_outbox WHERE status IN ('sent', 'dead') AND finished_at < ?", (cutoff,)
+        )
+        conn.commit()
+    return cursor.rowcount
+
+
+async def _send(message: OutboxMessage) -> None:
+    params = message.params
+    if message.kind == KIND_DIGEST:
+        await deliver(
+            send_bulk_upload_digest_email,
+            recipient_email=params["recipient_email"],
+            entries=[DigestEntry(**entry) for entry in params["entries"]],
+        )
+    else:
+        await deliver(send_bulk_upload_notification_email, **params)
+
+
+async def _renew_lease_while_sending(message_id: int) -> None:
+    interval = get_settings().email_outbox_lease_seconds / 3
+    while True:
+        await anyio.sleep(interval)
+        try:
+            await anyio.to_thread.run_sync(renew_lease, message_id)
+        except sqlite3.Error as exc:
+            logger.warning("email_outbox.lease_renew_failed", extra={"message_id": message_id, "error": str(exc)})
+
+
+async def _attempt(message: OutboxMessage, limiter: Optional[_RateLimiter]) -> Optional[str]:
+    """Wait for the rate limiter and send; returns the error, or None once the message went out."""
+    if limiter is not None:
+        await limiter.wait()
+    try:
+        await _send(message)
+    except (SMTPConfigurationError, SMTPDeliveryError) as exc:
+        return f"{type(exc).__name__}: {exc}"
+    return None
+
+
+async def dispatch_next_message(limiter: Optional[_RateLimiter] = None) -> bool:
+    """Send one due message; returns False when nothing was due."""
+    message = await anyio.to_thread.run_sync(claim_next_message)
+    if message is None:
+        return False
+    start = time.time()
+    async with anyio.create_task_group() as task_group:
+        task_group.start_soon(_renew_lease_while_sending, message.id)
+        error = await _attempt(message, limiter)
+        task_group.cancel_scope.cancel()
+    if error is None:
+        await anyio.to_thread.run_sync(complete_message, message.id)
+        logger.info(
+            "email_outbox.sent",
+            extra={
+                "message_key": message.message_key,
+                "kind": message.kind,
+                "attempts": message.attempts,
+                "duration_ms": round((time.time() - start) * 1000, 2),
+            },
+        )
+        return True
+    status = await anyio.to_thread.run_sync(fail_message, message, error)
+    log = logger.error if status == "dead" else logger.warning
+    log(
+        "email_outbox.dead_lettered" if status == "dead" else "email_outbox.retry_scheduled",
+        extra={"message_key": message.message_key, "attempts": message.attempts, "error": error},
+    )
+    return True
+
+
+async def _run_worker(limiter: _RateLimiter, poll_seconds: float) -> None:
+    global _WAKE
+    while True:
+        try:
+            if await dispatch_next_message(limiter):
+                continue
+        except sqlite3.Error as exc:
+            logger.error("email_outbox.worker_error", extra={"error": str(exc)})
+        wake = _WAKE
+        if wake is None:
+            return
+        with anyio.move_on_after(poll_seconds):
+            await wake.wait()
+        if _WAKE is wake and wake.is_set():
+            _WAKE = anyio.Event()
+
+
+@asynccontextmanager
+async def run_email_outbox() -> AsyncIterator[None]:
+    """Run the outbox dispatcher for the lifetime of the context (no-op when the outbox is disabled)."""
+    global _WAKE
+    if not is_enabled():
+        yield
+        return
+    settings = get_settings()
+    recovered = await anyio.to_thread.run_sync(recover_interrupted_messages)
+    pruned = await anyio.to_thread.run_sync(prune_sent_messages)
+    logger.info(
+        "email_outbox.started",
+        extra={
+            "workers": settings.email_outbox_workers,
+            "rate_per_second": settings.email_outbox_rate_per_second,
+            "recovered": recovered,
+            "pruned": pruned,
+        },
+    )
+    limiter = _RateLimiter(settings.email_outbox_rate_per_second)
+    _WAKE = anyio.Event()
+    try:
+        async with anyio.create_task_group() as task_group:
+            for _ in range(settings.email_outbox_workers):
+                task_group.start_soon(_run_worker, limiter, settings.email_outbox_poll_seconds)
+            try:
+                yield
+            finally:
+                task_group.cancel_scope.cancel()
+    finally:
+        _WAKE = None
+        logger.info("email_outbox.stopped")
+
+
+def clear_email_outbox_state() -> None:
+    with _STATE_LOCK:
+        _INITIALIZED_PATHS.clear()
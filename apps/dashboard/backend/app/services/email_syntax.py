@@ -0,0 +1,66 @@
+"""
+Local, RFC-pragmatic email syntax pre-filter.
+
+Only addresses that can never be deliverable are rejected (missing or repeated ``@``, whitespace,
+empty or malformed labels, over-long parts), so the upstream verifier stays the authority for
+everything else. Rejected values are reported with the upstream ``invalid_syntax`` status.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Tuple
+
+from ..clients.external import EmailStatus
+
+INVALID_SYNTAX_STATUS = EmailStatus.invalid_syntax
+MAX_EMAIL_LENGTH = 254
+MAX_LOCAL_PART_LENGTH = 64
+DEFAULT_REJECTION_SAMPLE_LIMIT = 100
+
+# Dot-atom local parts allow any non-space character except specials; quoted local parts are accepted as-is.
+_ATOM = r"[^\s@\"(),:;<>\[\\\].]+"
+_LOCAL_PART = rf"(?:{_ATOM}(?:\.{_ATOM})*|\"(?:[^\"\\\r\n]|\\.)+\")"
+# Labels: letters, digits, hyphens (not at either end), or non-ASCII for internationalized domains.
+_LABEL = r"(?!-)(?:[A-Za-z0-9-]|[^\x00-\x7f])+(?<!-)"
+_DOMAIN = rf"(?:{_LABEL}(?:\.{_LABEL})+|\[[0-9A-Fa-f:.]+\])"
+_EMAIL_PATTERN = re.compile(rf"({_LOCAL_PART})@({_DOMAIN})")
+
+
+def is_plausible_email(value: str) -> bool:
+    if len(value) > MAX_EMAIL_LENGTH:
+        return False
+    match = _EMAIL_PATTERN.fullmatch(value)
+    if match is None:
+        return False
+    local_part, domain = match.groups()
+    if len(local_part) > MAX_LOCAL_PART_LENGTH:
+        return False
+    if domain.startswith("["):
+        return True
+    labels = domain.split(".")
+    # An all-numeric TLD means a bare IP or a typo, never a deliverable host name.
+    return all(len(label) <= 63 for label in labels) and not labels[-1].isdigit()
+
+
+def partition_emails(values: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Split values into (plausible, rejected), preserving order."""
+    accepted: List[str] = []
+    rejected: List[str] = []
+    check = is_plausible_email
+    for value in values:
+        (accepted if check(value) else rejected).append(value)
+    return accepted, rejected
+
+
+@dataclass
+class SyntaxRejections:
+    """Running count of rejected values plus a bounded sample for reporting."""
+
+    sample_limit: int = DEFAULT_REJECTION_SAMPLE_LIMIT
+    count: int = 0
+    samples: List[str] = field(default_factory=list)
+
+    def add(self, value: str) -> None:
+        self.count += 1
+        if len(self.samples) < self.sample_limit:
+            self.samples.append(value)
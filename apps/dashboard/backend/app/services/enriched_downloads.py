@@ -0,0 +1,117 @@
+"""
+Merge task results back into the customer's original upload ("enriched original file" downloads).
+"""
+
+import logging
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from ..clients.external import ExternalAPIClient, TaskEmailJob
+from ..core.settings import get_settings
+from . import storage, task_results_store
+from .file_processing import FileProcessingError, output_extension_for
+from .file_processing_pool import FileJobFailedError, FileJobTimeoutError, write_verified_output_file
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_MEDIA_TYPES = {
+    ".csv": "text/csv",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _write_job_lines(handle: BinaryIO, jobs: list[TaskEmailJob]) -> None:
+    handle.writelines(job.model_dump_json().encode("utf-8") + b"\n" for job in jobs)
+
+
+async def export_task_jobs(client: ExternalAPIClient, *, user_id: str, task_id: str, target: Path) -> int:
+    """
+    Write every job of a task to ``target`` as JSON lines and return how many were written.
+    Jobs come from the local results store when possible, otherwise one upstream page at a time.
+    """
+    if await task_results_store.ensure_task_loaded(client, user_id=user_id, task_id=task_id):
+        return await run_in_threadpool(task_results_store.export_task_jobs, user_id, task_id, target)
+    page_size = get_settings().task_results_store_page_size
+    job_count = 0
+    with target.open("wb") as handle:
+        async for page in task_results_store.iter_upstream_job_pages(client, task_id, page_size):
+            await run_in_threadpool(_write_job_lines, handle, page)
+            job_count += len(page)
+    return job_count
+
+
+async def build_enriched_download(
+    client: ExternalAPIClient,
+    *,
+    viewer_user_id: str,
+    owner_user_id: str,
+    task_id: str,
+) -> tuple[Path, str]:
+    """
+    Build the enriched file for one request and return (path, download name).
+    The path is unique to the request; callers delete it once the response has been sent.
+    """
+    original = storage.load_original_upload(owner_user_id, task_id)
+    if original is None:
+        logger.info(
+            "enriched_download.original_missing",
+            extra={"user_id": owner_user_id, "task_id": task_id},
+        )
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Original file is not available for this task")
+
+    start = time.time()
+    try:
+        suffix = output_extension_for(original.file_name)
+        named_path, output_name = storage.build_output_path(owner_user_id, original.file_name, task_id, suffix)
+        # Each request writes its own file, so concurrent downloads of one task never share a path.
+        request_id = uuid.uuid4().hex
+        output_path = named_path.with_name(f"{named_path.stem}-{request_id}{named_path.suffix}")
+        jobs_path = named_path.with_name(f"{named_path.stem}-{request_id}.jobs.jsonl")
+        try:
+            job_count = await export_task_jobs(client, user_id=viewer_user_id, task_id=task_id, target=jobs_path)
+            await write_verified_output_file(
+                original.path,
+                output_path,
+                original.email_column_index,
+                original.first_row_has_labels,
+                jobs_path,
+                job_count,
+                skip_disposable=original.skip_disposable,
+            )
+        except BaseException:
+            output_path.unlink(missing_ok=True)
+            raise
+        finally:
+            jobs_path.unlink(missing_ok=True)
+    except FileProcessingError as exc:
+        logger.warning(
+            "enriched_download.write_failed",
+            extra={"user_id": owner_user_id, "task_id": task_id, "error": str(exc), "details": exc.details},
+        )
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    except FileJobTimeoutError as exc:
+        logger.warning("enriched_download.timeout", extra={"user_id": owner_user_id, "task_id": task_id})
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Building the file took too long") from exc
+    except FileJobFailedError as exc:
+        logger.error(
+            "enriched_download.job_failed",
+            extra={"user_id": owner_user_id, "task_id": task_id, "error": str(exc)},
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to build the file"
+        ) from exc
+    logger.info(
+        "enriched_download.built",
+        extra={
+            "user_id": owner_user_id,
+            "task_id": task_id,
+            "jobs": job_count,
+            "duration_ms": round((time.time() - start) * 1000, 2),
+        },
+    )
+    return output_path, output_name
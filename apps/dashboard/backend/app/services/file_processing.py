@@ -1,19 +1,35 @@
 import csv
 import io
 import logging
+from contextlib import contextmanager
 from dataclasses import dataclass
 from itertools import chain
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Sequence, Sized, Union
 
 import openpyxl
 import xlrd
-import xlwt
+
+from . import columnar_parsing
+from .email_canonical import CanonicalLookup, canonical_email
+from .email_classification import SKIPPED_DISPOSABLE_STATUS, ClassificationIndex, get_classification_index
+from .email_dedup import EmailCollection, EmailDeduplicator, EmailSpool
+from .email_syntax import INVALID_SYNTAX_STATUS, SyntaxRejections, is_plausible_email
+from .results_index import ResultsIndex, ResultsLookup, estimate_index_bytes, sorted_merge_results
 
 logger = logging.getLogger(__name__)
 
 SUPPORTED_EXTENSIONS = {".csv", ".xlsx", ".xls"}
+# Legacy .xls sources are written back as .xlsx through the streaming write-only writer.
+OUTPUT_EXTENSIONS = {".csv": ".csv", ".xlsx": ".xlsx", ".xls": ".xlsx"}
 OUTPUT_COLUMNS = ["verification_status", "is_role_based", "validated_at"]
+CSV_SNIFF_SAMPLE_CHARS = 2048
+# Without a candidate list the sniffer happily picks a letter that repeats on every line of a one-column file.
+CSV_DELIMITERS = ",;\t|"
+PARSING_ENGINES = {"auto", "python"}
+
+# Uploads may arrive as in-memory bytes, a path on disk, or an open binary stream (e.g. a spooled file).
+UploadSource = Union[bytes, Path, BinaryIO]
 
 
 class FileProcessingError(Exception):
@@ -24,8 +40,16 @@ class FileProcessingError(Exception):
 
 @dataclass
 class ParsedEmails:
-    emails: List[str]
+    # A list by default; an on-disk EmailSpool when parsing with stream_emails=True (close it when done).
+    emails: EmailCollection
     email_column_index: int
+    engine: str = "python"
+    # Populated when parsing with syntax_filter=True; rejected values are excluded from emails.
+    syntax_rejections: Optional[SyntaxRejections] = None
+
+    def close(self) -> None:
+        if isinstance(self.emails, EmailSpool):
+            self.emails.close()
 
 
 def _column_letters_to_index(value: str) -> Optional[int]:
@@ -75,161 +99,319 @@ def _collect_emails(
     email_column_index: int,
     remove_duplicates: bool,
     max_emails: Optional[int],
-) -> List[str]:
-    emails: List[str] = []
-    seen = set()
-    for row in rows:
-        if email_column_index >= len(row):
-            continue
-        value = _normalize_email(row[email_column_index])
-        if not value:
-            continue
-        key = value.lower()
-        if remove_duplicates:
-            if key in seen:
+    *,
+    stream_emails: bool = False,
+    memory_budget_bytes: Optional[int] = None,
+    syntax_rejections: Optional[SyntaxRejections] = None,
+    canonical_dedup: bool = False,
+) -> EmailCollection:
+    deduplicator = EmailDeduplicator(
+        remove_duplicates=remove_duplicates,
+        stream_emails=stream_emails,
+        memory_budget_bytes=memory_budget_bytes,
+        key=canonical_email if canonical_dedup else None,
+    )
+    try:
+        for row in rows:
+            if email_column_index >= len(row):
                 continue
-            seen.add(key)
-        emails.append(value)
-        if max_emails is not None and len(emails) > max_emails:
-            raise FileProcessingError(
-                "Email count exceeds the maximum allowed",
-                details={"max_emails": max_emails, "seen": len(emails)},
-            )
+            value = _normalize_email(row[email_column_index])
+            if not value:
+                continue
+            if syntax_rejections is not None and not is_plausible_email(value):
+                syntax_rejections.add(value)
+                continue
+            deduplicator.add(value)
+            seen = deduplicator.unique_count
+            if max_emails is not None and seen is not None and seen > max_emails:
+                raise FileProcessingError(
+                    "Email count exceeds the maximum allowed",
+                    details={"max_emails": max_emails, "seen": seen},
+                )
+        emails = deduplicator.finish()
+    except BaseException:
+        deduplicator.close()
+        raise
+    # After a spill the unique count is only known once duplicates have been resolved.
+    if max_emails is not None and len(emails) > max_emails:
+        if isinstance(emails, EmailSpool):
+            emails.close()
+        raise FileProcessingError(
+            "Email count exceeds the maximum allowed",
+            details={"max_emails": max_emails, "seen": len(emails)},
+        )
     return emails
 
 
+@dataclass(frozen=True)
+class _CollectOptions:
+    remove_duplicates: bool
+    max_emails: Optional[int]
+    stream_emails: bool = False
+    memory_budget_bytes: Optional[int] = None
+    engine: str = "auto"
+    syntax_filter: bool = False
+    canonical_dedup: bool = False
+
+    @property
+    def columnar(self) -> bool:
+        return self.engine == "auto" and columnar_parsing.is_available()
+
+    def collect(
+        self, rows: Iterable[Sequence[object]], email_column_index: int
+    ) -> tuple[EmailCollection, Optional[SyntaxRejections]]:
+        rejections = SyntaxRejections() if self.syntax_filter else None
+        emails = _collect_emails(
+            rows,
+            email_column_index,
+            self.remove_duplicates,
+            self.max_emails,
+            stream_emails=self.stream_emails,
+            memory_budget_bytes=self.memory_budget_bytes,
+            syntax_rejections=rejections,
+            canonical_dedup=self.canonical_dedup,
+        )
+        return emails, rejections
+
+
+def _build_parsed_emails(
+    emails: EmailCollection,
+    email_column_index: int,
+    syntax_rejections: Optional[SyntaxRejections] = None,
+    engine: str = "python",
+) -> ParsedEmails:
+    parsed = ParsedEmails(
+        emails=emails,
+        email_column_index=email_column_index,
+        engine=engine,
+        syntax_rejections=syntax_rejections,
+    )
+    if not emails:
+        parsed.close()
+        raise FileProcessingError("No emails found in the selected column")
+    return parsed
+
+
 def _detect_csv_dialect(sample: str) -> csv.Dialect:
     try:
-        return csv.Sniffer().sniff(sample)
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS)
     except csv.Error as exc:
+        if not any(delimiter in sample for delimiter in CSV_DELIMITERS):
+            # A single-column file (a plain list of emails) has no delimiter to detect.
+            return csv.excel
+
         logger.warning("file.csv.dialect_detect_failed", extra={"error": str(exc)})
         raise FileProcessingError("Unable to detect CSV delimiter. Please upload a standard comma-separated CSV.") from exc
 
 
-def _parse_csv(
-    data: bytes,
-    email_column: str,
-    first_row_has_labels: bool,
-    remove_duplicates: bool,
-    max_emails: Optional[int],
-) -> ParsedEmails:
+@contextmanager
+def _open_binary(source: UploadSource) -> Iterator[BinaryIO]:
+    if isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+    elif isinstance(source, Path):
+        with source.open("rb") as stream:
+            yield stream
+    else:
+        yield source
+
+
+def _guard_csv_decode(rows: Iterator[List[str]]) -> Iterator[List[str]]:
     try:
-        text = data.decode("utf-8-sig")
+        yield from rows
     except UnicodeDecodeError as exc:
         logger.warning("file.csv.decode_failed", extra={"error": str(exc)})
         raise FileProcessingError("CSV must be UTF-8 encoded") from exc
 
-    sample = text[:2048]
+
+def _open_csv_reader(stream: BinaryIO) -> tuple[csv.Dialect, Iterator[List[str]]]:
+    """
+    Decode a binary CSV stream incrementally. Only the sniffing sample is held as a string;
+    the remaining rows are decoded and parsed lazily, one buffered chunk at a time.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        sample = text_stream.read(CSV_SNIFF_SAMPLE_CHARS)
+        # Finish the current line so the sample can be replayed to the reader without splitting a row.
+        sample_tail = text_stream.readline()
+    except UnicodeDecodeError as exc:
+        logger.warning("file.csv.decode_failed", extra={"error": str(exc)})
+        raise FileProcessingError("CSV must be UTF-8 encoded") from exc
     dialect = _detect_csv_dialect(sample)
-    reader = csv.reader(io.StringIO(text), dialect)
-    first_row = next(reader, None)
-    if first_row is None:
-        raise FileProcessingError("CSV file is empty")
-    headers = [str(value).strip() for value in first_row]
-    email_column_index = _resolve_column_index(headers, email_column, first_row_has_labels)
-    if email_column_index >= len(headers):
-        raise FileProcessingError("Selected email column is outside the available columns")
-
-    rows_iter: Iterable[Sequence[object]] = reader if first_row_has_labels else chain([first_row], reader)
-
-    emails = _collect_emails(rows_iter, email_column_index, remove_duplicates, max_emails)
-    if not emails:
-        raise FileProcessingError("No emails found in the selected column")
-    return ParsedEmails(emails=emails, email_column_index=email_column_index)
+    lines = chain(io.StringIO(sample + sample_tail, newline=""), text_stream)
+    return dialect, _guard_csv_decode(csv.reader(lines, dialect))
+
+
+def _parse_csv_columnar(
+    data: Union[bytes, Path],
+    dialect: csv.Dialect,
+    email_column_index: int,
+    first_row_has_labels: bool,
+    options: _CollectOptions,
+) -> Optional[ParsedEmails]:
+    """Collect the email column through the Arrow reader; None asks for the row-based parser."""
+    if dialect.skipinitialspace or dialect.escapechar:
+        return None
+    values = columnar_parsing.iter_csv_column(
+        data,
+        column_index=email_column_index,
+        delimiter=dialect.delimiter,
+        quotechar=dialect.quotechar,
+        doublequote=dialect.doublequote,
+        skip_header=first_row_has_labels,
+    )
+    try:
+        emails, rejections = options.collect(([value] for value in values), 0)
+    except columnar_parsing.ColumnarReadError:
+        # The collector released its partial output; the caller starts over row by row.
+        return None
+    return _build_parsed_emails(emails, email_column_index, rejections, engine="arrow")
+
+
+def _parse_csv(
+    data: UploadSource,
+    email_column: str,
+    first_row_has_labels: bool,
+    options: _CollectOptions,
+) -> ParsedEmails:
+    with _open_binary(data) as stream:
+        dialect, reader = _open_csv_reader(stream)
+        first_row = next(reader, None)
+        if first_row is None:
+            raise FileProcessingError("CSV file is empty")
+        headers = [str(value).strip() for value in first_row]
+        email_column_index = _resolve_column_index(headers, email_column, first_row_has_labels)
+        if email_column_index >= len(headers):
+            raise FileProcessingError("Selected email column is outside the available columns")
+
+        if options.columnar and isinstance(data, (bytes, bytearray, Path)):
+            parsed = _parse_csv_columnar(data, dialect, email_column_index, first_row_has_labels, options)
+            if parsed is not None:
+                return parsed
+
+        rows_iter: Iterable[Sequence[object]] = reader if first_row_has_labels else chain([first_row], reader)
+
+        emails, rejections = options.collect(rows_iter, email_column_index)
+    return _build_parsed_emails(emails, email_column_index, rejections)
 
 
 def _parse_xlsx(
-    data: bytes,
+    data: UploadSource,
     email_column: str,
     first_row_has_labels: bool,
-    remove_duplicates: bool,
-    max_emails: Optional[int],
+    options: _CollectOptions,
 ) -> ParsedEmails:
-    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
-    if len(workbook.sheetnames) > 1:
-        raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
-    sheet = workbook[workbook.sheetnames[0]]
-    rows = sheet.iter_rows(values_only=True)
-    first_row = next(rows, None)
-    if first_row is None:
-        raise FileProcessingError("Excel file is empty")
-    headers = [str(value).strip() if value is not None else "" for value in first_row]
-    email_column_index = _resolve_column_index(headers, email_column, first_row_has_labels)
-    if email_column_index >= len(headers):
-        raise FileProcessingError("Selected email column is outside the available columns")
-
-    rows_iter = rows if first_row_has_labels else chain([first_row], rows)
-
-    emails = _collect_emails(rows_iter, email_column_index, remove_duplicates, max_emails)
-    if not emails:
-        raise FileProcessingError("No emails found in the selected column")
-    return ParsedEmails(emails=emails, email_column_index=email_column_index)
+    workbook = openpyxl.load_workbook(
+        io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data, read_only=True, data_only=True
+    )
+    # Read-only workbooks keep the archive open until closed; without this each parse leaks a file handle.
+    try:
+        if len(workbook.sheetnames) > 1:
+            raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
+        sheet = workbook[workbook.sheetnames[0]]
+        first_row = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        if first_row is None:
+            raise FileProcessingError("Excel file is empty")
+        headers = [str(value).strip() if value is not None else "" for value in first_row]
+        email_column_index = _resolve_column_index(headers, email_column, first_row_has_labels)
+        if email_column_index >= len(headers):
+            raise FileProcessingError("Selected email column is outside the available columns")
+
+        # Project only the email column so cells in other columns are never materialized.
+        column = email_column_index + 1
+        rows_iter = sheet.iter_rows(
+            min_row=2 if first_row_has_labels else 1,
+            min_col=column,
+            max_col=column,
+            values_only=True,
+        )
+
+        emails, rejections = options.collect(rows_iter, 0)
+    finally:
+        workbook.close()
+    return _build_parsed_emails(emails, email_column_index, rejections)
+
+
+def _open_xls_workbook(data: UploadSource) -> "xlrd.book.Book":
+    # on_demand defers loading sheets until they are requested; a path lets xlrd mmap the file instead of copying it.
+    if isinstance(data, Path):
+        return xlrd.open_workbook(str(data), on_demand=True)
+    contents = data if isinstance(data, (bytes, bytearray)) else data.read()
+    return xlrd.open_workbook(file_contents=contents, on_demand=True)
 
 
 def _parse_xls(
-    data: bytes,
+    data: UploadSource,
     email_column: str,
     first_row_has_labels: bool,
-    remove_duplicates: bool,
-    max_emails: Optional[int],
+    options: _CollectOptions,
 ) -> ParsedEmails:
-    workbook = xlrd.open_workbook(file_contents=data)
-    if workbook.nsheets > 1:
-        raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
-    sheet = workbook.sheet_by_index(0)
-    if sheet.nrows == 0:
-        raise FileProcessingError("Excel file is empty")
-    first_row = sheet.row_values(0)
-    headers = [str(value).strip() if value is not None else "" for value in first_row]
-    email_column_index = _resolve_column_index(headers, email_column, first_row_has_labels)
-    if email_column_index >= len(headers):
-        raise FileProcessingError("Selected email column is outside the available columns")
-
-    rows: List[Sequence[object]] = []
-    start_row = 1 if first_row_has_labels else 0
-    for row_index in range(start_row, sheet.nrows):
-        rows.append(sheet.row_values(row_index))
-
-    emails = _collect_emails(rows, email_column_index, remove_duplicates, max_emails)
-    if not emails:
-        raise FileProcessingError("No emails found in the selected column")
-    return ParsedEmails(emails=emails, email_column_index=email_column_index)
+    workbook = _open_xls_workbook(data)
+    try:
+        if workbook.nsheets > 1:
+            raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
+        sheet = workbook.sheet_by_index(0)
+        if sheet.nrows == 0:
+            raise FileProcessingError("Excel file is empty")
+        first_row = sheet.row_values(0)
+        headers = [str(value).strip() if value is not None else "" for value in first_row]
+        email_column_index = _resolve_column_index(headers, email_column, first_row_has_labels)
+        if email_column_index >= len(headers):
+            raise FileProcessingError("Selected email column is outside the available columns")
+
+        start_row = 1 if first_row_has_labels else 0
+        rows_iter = (
+            (sheet.cell_value(row_index, email_column_index),) for row_index in range(start_row, sheet.nrows)
+        )
+        emails, rejections = options.collect(rows_iter, 0)
+    finally:
+        workbook.release_resources()
+    return _build_parsed_emails(emails, email_column_index, rejections)
 
 
 def parse_emails_from_upload(
     filename: str,
-    data: bytes,
+    data: UploadSource,
     email_column: str,
     first_row_has_labels: bool,
     remove_duplicates: bool,
     max_emails: Optional[int],
+    *,
+    stream_emails: bool = False,
+    dedup_memory_budget_bytes: Optional[int] = None,
+    engine: str = "auto",
+    syntax_filter: bool = False,
+    canonical_dedup: bool = False,
 ) -> ParsedEmails:
+    """
+    Extract emails from the selected column of an upload.
+
+    ``stream_emails`` spools unique emails to disk instead of building a list, and
+    ``dedup_memory_budget_bytes`` bounds the duplicate-tracking table before it spills to disk.
+    ``engine="auto"`` reads the CSV email column with the pyarrow streaming reader when it is
+    installed, falling back to rows when it cannot; ``engine="python"`` always uses the row parser. ``syntax_filter`` drops values
+    that fail the local syntax check and reports them in ``ParsedEmails.syntax_rejections``.
+    ``canonical_dedup`` de-duplicates by provider-canonical mailbox (see ``email_canonical``) and
+    keeps the first spelling of each mailbox.
+    """
     extension = Path(filename).suffix.lower()
     if extension not in SUPPORTED_EXTENSIONS:
         raise FileProcessingError("Unsupported file type", details={"extension": extension})
+    if engine not in PARSING_ENGINES:
+        raise ValueError(f"Unknown parsing engine: {engine}")
+    options = _CollectOptions(
+        remove_duplicates=remove_duplicates,
+        max_emails=max_emails,
+        stream_emails=stream_emails,
+        memory_budget_bytes=dedup_memory_budget_bytes,
+        engine=engine,
+        syntax_filter=syntax_filter,
+        canonical_dedup=canonical_dedup,
+    )
     if extension == ".csv":
-        return _parse_csv(data, email_column, first_row_has_labels, remove_duplicates, max_emails)
+        return _parse_csv(data, email_column, first_row_has_labels, options)
     if extension == ".xlsx":
-        return _parse_xlsx(data, email_column, first_row_has_labels, remove_duplicates, max_emails)
-    return _parse_xls(data, email_column, first_row_has_labels, remove_duplicates, max_emails)
-
-
-def _build_results_map(details: dict) -> dict:
-    results: dict[str, dict] = {}
-    for job in details.get("jobs") or []:
-        email = job.get("email") or {}
-        email_address = job.get("email_address") or email.get("email_address")
-        if not email_address:
-            continue
-        key = str(email_address).strip().lower()
-        if not key:
-            continue
-        results[key] = {
-            "verification_status": email.get("status") or job.get("status"),
-            "is_role_based": email.get("is_role_based"),
-            "validated_at": email.get("validated_at"),
-        }
-    return results
+        return _parse_xlsx(data, email_column, first_row_has_labels, options)
+    return _parse_xls(data, email_column, first_row_has_labels, options)
 
 
 def _append_output_columns(values: list, result: dict) -> list:
@@ -240,25 +422,147 @@ def _append_output_columns(values: list, result: dict) -> list:
     ]
 
 
+def output_extension_for(filename: str) -> str:
+    extension = Path(filename).suffix.lower()
+    if extension not in OUTPUT_EXTENSIONS:
+        raise FileProcessingError("Unsupported file type", details={"extension": extension})
+    return OUTPUT_EXTENSIONS[extension]
+
+
 def write_verified_output(
     source_path: Path,
     output_path: Path,
     email_column_index: int,
     first_row_has_labels: bool,
     task_detail: dict,
+    classification_index_path: Optional[str] = None,
+    join_memory_budget_bytes: Optional[int] = None,
+    canonical_dedup: bool = False,
+    *,
+    job_count: Optional[int] = None,
+    skip_disposable: bool = False,
 ) -> None:
+    """
+    Write the source rows plus OUTPUT_COLUMNS to output_path (see output_extension_for for its format).
+
+    ``task_detail["jobs"]`` is read once and may be a lazy iterator; pass ``job_count`` when it has
+    no length. Results are joined through an in-memory ``ResultsIndex`` unless it would exceed
+    ``join_memory_budget_bytes`` (or the job count is unknown); then an on-disk sorted-merge join is
+    used instead. With ``canonical_dedup`` rows are matched by canonical mailbox, so every spelling
+    gets its result. Rows that were never sent upstream get a local status instead of a blank one
+    (see ``LocalStatusLookup``); ``skip_disposable`` says disposable addresses were left out.
+    """
     extension = source_path.suffix.lower()
     if extension not in SUPPORTED_EXTENSIONS:
         raise FileProcessingError("Unsupported file type", details={"extension": extension})
 
-    results_map = _build_results_map(task_detail)
+    classification = get_classification_index(classification_index_path) if classification_index_path else None
+    key = canonical_email if canonical_dedup else None
+    jobs = task_detail.get("jobs") or []
+    result_count = len(jobs) if isinstance(jobs, Sized) else job_count
+    if join_memory_budget_bytes is not None and (
+        result_count is None or estimate_index_bytes(result_count) > join_memory_budget_bytes
+    ):
+        logger.info(
+            "file_processing.sorted_merge_join",
+            extra={"results": result_count, "memory_budget_bytes": join_memory_budget_bytes},
+        )
+        row_keys = _iter_output_keys(source_path, email_column_index, first_row_has_labels)
+        if canonical_dedup:
+            row_keys = (canonical_email(key) if key else key for key in row_keys)
+        with sorted_merge_results(task_detail, row_keys, classification, key=key) as merged:
+            results = LocalStatusLookup(
+                CanonicalLookup(merged) if canonical_dedup else merged, classification if skip_disposable else None
+            )
+            _write_output(extension, source_path, output_path, email_column_index, first_row_has_labels, results)
+        return
+    results_index = ResultsIndex.from_task_detail(task_detail, classification, key=key)
+    results = LocalStatusLookup(
+        CanonicalLookup(results_index) if canonical_dedup else results_index,
+        classification if skip_disposable else None,
+    )
+    _write_output(extension, source_path, output_path, email_column_index, first_row_has_labels, results)
+
+
+class LocalStatusLookup:
+    """
+    Fill in the status of rows the upload parse kept out of the upstream task, which therefore have
+    no result: values failing the syntax pre-filter get ``invalid_syntax``, and with a
+    classification (disposable addresses were skipped) disposable ones get ``skipped_disposable``.
+    """
+
+    def __init__(
+        self, results: Union[ResultsLookup, CanonicalLookup], classification: Optional[ClassificationIndex] = None
+    ) -> None:
+        self._results = results
+        self._classification = classification
+
+    def get(self, key: str, default: Any = None) -> Any:
+        result = self._results.get(key)
+        if result is not None or not key:
+            return default if result is None else result
+        if not is_plausible_email(key):
+            return {"verification_status": INVALID_SYNTAX_STATUS}
+        if self._classification is not None and self._classification.classify(key).is_disposable:
+            return {"verification_status": SKIPPED_DISPOSABLE_STATUS}
+        return default
+
+
+def _write_output(
+    extension: str,
+    source_path: Path,
+    output_path: Path,
+    email_column_index: int,
+    first_row_has_labels: bool,
+    results: LocalStatusLookup,
+) -> None:
     if extension == ".csv":
-        _write_csv_output(source_path, output_path, email_column_index, first_row_has_labels, results_map)
+        _write_csv_output(source_path, output_path, email_column_index, first_row_has_labels, results)
         return
     if extension == ".xlsx":
-        _write_xlsx_output(source_path, output_path, email_column_index, first_row_has_labels, results_map)
+        _write_xlsx_output(source_path, output_path, email_column_index, first_row_has_labels, results)
         return
-    _write_xls_output(source_path, output_path, email_column_index, first_row_has_labels, results_map)
+    _write_xls_output(source_path, output_path, email_column_index, first_row_has_labels, results)
+
+
+def _output_key(value: object) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+def _iter_output_keys(source_path: Path, email_column_index: int, first_row_has_labels: bool) -> Iterator[str]:
+    """Yield the lookup key of every data row, in the order the output writers visit them."""
+    extension = source_path.suffix.lower()
+    if extension == ".csv":
+        with source_path.open("rb") as source:
+            _, reader = _open_csv_reader(source)
+            for row_index, row in enumerate(reader):
+                if row_index == 0 and first_row_has_labels:
+                    continue
+                yield _output_key(row[email_column_index] if email_column_index < len(row) else "")
+        return
+    if extension == ".xlsx":
+        workbook = openpyxl.load_workbook(source_path, read_only=True)
+        try:
+            sheet = workbook[workbook.sheetnames[0]]
+            column = email_column_index + 1
+            rows = sheet.iter_rows(min_col=column, max_col=column, values_only=True)
+            for row_index, row in enumerate(rows):
+                if row_index == 0 and first_row_has_labels:
+                    continue
+                yield _output_key(row[0] if row else None)
+        finally:
+            workbook.close()
+        return
+    workbook = _open_xls_workbook(source_path)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for row_index in range(sheet.nrows):
+            if row_index == 0 and first_row_has_labels:
+                continue
+            row = sheet.row_values(row_index, email_column_index, email_column_index + 1)
+            yield _output_key(row[0] if row else None)
+    finally:
+        workbook.release_resources()
 
 
 def _write_csv_output(
@@ -266,21 +570,17 @@ def _write_csv_output(
     output_path: Path,
     email_column_index: int,
     first_row_has_labels: bool,
-    results_map: dict,
+    results_map: LocalStatusLookup,
 ) -> None:
-    text = source_path.read_text(encoding="utf-8-sig")
-    dialect = _detect_csv_dialect(text[:2048])
-    reader = csv.reader(io.StringIO(text), dialect)
-
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8", newline="") as out_file:
+    with source_path.open("rb") as source, output_path.open("w", encoding="utf-8", newline="") as out_file:
+        dialect, reader = _open_csv_reader(source)
         writer = csv.writer(out_file, dialect)
         for row_index, row in enumerate(reader):
             if row_index == 0 and first_row_has_labels:
                 writer.writerow(row + OUTPUT_COLUMNS)
                 continue
-            email_value = row[email_column_index] if email_column_index < len(row) else ""
-            key = str(email_value).strip().lower()
+            key = _output_key(row[email_column_index] if email_column_index < len(row) else "")
             result = results_map.get(key, {})
             writer.writerow(_append_output_columns(list(row), result))
 
@@ -290,25 +590,43 @@ def _write_xlsx_output(
     output_path: Path,
     email_column_index: int,
     first_row_has_labels: bool,
-    results_map: dict,
+    results_map: LocalStatusLookup,
 ) -> None:
-    workbook = openpyxl.load_workbook(source_path)
-    if len(workbook.sheetnames) > 1:
-        raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
-    sheet = workbook[workbook.sheetnames[0]]
-    start_col = sheet.max_column + 1
-    if first_row_has_labels:
-        for offset, column_name in enumerate(OUTPUT_COLUMNS):
-            sheet.cell(row=1, column=start_col + offset, value=column_name)
-    for row_idx in range(1 if not first_row_has_labels else 2, sheet.max_row + 1):
-        email_cell = sheet.cell(row=row_idx, column=email_column_index + 1).value
-        key = str(email_cell).strip().lower() if email_cell is not None else ""
-        result = results_map.get(key, {})
-        values = _append_output_columns([], result)
-        for offset, value in enumerate(values):
-            sheet.cell(row=row_idx, column=start_col + offset, value=value)
+    # Stream rows from a read-only source into a write-only workbook so memory stays flat for large sheets.
+    # Write-only output keeps cell values (and formulas) but not the source styling.
+    source = openpyxl.load_workbook(source_path, read_only=True)
+    try:
+        if len(source.sheetnames) > 1:
+            raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
+        sheet = source[source.sheetnames[0]]
+        if sheet.max_column is None:
+            # Workbooks without a <dimension> record need one streaming pass to learn the sheet width.
+            sheet.calculate_dimension(force=True)
+        width = sheet.max_column or 1
+        rows = sheet.iter_rows(min_row=1, max_col=width, values_only=True)
+        _write_streaming_xlsx(output_path, sheet.title, rows, email_column_index, first_row_has_labels, results_map)
+    finally:
+        source.close()
+
+
+def _write_streaming_xlsx(
+    output_path: Path,
+    title: str,
+    rows: Iterable[Sequence[object]],
+    email_column_index: int,
+    first_row_has_labels: bool,
+    results_map: LocalStatusLookup,
+) -> None:
+    out_book = openpyxl.Workbook(write_only=True)
+    out_sheet = out_book.create_sheet(title=title)
+    for row_index, row in enumerate(rows):
+        if row_index == 0 and first_row_has_labels:
+            out_sheet.append(list(row) + OUTPUT_COLUMNS)
+            continue
+        key = _output_key(row[email_column_index] if email_column_index < len(row) else None)
+        out_sheet.append(_append_output_columns(list(row), results_map.get(key, {})))
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    workbook.save(output_path)
+    out_book.save(output_path)
 
 
 def _write_xls_output(
@@ -316,29 +634,15 @@ def _write_xls_output(
     output_path: Path,
     email_column_index: int,
     first_row_has_labels: bool,
-    results_map: dict,
+    results_map: LocalStatusLookup,
 ) -> None:
-    workbook = xlrd.open_workbook(source_path)
-    if workbook.nsheets > 1:
-        raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
-    sheet = workbook.sheet_by_index(0)
-    out_book = xlwt.Workbook()
-    out_sheet = out_book.add_sheet(sheet.name)
-
-    start_col = sheet.ncols
-    for row_idx in range(sheet.nrows):
-        row_values = sheet.row_values(row_idx)
-        for col_idx, value in enumerate(row_values):
-            out_sheet.write(row_idx, col_idx, value)
-        if row_idx == 0 and first_row_has_labels:
-            for offset, column_name in enumerate(OUTPUT_COLUMNS):
-                out_sheet.write(row_idx, start_col + offset, column_name)
-            continue
-        email_value = row_values[email_column_index] if email_column_index < len(row_values) else ""
-        key = str(email_value).strip().lower() if email_value is not None else ""
-        result = results_map.get(key, {})
-        values = _append_output_columns([], result)
-        for offset, value in enumerate(values):
-            out_sheet.write(row_idx, start_col + offset, value)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    out_book.save(str(output_path))
+    # Legacy sources are streamed into .xlsx; writing .xls would need xlwt's fully in-memory workbook.
+    workbook = _open_xls_workbook(source_path)
+    try:
+        if workbook.nsheets > 1:
+            raise FileProcessingError("Multiple sheets detected. Please upload one sheet per file.")
+        sheet = workbook.sheet_by_index(0)
+        rows = (sheet.row_values(row_index) for row_index in range(sheet.nrows))
+        _write_streaming_xlsx(output_path, sheet.name, rows, email_column_index, first_row_has_labels, results_map)
+    finally:
+        workbook.release_resources()
@@ -0,0 +1,391 @@
+"""
+Run CPU-bound file parsing and output generation outside the API process.
+
+Each job runs in its own child process forked from a forkserver that has already imported the
+file-processing modules, so a job starts quickly and can be killed on timeout or cancellation
+without affecting other jobs. Concurrency is capped by ``FILE_PROCESSING_WORKERS``. Inputs and
+outputs are exchanged as file paths; only a small JSON result file comes back from the child.
+When no pool is running (workers set to 0, or outside the app lifespan) jobs fall back to the
+API thread pool.
+"""
+
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from array import array
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from threading import Lock
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+
+from ..core.settings import get_settings
+from .domain_clustering import cluster_order, email_domain
+from .email_classification import get_classification_index
+from .file_processing import FileProcessingError, parse_emails_from_upload, write_verified_output
+from .results_index import iter_jobs_file
+
+logger = logging.getLogger(__name__)
+
+_PRELOAD_MODULES = ["app.services.file_processing"]
+CLASSIFY_BATCH_SIZE = 10_000
+# Uploads are forwarded upstream as a one-column CSV of the parsed emails under this header.
+UPSTREAM_EMAIL_HEADER = "email"
+
+
+class FileJobTimeoutError(Exception):
+    pass
+
+
+class FileJobFailedError(Exception):
+    pass
+
+
+@dataclass
+class ParsedEmailsFile:
+    path: Path
+    email_count: int
+    email_column_index: int
+    engine: str
+    rejected_count: int = 0
+    rejected_samples: List[str] = field(default_factory=list)
+    disposable_count: int = 0
+    role_based_count: int = 0
+    skipped_disposable_count: int = 0
+
+    def iter_emails(self) -> Iterator[str]:
+        with self.path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                yield json.loads(line)
+
+
+def _upstream_writer(handle: IO[str]) -> Any:
+    writer = csv.writer(handle)
+    writer.writerow([UPSTREAM_EMAIL_HEADER])
+    return writer
+
+
+def _iter_clustered_emails(emails_path: str, offsets: array, run_length: int) -> Iterator[str]:
+    """
+    Read the spooled emails back in domain-clustered order. Only their byte offsets and the
+    order (a few bytes per email) are held in memory, never the emails themselves.
+    """
+    with open(emails_path, "rb") as handle:
+        order = cluster_order((email_domain(json.loads(line)) for line in handle), run_length)
+        for index in order:
+            handle.seek(offsets[index])
+            yield json.loads(handle.readline())
+
+
+def _batched(values: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(values)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _parse_job(
+    source_path: str,
+    filename: str,
+    email_column: str,
+    first_row_has_labels: bool,
+    remove_duplicates: bool,
+    max_emails: Optional[int],
+    emails_path: str,
+    syntax_filter: bool = False,
+    classification_index_path: Optional[str] = None,
+    canonical_dedup: bool = False,
+    upstream_path: Optional[str] = None,
+    run_length: int = 0,
+    skip_disposable: bool = False,
+) -> Dict[str, Any]:
+    index = get_classification_index(classification_index_path) if classification_index_path else None
+    counts = {"disposable_count": 0, "role_based_count": 0, "skipped_disposable_count": 0}
+
+    def classify(batch: List[str]) -> List[str]:
+        if index is None:
+            return batch
+        accepted: List[str] = []
+        for classification in index.classify_many(batch):
+            counts["disposable_count"] += classification.is_disposable
+            counts["role_based_count"] += classification.is_role_based
+            if skip_disposable and classification.is_disposable:
+                counts["skipped_disposable_count"] += 1
+                continue
+            accepted.append(classification.email)
+        return accepted
+
+    parsed = parse_emails_from_upload(
+        filename,
+        Path(source_path),
+        email_column,
+        first_row_has_labels,
+        remove_duplicates,
+        max_emails,
+        stream_emails=True,
+        syntax_filter=syntax_filter,
+        canonical_dedup=canonical_dedup,
+    )
+    clustered = upstream_path is not None and run_length > 0
+    try:
+        # One JSON string per line keeps emails with embedded newlines intact. The upstream CSV is
+        # written alongside, except when it is clustered: then it is read back from the spool.
+        offsets = array("Q")
+        position = 0
+        email_count = 0
+        with ExitStack() as stack:
+            handle = stack.enter_context(open(emails_path, "wb"))
+            upstream = None
+            if upstream_path is not None and not clustered:
+                upstream = _upstream_writer(stack.enter_context(open(upstream_path, "w", encoding="utf-8", newline="")))
+            for batch in _batched(parsed.emails, CLASSIFY_BATCH_SIZE):
+                for email in classify(batch):
+                    line = (json.dumps(email) + "\n").encode("utf-8")
+                    if clustered:
+                        offsets.append(position)
+                    handle.write(line)
+                    position += len(line)
+                    email_count += 1
+                    if upstream is not None:
+                        upstream.writerow([email])
+        if not email_count:
+            raise FileProcessingError(
+                "Every email in the selected column is on a disposable domain",
+                details={"skipped_disposable_count": counts["skipped_disposable_count"]},
+            )
+        if clustered:
+            with open(upstream_path, "w", encoding="utf-8", newline="") as target:
+                _upstream_writer(target).writerows(
+                    [email] for email in _iter_clustered_emails(emails_path, offsets, run_length)
+                )
+        rejections = parsed.syntax_rejections
+        return {
+            **counts,
+            "email_count": email_count,
+            "email_column_index": parsed.email_column_index,
+            "engine": parsed.engine,
+            "rejected_count": rejections.count if rejections else 0,
+            "rejected_samples": rejections.samples if rejections else [],
+        }
+    finally:
+        parsed.close()
+
+
+def _output_job(
+    source_path: str,
+    output_path: str,
+    email_column_index: int,
+    first_row_has_labels: bool,
+    jobs_path: str,
+    job_count: Optional[int] = None,
+    classification_index_path: Optional[str] = None,
+    join_memory_budget_bytes: Optional[int] = None,
+    canonical_dedup: bool = False,
+    skip_disposable: bool = False,
+) -> Dict[str, Any]:
+    # Jobs are streamed from the JSON-lines export, so no process holds the whole task at once.
+    write_verified_output(
+        Path(source_path),
+        Path(output_path),
+        email_column_index,
+        first_row_has_labels,
+        {"jobs": iter_jobs_file(Path(jobs_path))},
+        classification_index_path,
+        join_memory_budget_bytes,
+        canonical_dedup,
+        job_count=job_count,
+        skip_disposable=skip_disposable,
+    )
+    return {}
+
+
+_JOBS: Dict[str, Callable[..., Dict[str, Any]]] = {"parse": _parse_job, "output": _output_job}
+
+
+def _run_job(job: str, kwargs: Dict[str, Any], result_path: str) -> None:
+    try:
+        payload: Dict[str, Any] = {"ok": True, "result": _JOBS[job](**kwargs)}
+    except FileProcessingError as exc:
+        payload = {"ok": False, "error": str(exc), "details": exc.details}
+    except Exception as exc:  # noqa: BLE001 - reported to the parent, which raises FileJobFailedError
+        payload = {"ok": False, "failure": f"{type(exc).__name__}: {exc}"}
+    Path(result_path).write_text(json.dumps(payload, default=str), encoding="utf-8")
+
+
+class FileProcessingPool:
+    def __init__(self, workers: int, timeout_seconds: float) -> None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self._context.set_forkserver_preload(_PRELOAD_MODULES)
+        self._limiter = anyio.CapacityLimiter(workers)
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+
+    def warm_up(self) -> None:
+        if self._context.get_start_method() == "forkserver":
+            from multiprocessing import forkserver
+
+            forkserver.ensure_running()
+
+    async def run(self, job: str, kwargs: Dict[str, Any], *, timeout_seconds: Optional[float] = None) -> Dict[str, Any]:
+        timeout = timeout_seconds if timeout_seconds is not None else self.timeout_seconds
+        async with self._limiter:
+            with tempfile.TemporaryDirectory(prefix="file-job-") as work_dir:
+                result_path = os.path.join(work_dir, "result.json")
+                process = self._context.Process(target=_run_job, args=(job, kwargs, result_path), daemon=True)
+                start = time.time()
+                await anyio.to_thread.run_sync(process.start)
+                try:
+                    with anyio.fail_after(timeout):
+                        await anyio.to_thread.run_sync(process.join, abandon_on_cancel=True)
+                except TimeoutError as exc:
+                    logger.warning(
+                        "file_processing_pool.timeout",
+                        extra={"job": job, "pid": process.pid, "timeout_seconds": timeout},
+                    )
+                    raise FileJobTimeoutError(f"File processing job exceeded {timeout} seconds") from exc
+                finally:
+                    # Timeouts and caller cancellation both land here with the child still running.
+                    if process.is_alive():
+                        process.kill()
+                        process.join()
+                    exitcode = process.exitcode
+                    process.close()
+                payload = self._read_result(job, exitcode, result_path)
+                logger.info(
+                    "file_processing_pool.job_completed",
+                    extra={
+                        "job": job,
+                        "ok": payload["ok"],
+                        "duration_ms": round((time.time() - start) * 1000, 2),
+                    },
+                )
+        if not payload["ok"]:
+            if "error" in payload:
+                raise FileProcessingError(payload["error"], details=payload.get("details"))
+            raise FileJobFailedError(payload["failure"])
+        return payload["result"]
+
+    @staticmethod
+    def _read_result(job: str, exitcode: Optional[int], result_path: str) -> Dict[str, Any]:
+        try:
+            return json.loads(Path(result_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.error("file_processing_pool.job_crashed", extra={"job": job, "exitcode": exitcode})
+            raise FileJobFailedError(f"File processing job exited with code {exitcode}") from exc
+
+
+_POOL: Optional[FileProcessingPool] = None
+_POOL_LOCK = Lock()
+
+
+def start_file_processing_pool(workers: int, timeout_seconds: float) -> Optional[FileProcessingPool]:
+    global _POOL
+    with _POOL_LOCK:
+        if workers <= 0:
+            _POOL = None
+            logger.info("file_processing_pool.disabled")
+            return None
+        _POOL = FileProcessingPool(workers, timeout_seconds)
+        _POOL.warm_up()
+        logger.info("file_processing_pool.started", extra={"workers": workers, "timeout_seconds": timeout_seconds})
+        return _POOL
+
+
+def stop_file_processing_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        _POOL = None
+
+
+def get_file_processing_pool() -> Optional[FileProcessingPool]:
+    with _POOL_LOCK:
+        return _POOL
+
+
+async def parse_upload_file(
+    source_path: Path,
+    *,
+    filename: str,
+    email_column: str,
+    first_row_has_labels: bool,
+    remove_duplicates: bool,
+    max_emails: Optional[int],
+    emails_path: Path,
+    syntax_filter: bool = False,
+    canonical_dedup: bool = False,
+    upstream_path: Optional[Path] = None,
+    run_length: int = 0,
+    skip_disposable: bool = False,
+) -> ParsedEmailsFile:
+    """
+    Parse an upload on disk and write its unique emails to ``emails_path`` (JSON lines).
+
+    With ``upstream_path`` the same emails are also written there as the one-column CSV that is
+    sent upstream, in domain-clustered order when ``run_length`` is set. ``skip_disposable``
+    leaves addresses the classification index marks as disposable out of both files.
+    """
+    kwargs = {
+        "source_path": str(source_path),
+        "filename": filename,
+        "email_column": email_column,
+        "first_row_has_labels": first_row_has_labels,
+        "remove_duplicates": remove_duplicates,
+        "max_emails": max_emails,
+        "emails_path": str(emails_path),
+        "syntax_filter": syntax_filter,
+        "canonical_dedup": canonical_dedup,
+        "upstream_path": str(upstream_path) if upstream_path is not None else None,
+        "run_length": run_length,
+        "skip_disposable": skip_disposable,
+        # Resolved here so child processes never need the API settings.
+        "classification_index_path": get_settings().email_classification_index_path,
+    }
+    pool = get_file_processing_pool()
+    if pool is None:
+        result = await run_in_threadpool(_parse_job, **kwargs)
+    else:
+        result = await pool.run("parse", kwargs)
+    return ParsedEmailsFile(path=emails_path, **result)
+
+
+async def write_verified_output_file(
+    source_path: Path,
+    output_path: Path,
+    email_column_index: int,
+    first_row_has_labels: bool,
+    jobs_path: Path,
+    job_count: Optional[int] = None,
+    *,
+    skip_disposable: bool = False,
+) -> None:
+    """
+    Write the enriched output, reading task jobs from ``jobs_path`` (one JSON job per line).
+    ``skip_disposable`` says disposable addresses were left out of the task when it was uploaded.
+    """
+    settings = get_settings()
+    kwargs = {
+        "source_path": str(source_path),
+        "output_path": str(output_path),
+        "email_column_index": email_column_index,
+        "first_row_has_labels": first_row_has_labels,
+        "jobs_path": str(jobs_path),
+        "job_count": job_count,
+        "classification_index_path": settings.email_classification_index_path,
+        "join_memory_budget_bytes": settings.output_join_memory_budget_mb * 1024 * 1024 or None,
+        "canonical_dedup": settings.email_canonical_dedup,
+        "skip_disposable": skip_disposable,
+    }
+    pool = get_file_processing_pool()
+    if pool is None:
+        await run_in_threadpool(_output_job, **kwargs)
+        return
+    await pool.run("output", kwargs)
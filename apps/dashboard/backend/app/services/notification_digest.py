@@ -0,0 +1,250 @@
+"""
+Per-user batching of bulk-upload completion emails.
+
+With BULK_UPLOAD_DIGEST_WINDOW_SECONDS set, the first completion for a user opens a window; every
+completion that arrives for the same user before it closes joins the same email. A window with
+one upload is sent with the regular completed/failed templates, larger ones as a digest listing
+each file. When EMAIL_OUTBOX_PATH is set, pending completions are stored in the outbox database,
+so they survive a restart, and a closed window is queued there as one message. Otherwise they live
+in memory, are flushed when the app shuts down, and a window is sent directly. A failed send is kept
+and retried with exponential backoff; only when no retry is left (attempts used up, SMTP not
+configured, or the app shutting down) are the idempotency records removed and the failure logged.
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from threading import Lock
+from typing import AsyncIterator, Dict, List, Optional
+
+import anyio
+
+from ..core.settings import get_settings
+from . import email_outbox
+from .billing_events import delete_billing_event
+from .smtp_mailer import (
+    DigestEntry,
+    SMTPConfigurationError,
+    SMTPDeliveryError,
+    deliver,
+    send_bulk_upload_digest_email,
+    send_bulk_upload_notification_email,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 3600.0
+
+
+@dataclass
+class _PendingDigest:
+    recipient_email: str
+    due_at: float
+    entries: List[DigestEntry] = field(default_factory=list)
+    event_ids: List[str] = field(default_factory=list)
+    attempts: int = 0
+
+
+_PENDING: Dict[str, _PendingDigest] = {}
+_DIGEST_LOCK = Lock()
+_WAKE: Optional[anyio.Event] = None
+
+
+def _add_in_memory(
+    *, user_id: str, recipient_email: str, entry: DigestEntry, event_id: str, window_seconds: float
+) -> bool:
+    with _DIGEST_LOCK:
+        pending = _PENDING.get(user_id)
+        if pending is None:
+            pending = _PENDING[user_id] = _PendingDigest(recipient_email, time.time() + window_seconds)
+        elif event_id in pending.event_ids:
+            return False
+        pending.recipient_email = recipient_email
+        pending.entries.append(entry)
+        pending.event_ids.append(event_id)
+    return True
+
+
+async def add_completion(
+    *, user_id: str, recipient_email: str, entry: DigestEntry, event_id: str
+) -> Optional[bool]:
+    """
+    Add a finished upload to the user's pending digest.
+
+    Returns None when digests are off (or no flusher runs), and the caller should send right away.
+    Otherwise returns whether the completion is new; False means ``event_id`` is already pending.
+    """
+    window_seconds = get_settings().bulk_upload_digest_window_seconds
+    wake = _WAKE
+    if not window_seconds or wake is None:
+        return None
+    kwargs = {
+        "user_id": user_id,
+        "recipient_email": recipient_email,
+        "entry": entry,
+        "event_id": event_id,
+        "window_seconds": window_seconds,
+    }
+    if email_outbox.is_enabled():
+        added = await anyio.to_thread.run_sync(partial(email_outbox.add_digest_entry, **kwargs))
+    else:
+        added = _add_in_memory(**kwargs)
+    if added:
+        # Let the flusher recompute its deadline: this entry may have opened the earliest window.
+        wake.set()
+    logger.info("bulk_upload_notification.digest_queued", extra={"user_id": user_id, "duplicate": not added})
+    return added
+
+
+async def withdraw_completion(*, user_id: str, event_id: str) -> None:
+    """Drop a pending completion again, e.g. when its idempotency record turned out to exist."""
+    if email_outbox.is_enabled():
+        await anyio.to_thread.run_sync(email_outbox.remove_digest_entry, event_id)
+        return
+    with _DIGEST_LOCK:
+        pending = _PENDING.get(user_id)
+        if pending is None or event_id not in pending.event_ids:
+            return
+        position = pending.event_ids.index(event_id)
+        del pending.event_ids[position]
+        del pending.entries[position]
+        if not pending.event_ids:
+            del _PENDING[user_id]
+
+
+def _take_due(now: float) -> List[tuple[str, _PendingDigest]]:
+    with _DIGEST_LOCK:
+        due = [(user_id, pending) for user_id, pending in _PENDING.items() if pending.due_at <= now]
+        for user_id, _ in due:
+            del _PENDING[user_id]
+    return due
+
+
+async def _next_due_at() -> Optional[float]:
+    if email_outbox.is_enabled():
+        try:
+            return await anyio.to_thread.run_sync(email_outbox.next_digest_due_at)
+        except sqlite3.Error as exc:
+            logger.error("bulk_upload_notification.digest_outbox_read_failed", extra={"error": str(exc)})
+            return time.time() + get_settings().bulk_upload_digest_window_seconds
+    with _DIGEST_LOCK:
+        return min((pending.due_at for pending in _PENDING.values()), default=None)
+
+
+def _requeue(user_id: str, pending: _PendingDigest, retry_at: float) -> None:
+    """Put a window whose send failed back, ahead of any completions that arrived meanwhile."""
+    with _DIGEST_LOCK:
+        newer = _PENDING.get(user_id)
+        pending.due_at = retry_at
+        if newer is not None:
+            pending.recipient_email = newer.recipient_email
+            pending.entries.extend(newer.entries)
+            pending.event_ids.extend(newer.event_ids)
+            pending.due_at = min(retry_at, newer.due_at)
+        _PENDING[user_id] = pending
+
+
+async def _deliver(user_id: str, pending: _PendingDigest, *, final: bool = False) -> None:
+    entries = pending.entries
+    try:
+        if len(entries) == 1:
+            await deliver(
+                send_bulk_upload_notification_email,
+                recipient_email=pending.recipient_email,
+                outcome=entries[0].outcome,
+                file_name=entries[0].file_name,
+                email_count=entries[0].email_count,
+            )
+        else:
+            await deliver(send_bulk_upload_digest_email, recipient_email=pending.recipient_email, entries=entries)
+    except (SMTPConfigurationError, SMTPDeliveryError) as exc:
+        settings = get_settings()
+        pending.attempts += 1
+        retryable = isinstance(exc, SMTPDeliveryError) and not final
+        if retryable and pending.attempts < settings.bulk_upload_digest_max_attempts:
+            delay = min(
+                settings.bulk_upload_digest_retry_seconds * 2 ** (pending.attempts - 1), MAX_RETRY_DELAY_SECONDS
+            )
+            _requeue(user_id, pending, time.time() + delay)
+            logger.warning(
+                "bulk_upload_notification.digest_retry_scheduled",
+                extra={"user_id": user_id, "attempts": pending.attempts, "error": str(exc)},
+            )
+            return
+        # Nothing will retry this window; release the records so a redelivered webhook can notify again.
+        for event_id in pending.event_ids:
+            await anyio.to_thread.run_sync(delete_billing_event, event_id)
+        logger.error(
+            "bulk_upload_notification.digest_failed",
+            extra={
+                "user_id": user_id,
+                "event_ids": pending.event_ids,
+                "attempts": pending.attempts,
+                "error": str(exc),
+            },
+        )
+
+
+async def flush_due_digests(now: Optional[float] = None, *, final: bool = False) -> int:
+    """Send or queue every closed window; with ``final`` (shutdown) failed sends are not retried."""
+    now = time.time() if now is None else now
+    if email_outbox.is_enabled():
+        try:
+            queued = await anyio.to_thread.run_sync(email_outbox.queue_due_digests, now)
+        except sqlite3.Error as exc:
+            # The entries stay in the outbox database and are queued on the next flush.
+            logger.error("bulk_upload_notification.digest_outbox_write_failed", extra={"error": str(exc)})
+            return 0
+        if queued:
+            email_outbox.wake_dispatcher()
+        return queued
+    due = _take_due(now)
+    for user_id, pending in due:
+        await _deliver(user_id, pending, final=final)
+    return len(due)
+
+
+async def _run_flusher(wake: anyio.Event) -> None:
+    global _WAKE
+    while True:
+        await flush_due_digests()
+        next_due_at = await _next_due_at()
+        timeout = None if next_due_at is None else max(next_due_at - time.time(), 0.0)
+        with anyio.move_on_after(timeout):
+            await wake.wait()
+        if wake.is_set():
+            wake = _WAKE = anyio.Event()
+
+
+@asynccontextmanager
+async def run_notification_digest() -> AsyncIterator[None]:
+    """Flush digests in the background while the context is open; pending ones are sent on exit."""
+    global _WAKE
+    if not get_settings().bulk_upload_digest_window_seconds:
+        if email_outbox.is_enabled():
+            # Completions stored before digests were switched off are queued right away.
+            await flush_due_digests(now=float("inf"))
+        yield
+        return
+    _WAKE = anyio.Event()
+    try:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(_run_flusher, _WAKE)
+            try:
+                yield
+            finally:
+                task_group.cancel_scope.cancel()
+    finally:
+        _WAKE = None
+        with anyio.CancelScope(shield=True):
+            await flush_due_digests(now=float("inf"), final=True)
+
+
+def clear_notification_digest_state() -> None:
+    global _WAKE
+    with _DIGEST_LOCK:
+        _PENDING.clear()
+    _WAKE = None
@@ -0,0 +1,93 @@
+"""
+Short-lived cache of notification recipient emails, keyed by user id.
+
+Resolving a recipient takes one or two synchronous Supabase calls (profile, then auth user). The
+cache keeps resolved emails for NOTIFICATION_RECIPIENT_CACHE_TTL_SECONDS in a bounded LRU, runs
+lookups in a worker thread, and lets concurrent lookups for the same user share one round trip,
+so a burst of completions for one user costs a single resolution. Profile changes invalidate
+the user's entry; unresolved users are not cached.
+"""
+
+import logging
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Callable, Dict, Optional, Tuple
+
+import anyio
+
+from ..core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 10_000
+
+
+class _Lookup:
+    """One in-flight resolution that concurrent callers for the same user wait on."""
+
+    def __init__(self) -> None:
+        self.done = anyio.Event()
+        self.email: Optional[str] = None
+
+
+_CACHE: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_PENDING: Dict[str, _Lookup] = {}
+_CACHE_LOCK = Lock()
+
+
+def _cached(user_id: str, now: float) -> Optional[str]:
+    entry = _CACHE.get(user_id)
+    if entry is None:
+        return None
+    if entry[0] <= now:
+        del _CACHE[user_id]
+        return None
+    _CACHE.move_to_end(user_id)
+    return entry[1]
+
+
+async def get_recipient_email(user_id: str, loader: Callable[[str], Optional[str]]) -> Optional[str]:
+    """Return the cached email for ``user_id`` or resolve it with ``loader`` (run in a thread)."""
+    ttl_seconds = get_settings().notification_recipient_cache_ttl_seconds
+    if not ttl_seconds:
+        return await anyio.to_thread.run_sync(loader, user_id)
+    with _CACHE_LOCK:
+        email = _cached(user_id, monotonic())
+        if email is not None:
+            return email
+        lookup = _PENDING.get(user_id)
+        owner = lookup is None
+        if owner:
+            lookup = _PENDING[user_id] = _Lookup()
+    if not owner:
+        logger.info("recipient_cache.coalesced", extra={"user_id": user_id})
+        await lookup.done.wait()
+        return lookup.email
+
+    try:
+        lookup.email = await anyio.to_thread.run_sync(loader, user_id)
+    finally:
+        with _CACHE_LOCK:
+            # An invalidation during the lookup drops the marker; the result is then too old to keep.
+            if _PENDING.get(user_id) is lookup:
+                del _PENDING[user_id]
+                if lookup.email:
+                    _CACHE.pop(user_id, None)
+                    _CACHE[user_id] = (monotonic() + ttl_seconds, lookup.email)
+                    while len(_CACHE) > MAX_ENTRIES:
+                        _CACHE.popitem(last=False)
+        lookup.done.set()
+    return lookup.email
+
+
+def invalidate_recipient_email(user_id: str) -> None:
+    with _CACHE_LOCK:
+        _CACHE.pop(user_id, None)
+        _PENDING.pop(user_id, None)
+
+
+def clear_recipient_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _PENDING.clear()
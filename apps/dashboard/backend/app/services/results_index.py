@@ -0,0 +1,399 @@
+"""
+Compact email -> verification result lookup used when joining task results onto uploaded files.
+
+``ResultsIndex`` replaces a dict of per-email dicts with parallel arrays: an open-addressing table
+of 64-bit email fingerprints pointing at a row, an interned status code, one flag byte (role flag
+and timestamp format) and the ``validated_at`` timestamp as integer microseconds. Timestamps that
+would not render back to the exact upstream string are kept verbatim on the side.
+
+For results that should not be held in memory at all, ``sorted_merge_results`` sorts result
+records and the file's email keys on disk by fingerprint, merges them, and re-sorts the matches
+into row order, so the writer can consume them with the same ``get`` call it uses on the index.
+
+Both consume ``details["jobs"]`` in a single pass, so it may be a lazy iterator such as
+``iter_jobs_file`` over a JSON-lines export instead of a list of every job.
+"""
+
+import heapq
+import logging
+import struct
+import tempfile
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import groupby
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sized, Tuple, Union
+
+import orjson
+
+from .email_classification import ClassificationIndex
+from .email_dedup import _read_partition_records, _write_partition_record, email_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RUN_RECORDS = 100_000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NO_TIMESTAMP = -(1 << 63)
+
+# Flag byte layout: bit 0 role known, bit 1 role value, bits 2-3 timestamp format, bit 4 verbatim timestamp.
+_ROLE_KNOWN = 0x01
+_ROLE_VALUE = 0x02
+_FORMAT_SHIFT = 2
+_FORMAT_MASK = 0x0C
+_TEXT_TIMESTAMP = 0x10
+_FORMAT_OFFSET, _FORMAT_ZULU, _FORMAT_NAIVE = 1, 2, 3
+
+_RESULT_RECORD = struct.Struct("<HBq")
+
+
+def _render_timestamp(micros: int, timestamp_format: int) -> str:
+    value = _EPOCH + timedelta(microseconds=micros)
+    if timestamp_format == _FORMAT_ZULU:
+        return value.isoformat()[:-6] + "Z"
+    if timestamp_format == _FORMAT_NAIVE:
+        return value.replace(tzinfo=None).isoformat()
+    return value.isoformat()
+
+
+def _encode_timestamp(value: Any) -> Tuple[int, int, Optional[str]]:
+    """Return (microseconds, format flags, verbatim text) for an upstream ``validated_at`` value."""
+    if not value:
+        return _NO_TIMESTAMP, 0, None
+    return _encode_timestamp_text(str(value))
+
+
+# Jobs in one task are validated in bursts, so the same timestamp string repeats many times.
+@lru_cache(maxsize=4096)
+def _encode_timestamp_text(text: str) -> Tuple[int, int, Optional[str]]:
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return _NO_TIMESTAMP, _TEXT_TIMESTAMP, text
+    offset = parsed.utcoffset()
+    if offset is None:
+        parsed, formats = parsed.replace(tzinfo=timezone.utc), (_FORMAT_NAIVE,)
+    elif offset:
+        return _NO_TIMESTAMP, _TEXT_TIMESTAMP, text
+    else:
+        formats = (_FORMAT_ZULU, _FORMAT_OFFSET)
+    micros = (parsed - _EPOCH) // timedelta(microseconds=1)
+    for timestamp_format in formats:
+        if _render_timestamp(micros, timestamp_format) == text:
+            return micros, timestamp_format << _FORMAT_SHIFT, None
+    return _NO_TIMESTAMP, _TEXT_TIMESTAMP, text
+
+
+def _decode_result(status: Optional[str], flags: int, micros: int, text: Optional[str]) -> Dict[str, Any]:
+    if flags & _TEXT_TIMESTAMP:
+        validated_at = text
+    elif micros != _NO_TIMESTAMP:
+        validated_at = _render_timestamp(micros, (flags & _FORMAT_MASK) >> _FORMAT_SHIFT)
+    else:
+        validated_at = None
+    return {
+        "verification_status": status,
+        "is_role_based": bool(flags & _ROLE_VALUE) if flags & _ROLE_KNOWN else None,
+        "validated_at": validated_at,
+    }
+
+
+def iter_jobs_file(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield task jobs from a JSON-lines file holding one job object per line."""
+    with path.open("rb") as handle:
+        for line in handle:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+def iter_task_results(
+    details: dict,
+    classification: Optional[ClassificationIndex] = None,
+    key: Optional[Callable[[str], str]] = None,
+) -> Iterator[Tuple[str, Optional[str], Optional[bool], Any]]:
+    """
+    Yield (lookup key, status, is_role_based, validated_at) per task job with an address.
+
+    The lookup key is the lower-cased email, passed through ``key`` when given.
+    """
+    for job in details.get("jobs") or []:
+        email = job.get("email") or {}
+        email_address = job.get("email_address") or email.get("email_address")
+        if not email_address:
+            continue
+        address = str(email_address).strip().lower()
+        if not address:
+            continue
+        is_role_based = email.get("is_role_based")
+        if is_role_based is None and classification is not None:
+            # Fill role flags the upstream left empty from the local index.
+            is_role_based = classification.is_role_local_part(address.rpartition("@")[0])
+        lookup_key = key(address) if key is not None else address
+        yield lookup_key, email.get("status") or job.get("status"), is_role_based, email.get("validated_at")
+
+
+class _StatusTable:
+    """Interns status strings as small integer codes; code 0 means no status."""
+
+    def __init__(self) -> None:
+        self.values: List[Optional[str]] = [None]
+        self._codes: Dict[str, int] = {}
+
+    def code(self, status: Any) -> int:
+        if not status:
+            return 0
+        status = str(status)
+        code = self._codes.get(status)
+        if code is None:
+            code = self._codes[status] = len(self.values)
+            self.values.append(status)
+        return code
+
+
+def _flags(is_role_based: Optional[bool]) -> int:
+    if is_role_based is None:
+        return 0
+    return _ROLE_KNOWN | (_ROLE_VALUE if is_role_based else 0)
+
+
+class ResultsIndex:
+    """
+    Array-backed map from lower-cased email to its result fields, with a dict-like ``get``.
+
+    Keys are 64-bit fingerprints, so memory per result is a few dozen bytes; a later ``add``
+    for the same email replaces the earlier result, as with a dict.
+    """
+
+    _MAX_LOAD = 0.6
+
+    def __init__(self, capacity: int = 1024) -> None:
+        size = 1 << max(4, (int(capacity / self._MAX_LOAD)).bit_length())
+        self._slots = array("Q", bytes(8 * size))
+        self._slot_rows = array("q", bytes(8 * size))
+        self._mask = size - 1
+        self._statuses = _StatusTable()
+        self._status_codes = array("H")
+        self._flags = bytearray()
+        self._timestamps = array("q")
+        self._text_timestamps: Dict[int, str] = {}
+
+    @classmethod
+    def from_task_detail(
+        cls,
+        details: dict,
+        classification: Optional[ClassificationIndex] = None,
+        key: Optional[Callable[[str], str]] = None,
+    ) -> "ResultsIndex":
+        jobs = details.get("jobs") or []
+        index = cls(capacity=len(jobs) if isinstance(jobs, Sized) else 1024)
+        for lookup_key, status, is_role_based, validated_at in iter_task_results(details, classification, key):
+            index.add(lookup_key, status, is_role_based, validated_at)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(email_fingerprint(key)) >= 0
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self._slots, self._slot_rows, self._status_codes, self._timestamps)
+        return sum(len(values) * values.itemsize for values in arrays) + len(self._flags)
+
+    def add(self, key: str, status: Any, is_role_based: Optional[bool], validated_at: Any) -> None:
+        fingerprint = email_fingerprint(key)
+        micros, timestamp_flags, text = _encode_timestamp(validated_at)
+        row = self._find(fingerprint)
+        if row < 0:
+            row = len(self._flags)
+            self._status_codes.append(0)
+            self._flags.append(0)
+            self._timestamps.append(_NO_TIMESTAMP)
+            self._insert(fingerprint, row)
+        self._status_codes[row] = self._statuses.code(status)
+        self._flags[row] = _flags(is_role_based) | timestamp_flags
+        self._timestamps[row] = micros
+        if text is not None:
+            self._text_timestamps[row] = text
+        else:
+            self._text_timestamps.pop(row, None)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._find(email_fingerprint(key))
+        if row < 0:
+            return default
+        return _decode_result(
+            self._statuses.values[self._status_codes[row]],
+            self._flags[row],
+            self._timestamps[row],
+            self._text_timestamps.get(row),
+        )
+
+    def _find(self, fingerprint: int) -> int:
+        slots, mask = self._slots, self._mask
+        index = fingerprint & mask
+        while True:
+            current = slots[index]
+            if current == fingerprint:
+                return self._slot_rows[index]
+            if current == 0:
+                return -1
+            index = (index + 1) & mask
+
+    def _insert(self, fingerprint: int, row: int) -> None:
+        if len(self._flags) > len(self._slots) * self._MAX_LOAD:
+            self._grow()
+        slots, mask = self._slots, self._mask
+        index = fingerprint & mask
+        while slots[index] != 0:
+            index = (index + 1) & mask
+        slots[index] = fingerprint
+        self._slot_rows[index] = row
+
+    def _grow(self) -> None:
+        old_slots, old_rows = self._slots, self._slot_rows
+        size = len(old_slots) * 2
+        self._slots = array("Q", bytes(8 * size))
+        self._slot_rows = array("q", bytes(8 * size))
+        self._mask = size - 1
+        slots, rows, mask = self._slots, self._slot_rows, self._mask
+        for fingerprint, row in zip(old_slots, old_rows):
+            if fingerprint == 0:
+                continue
+            index = fingerprint & mask
+            while slots[index] != 0:
+                index = (index + 1) & mask
+            slots[index] = fingerprint
+            rows[index] = row
+
+
+def estimate_index_bytes(result_count: int) -> int:
+    """Approximate ``ResultsIndex.nbytes`` for ``result_count`` distinct emails."""
+    slots = 1 << max(4, (int(result_count / ResultsIndex._MAX_LOAD)).bit_length())
+    return slots * 16 + result_count * 11
+
+
+def _sorted_runs(records: Iterable[Tuple[int, int, bytes]], run_records: int, spill_dir: Optional[str]) -> List[BinaryIO]:
+    """Write records to temporary files in sorted runs of at most ``run_records`` records each."""
+    runs: List[BinaryIO] = []
+    buffer: List[Tuple[int, int, bytes]] = []
+
+    def flush() -> None:
+        buffer.sort()
+        run = tempfile.TemporaryFile(dir=spill_dir)
+        runs.append(run)
+        for record in buffer:
+            _write_partition_record(run, *record)
+        buffer.clear()
+
+    try:
+        for record in records:
+            buffer.append(record)
+            if len(buffer) >= run_records:
+                flush()
+        if buffer or not runs:
+            flush()
+    except BaseException:
+        for run in runs:
+            run.close()
+        raise
+    return runs
+
+
+def _merge_runs(runs: List[BinaryIO]) -> Iterator[Tuple[int, int, bytes]]:
+    return heapq.merge(*(_read_partition_records(run) for run in runs))
+
+
+def _close_runs(runs: List[BinaryIO]) -> None:
+    for run in runs:
+        run.close()
+
+
+class RowOrderedResults:
+    """
+    Results already aligned with the source rows; ``get`` must be called once per data row, in order.
+
+    Each call checks the key against the fingerprint recorded for that row so a writer that
+    drifts out of step fails loudly instead of attaching results to the wrong rows.
+    """
+
+    def __init__(self, records: Iterator[Tuple[int, int, bytes]], statuses: List[Optional[str]]) -> None:
+        self._records = records
+        self._statuses = statuses
+
+    def get(self, key: str, default: Any = None) -> Any:
+        record = next(self._records, None)
+        if record is None or record[1] != email_fingerprint(key):
+            raise RuntimeError("Results are out of step with the source rows")
+        payload = record[2]
+        if not payload:
+            return default
+        status_code, flags, micros = _RESULT_RECORD.unpack_from(payload)
+        text = payload[_RESULT_RECORD.size :].decode("utf-8") if flags & _TEXT_TIMESTAMP else None
+        return _decode_result(self._statuses[status_code], flags, micros, text)
+
+
+def _joined_records(
+    result_records: Iterator[Tuple[int, int, bytes]], row_records: Iterator[Tuple[int, int, bytes]]
+) -> Iterator[Tuple[int, int, bytes]]:
+    """Merge fingerprint-sorted results and rows; yield (row, fingerprint, result payload or b"")."""
+    # The last result per fingerprint wins, matching dict assignment order.
+    latest = ((fingerprint, list(group)[-1][2]) for fingerprint, group in groupby(result_records, key=lambda r: r[0]))
+    current = next(latest, None)
+    for fingerprint, row, _ in row_records:
+        while current is not None and current[0] < fingerprint:
+            current = next(latest, None)
+        payload = current[1] if current is not None and current[0] == fingerprint else b""
+        yield row, fingerprint, payload
+
+
+@contextmanager
+def sorted_merge_results(
+    details: dict,
+    row_keys: Iterable[str],
+    classification: Optional[ClassificationIndex] = None,
+    *,
+    key: Optional[Callable[[str], str]] = None,
+    run_records: int = DEFAULT_RUN_RECORDS,
+    spill_dir: Optional[str] = None,
+) -> Iterator[RowOrderedResults]:
+    """
+    Join task results onto ``row_keys`` (one lookup key per data row) through on-disk sorts.
+
+    Provides a single ``RowOrderedResults`` for the writer; temporary runs are removed on exit.
+    At most ``run_records`` records are held in memory at once.
+    """
+    statuses = _StatusTable()
+    result_runs: List[BinaryIO] = []
+    row_runs: List[BinaryIO] = []
+    joined_runs: List[BinaryIO] = []
+
+    def result_records() -> Iterator[Tuple[int, int, bytes]]:
+        for sequence, (lookup_key, status, is_role_based, validated_at) in enumerate(
+            iter_task_results(details, classification, key)
+        ):
+            micros, timestamp_flags, text = _encode_timestamp(validated_at)
+            payload = _RESULT_RECORD.pack(statuses.code(status), _flags(is_role_based) | timestamp_flags, micros)
+            yield email_fingerprint(lookup_key), sequence, payload + (text.encode("utf-8") if text is not None else b"")
+
+    try:
+        result_runs = _sorted_runs(result_records(), run_records, spill_dir)
+        row_runs = _sorted_runs(
+            ((email_fingerprint(key), row, b"") for row, key in enumerate(row_keys)), run_records, spill_dir
+        )
+        joined = _joined_records(_merge_runs(result_runs), _merge_runs(row_runs))
+        joined_runs = _sorted_runs(joined, run_records, spill_dir)
+        _close_runs(result_runs + row_runs)
+        logger.info(
+            "results_index.sorted_merge_ready",
+            extra={"runs": len(joined_runs), "statuses": len(statuses.values) - 1},
+        )
+        yield RowOrderedResults(_merge_runs(joined_runs), statuses.values)
+    finally:
+        _close_runs(result_runs + row_runs + joined_runs)
+
+
+ResultsLookup = Union[ResultsIndex, RowOrderedResults]
@@ -1,11 +1,17 @@
 import logging
 import smtplib
 import ssl
+from dataclasses import dataclass
 from email.message import EmailMessage
 from email.utils import formataddr
-from typing import Literal
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Literal, Optional, Sequence, Tuple
+
+import anyio
 
 from ..core.settings import get_settings
+from .smtp_pool import SMTPConnectionPool
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +48,129 @@ def _required_setting(name: str, value: str | int | bool | None) -> str | int |
     return value
 
 
+@dataclass(frozen=True)
+class DigestEntry:
+    outcome: Outcome
+    file_name: str
+    email_count: int
+
+
+@dataclass(frozen=True)
+class _SMTPConfig:
+    server: str
+    port: int
+    username: str
+    password: str
+    starttls_required: bool
+    from_email: str
+    from_name: str
+    reply_to: str
+
+
+def _smtp_config() -> _SMTPConfig:
+    settings = get_settings()
+    return _SMTPConfig(
+        server=str(_required_setting("SMTP_SERVER", settings.smtp_server)),
+        port=int(_required_setting("SMTP_PORT", settings.smtp_port)),
+        username=str(_required_setting("SMTP_USERNAME", settings.smtp_username)),
+        password=str(_required_setting("SMTP_PASSWORD", settings.smtp_password)),
+        starttls_required=bool(_required_setting("SMTP_STARTTLS_REQUIRED", settings.smtp_starttls_required)),
+        from_email=str(_required_setting("SMTP_FROM_EMAIL", settings.smtp_from_email)),
+        from_name=str(_required_setting("SMTP_FROM_NAME", settings.smtp_from_name)),
+        reply_to=str(_required_setting("SMTP_REPLY_TO", settings.smtp_reply_to)),
+    )
+
+
+def _build_message(config: _SMTPConfig, *, recipient_email: str, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((config.from_name, config.from_email))
+    message["To"] = recipient_email
+    message["Reply-To"] = config.reply_to
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+def _connect(config: _SMTPConfig) -> smtplib.SMTP:
+    smtp = smtplib.SMTP(host=config.server, port=config.port, timeout=30)
+    try:
+        if config.starttls_required:
+            context = ssl.create_default_context()
+            smtp.starttls(context=context)
+        smtp.login(config.username, config.password)
+    except BaseException:
+        smtp.close()
+        raise
+    return smtp
+
+
+_POOL_LOCK = Lock()
+_POOL: Optional[Tuple[_SMTPConfig, SMTPConnectionPool]] = None
+_SEND_LIMITER: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_pool(config: _SMTPConfig) -> Optional[SMTPConnectionPool]:
+    """Return the shared pool for ``config`` (None when SMTP_POOL_SIZE is 0); a config change replaces it."""
+    global _POOL
+    settings = get_settings()
+    if not settings.smtp_pool_size:
+        return None
+    stale = None
+    with _POOL_LOCK:
+        if _POOL is None or _POOL[0] != config:
+            stale = _POOL[1] if _POOL is not None else None
+            pool = SMTPConnectionPool(
+                partial(_connect, config),
+                max_size=settings.smtp_pool_size,
+                max_idle_seconds=settings.smtp_pool_idle_seconds,
+            )
+            _POOL = (config, pool)
+        pool = _POOL[1]
+    if stale is not None:
+        stale.close()
+    return pool
+
+
+def close_smtp_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        current, _POOL = _POOL, None
+    if current is not None:
+        current[1].close()
+
+
+def _send_message(config: _SMTPConfig, message: EmailMessage, log_extra: dict) -> None:
+    pool = _get_pool(config)
+    try:
+        if pool is not None:
+            pool.send(message)
+        else:
+            with _connect(config) as smtp:
+                smtp.send_message(message)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("bulk_upload_notification.smtp_send_failed", extra={**log_extra, "error": str(exc)})
+        raise SMTPDeliveryError("SMTP send failed") from exc
+
+
+def _get_send_limiter() -> Optional[anyio.CapacityLimiter]:
+    """
+    Threads for pooled sends, capped at SMTP_POOL_SIZE. Extra senders then wait on the event loop
+    rather than holding shared worker threads while they block on a pool slot.
+    """
+    global _SEND_LIMITER
+    size = get_settings().smtp_pool_size
+    if not size:
+        return None
+    if _SEND_LIMITER is None or _SEND_LIMITER.total_tokens != size:
+        _SEND_LIMITER = anyio.CapacityLimiter(size)
+    return _SEND_LIMITER
+
+
+async def deliver(send: Callable[..., None], **kwargs: Any) -> None:
+    """Run a blocking send function (e.g. send_bulk_upload_notification_email) off the event loop."""
+    await anyio.to_thread.run_sync(partial(send, **kwargs), limiter=_get_send_limiter())
+
+
 def send_bulk_upload_notification_email(
     *,
     recipient_email: str,
@@ -50,16 +179,7 @@ def send_bulk_upload_notification_email(
     email_count: int,
 ) -> None:
     settings = get_settings()
-
-    smtp_server = _required_setting("SMTP_SERVER", settings.smtp_server)
-    smtp_port = _required_setting("SMTP_PORT", settings.smtp_port)
-    smtp_username = _required_setting("SMTP_USERNAME", settings.smtp_username)
-    smtp_password = _required_setting("SMTP_PASSWORD", settings.smtp_password)
-    smtp_starttls_required = _required_setting("SMTP_STARTTLS_REQUIRED", settings.smtp_starttls_required)
-
-    from_email = _required_setting("SMTP_FROM_EMAIL", settings.smtp_from_email)
-    from_name = _required_setting("SMTP_FROM_NAME", settings.smtp_from_name)
-    reply_to = _required_setting("SMTP_REPLY_TO", settings.smtp_reply_to)
+    config = _smtp_config()
 
     if outcome == "completed":
         subject_template = _required_setting(
@@ -82,42 +202,49 @@ def send_bulk_upload_notification_email(
 
     subject = _render_template(str(subject_template), file_name=file_name, email_count=email_count)
     body = _render_template(str(body_template), file_name=file_name, email_count=email_count)
-
-    message = EmailMessage()
-    message["From"] = formataddr((str(from_name), str(from_email)))
-    message["To"] = recipient_email
-    message["Reply-To"] = str(reply_to)
-    message["Subject"] = subject
-    message.set_content(body)
-
+    message = _build_message(config, recipient_email=recipient_email, subject=subject, body=body)
+    log_extra = {
+        "recipient_email": recipient_email,
+        "outcome": outcome,
+        "file_name": file_name,
+        "email_count": email_count,
+    }
+    _send_message(config, message, log_extra)
+    logger.info("bulk_upload_notification.email_sent", extra=log_extra)
+
+
+def _render_digest_template(template: str, entries: Sequence[DigestEntry]) -> str:
+    lines = [f"- {entry.file_name}: {entry.email_count} emails ({entry.outcome})" for entry in entries]
+    values = {
+        "file_count": len(entries),
+        "email_count": sum(entry.email_count for entry in entries),
+        "completed_count": sum(1 for entry in entries if entry.outcome == "completed"),
+        "failed_count": sum(1 for entry in entries if entry.outcome == "failed"),
+        "files": "\n".join(lines),
+    }
     try:
-        with smtplib.SMTP(host=str(smtp_server), port=int(smtp_port), timeout=30) as smtp:
-            if bool(smtp_starttls_required):
-                context = ssl.create_default_context()
-                smtp.starttls(context=context)
-            smtp.login(str(smtp_username), str(smtp_password))
-            smtp.send_message(message)
-    except SMTPConfigurationError:
-        raise
-    except Exception as exc:  # noqa: BLE001
-        logger.error(
-            "bulk_upload_notification.smtp_send_failed",
-            extra={
-                "recipient_email": recipient_email,
-                "outcome": outcome,
-                "file_name": file_name,
-                "email_count": email_count,
-                "error": str(exc),
-            },
-        )
-        raise SMTPDeliveryError("SMTP send failed") from exc
+        return _normalize_template_text(template).format(**values)
+    except KeyError as exc:
+        raise SMTPConfigurationError(f"Email template missing placeholder value: {exc.args[0]}") from exc
 
-    logger.info(
-        "bulk_upload_notification.email_sent",
-        extra={
-            "recipient_email": recipient_email,
-            "outcome": outcome,
-            "file_name": file_name,
-            "email_count": email_count,
-        },
-    )
+
+def send_bulk_upload_digest_email(*, recipient_email: str, entries: Sequence[DigestEntry]) -> None:
+    """
+    Send one email listing several finished uploads. Templates may use {file_count}, {email_count},
+    {completed_count}, {failed_count} and {files} (one line per upload).
+    """
+    settings = get_settings()
+    config = _smtp_config()
+    subject_template = _required_setting("BULK_UPLOAD_EMAIL_SUBJECT_DIGEST", settings.bulk_upload_email_subject_digest)
+    body_template = _required_setting("BULK_UPLOAD_EMAIL_BODY_DIGEST", settings.bulk_upload_email_body_digest)
+
+    subject = _render_digest_template(str(subject_template), entries)
+    body = _render_digest_template(str(body_template), entries)
+    message = _build_message(config, recipient_email=recipient_email, subject=subject, body=body)
+    log_extra = {
+        "recipient_email": recipient_email,
+        "file_count": len(entries),
+        "email_count": sum(entry.email_count for entry in entries),
+    }
+    _send_message(config, message, log_extra)
+    logger.info("bulk_upload_notification.digest_sent", extra=log_extra)
@@ -0,0 +1,104 @@
+"""
+Small pool of authenticated, keep-alive SMTP connections.
+
+Opening a connection costs a TCP connect, STARTTLS and AUTH; reusing one costs a single mail
+transaction. Idle connections are kept for up to ``max_idle_seconds``, checked with NOOP before
+reuse once they have been idle for a while, and replaced when the server has dropped them. At
+most ``max_size`` messages are in flight at once; further senders wait for a free slot. The pool
+is synchronous and thread-safe; async callers reach it through a worker thread.
+"""
+
+import logging
+import smtplib
+import time
+from email.message import EmailMessage
+from threading import BoundedSemaphore, Lock
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_AFTER_SECONDS = 5.0
+
+# Errors after which the connection itself can no longer be trusted.
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+
+def _close(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except Exception:  # noqa: BLE001
+        try:
+            smtp.close()
+        except Exception:  # noqa: BLE001
+            pass
+
+
+class SMTPConnectionPool:
+    def __init__(self, connect: Callable[[], smtplib.SMTP], *, max_size: int, max_idle_seconds: float) -> None:
+        self._connect = connect
+        self._max_size = max_size
+        self._max_idle_seconds = max_idle_seconds
+        self._slots = BoundedSemaphore(max_size)
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = Lock()
+        self._closed = False
+
+    def send(self, message: EmailMessage) -> None:
+        with self._slots:
+            smtp, reused = self._acquire()
+            try:
+                smtp.send_message(message)
+            except _CONNECTION_ERRORS as exc:
+                _close(smtp)
+                if not reused:
+                    raise
+                # The server dropped a pooled connection between the health check and the send.
+                logger.info("smtp_pool.reconnect", extra={"error": str(exc)})
+                smtp = self._connect()
+                try:
+                    smtp.send_message(message)
+                except BaseException:
+                    _close(smtp)
+                    raise
+            except BaseException:
+                _close(smtp)
+                raise
+            self._release(smtp)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            _close(smtp)
+
+    def _acquire(self) -> Tuple[smtplib.SMTP, bool]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                smtp, idle_since = self._idle.pop()
+            idle_for = time.monotonic() - idle_since
+            if idle_for > self._max_idle_seconds:
+                _close(smtp)
+                continue
+            if idle_for > HEALTH_CHECK_AFTER_SECONDS and not self._is_healthy(smtp):
+                _close(smtp)
+                continue
+            return smtp, True
+        return self._connect(), False
+
+    @staticmethod
+    def _is_healthy(smtp: smtplib.SMTP) -> bool:
+        try:
+            code, _ = smtp.noop()
+        except Exception:  # noqa: BLE001
+            return False
+        return code == 250
+
+    def _release(self, smtp: smtplib.SMTP) -> None:
+        with self._lock:
+            if not self._closed and len(self._idle) < self._max_size:
+                self._idle.append((smtp, time.monotonic()))
+                return
+        _close(smtp)
@@ -1,14 +1,46 @@
+import hashlib
+import json
 import logging
 import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
 
+import anyio
 from slugify import slugify
 
 from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from ..core.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+RETENTION_SWEEP_SECONDS = 3600.0
+
+
+@dataclass
+class PersistedUpload:
+    path: Path
+    file_name: str
+    size: int
+    sha256: str
+
+
+@dataclass
+class OriginalUpload:
+    path: Path
+    file_name: str
+    email_column_index: int
+    first_row_has_labels: bool
+    # Whether disposable addresses were left out of the upstream task when it was uploaded.
+    skip_disposable: bool = False
+
 
 def _uploads_root() -> Path:
     return Path(__file__).resolve().parents[3] / "uploads"
@@ -26,37 +58,219 @@ def absolute_upload_path(relative_path: str) -> Path:
     return _uploads_root() / relative_path
 
 
-def build_output_path(user_id: str, original_name: str, task_id: str) -> Tuple[Path, str]:
+def build_output_path(
+    user_id: str, original_name: str, task_id: str, suffix: Optional[str] = None
+) -> Tuple[Path, str]:
     root = _uploads_root() / user_id / "outputs"
     root.mkdir(parents=True, exist_ok=True)
     base = Path(original_name)
     safe_stem = slugify(base.stem)
     if not safe_stem:
         safe_stem = f"task-{task_id}"
-    filename = f"{safe_stem}-verified-{task_id}{base.suffix}"
+    filename = f"{safe_stem}-verified-{task_id}{suffix if suffix is not None else base.suffix}"
     return root / filename, filename
 
 
-async def persist_upload_file(upload: UploadFile, user_id: str, max_bytes: int) -> Tuple[Path, bytes]:
+async def persist_upload_file(
+    upload: UploadFile,
+    user_id: str,
+    max_bytes: int,
+    *,
+    target_name: Optional[str] = None,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+) -> PersistedUpload:
+    """
+    Stream an upload into the user's upload dir, hashing it on the way.
+
+    Data is copied one chunk at a time into a temporary file next to the target, the copy stops
+    as soon as ``max_bytes`` is exceeded, and the file is renamed into place only once complete.
+    """
     filename = upload.filename or "upload"
     safe_name = os.path.basename(filename)
-    data = await upload.read()
-    if len(data) > max_bytes:
-        logger.warning(
-            "upload.too_large",
-            extra={"file_name": safe_name, "size": len(data), "max_bytes": max_bytes, "user_id": user_id},
-        )
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File exceeds maximum allowed size ({max_bytes} bytes)",
-        )
-
     root = _uploads_root() / user_id
     root.mkdir(parents=True, exist_ok=True)
-    target = root / safe_name
-    target.write_bytes(data)
+    target = root / (target_name or safe_name)
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(dir=root, prefix=".upload-", suffix=".part", delete=False)
+    temp_path = Path(handle.name)
+    try:
+        with handle:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    logger.warning(
+                        "upload.too_large",
+                        extra={"file_name": safe_name, "size": size, "max_bytes": max_bytes, "user_id": user_id},
+                    )
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"File exceeds maximum allowed size ({max_bytes} bytes)",
+                    )
+                digest.update(chunk)
+                await run_in_threadpool(handle.write, chunk)
+        os.replace(temp_path, target)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
     logger.info(
         "upload.saved",
-        extra={"file_name": safe_name, "bytes": len(data), "path": str(target), "user_id": user_id},
+        extra={"file_name": safe_name, "bytes": size, "path": str(target), "user_id": user_id},
     )
-    return target, data
+    return PersistedUpload(path=target, file_name=safe_name, size=size, sha256=digest.hexdigest())
+
+
+def _originals_root(user_id: str) -> Path:
+    return _uploads_root() / user_id / "originals"
+
+
+def persist_original_upload(
+    *,
+    user_id: str,
+    task_id: str,
+    file_name: str,
+    source_path: Path,
+    email_column_index: int,
+    first_row_has_labels: bool,
+    skip_disposable: bool = False,
+) -> Path:
+    """
+    Keep the customer's original file next to its column mapping so results can be merged back later.
+    """
+    root = _originals_root(user_id)
+    root.mkdir(parents=True, exist_ok=True)
+    suffix = Path(os.path.basename(file_name)).suffix.lower()
+    target = root / f"{task_id}{suffix}"
+    shutil.copyfile(source_path, target)
+    metadata = {
+        "file_name": os.path.basename(file_name),
+        "source": target.name,
+        "email_column_index": email_column_index,
+        "first_row_has_labels": first_row_has_labels,
+        "skip_disposable": skip_disposable,
+    }
+    (root / f"{task_id}.json").write_text(json.dumps(metadata), encoding="utf-8")
+    logger.info(
+        "upload.original_saved",
+        extra={
+            "user_id": user_id,
+            "task_id": task_id,
+            "file_name": metadata["file_name"],
+            "bytes": target.stat().st_size,
+        },
+    )
+    return target
+
+
+def _retention_cutoff(now: Optional[float] = None) -> float:
+    return (time.time() if now is None else now) - get_settings().upload_retention_days * 86400
+
+
+def _is_expired(path: Path, cutoff: float) -> bool:
+    try:
+        return path.stat().st_mtime < cutoff
+    except FileNotFoundError:
+        return False
+
+
+def load_original_upload(user_id: str, task_id: str) -> Optional[OriginalUpload]:
+    root = _originals_root(user_id)
+    metadata_path = root / f"{task_id}.json"
+    if not metadata_path.is_file():
+        return None
+    if _is_expired(metadata_path, _retention_cutoff()):
+        # Expired copies are gone for callers even before the next sweep removes them.
+        logger.info("upload.original_expired", extra={"user_id": user_id, "task_id": task_id})
+        return None
+    try:
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        source = root / str(metadata["source"])
+        original = OriginalUpload(
+            path=source,
+            file_name=str(metadata["file_name"]),
+            email_column_index=int(metadata["email_column_index"]),
+            first_row_has_labels=bool(metadata["first_row_has_labels"]),
+            skip_disposable=bool(metadata.get("skip_disposable", False)),
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        logger.error("upload.original_metadata_invalid", extra={"user_id": user_id, "task_id": task_id, "error": str(exc)})
+        return None
+    if not original.path.is_file():
+        logger.warning("upload.original_missing", extra={"user_id": user_id, "task_id": task_id})
+        return None
+    return original
+
+
+def _orders_root(user_id: str) -> Path:
+    return _uploads_root() / user_id / "orders"
+
+
+def persist_submission_order(user_id: str, task_id: str, emails: Sequence[str]) -> None:
+    """
+    Record the original order of a task whose emails were submitted in a different order.
+    """
+    root = _orders_root(user_id)
+    root.mkdir(parents=True, exist_ok=True)
+    target = root / f"{task_id}.json"
+    temp_path = target.with_suffix(".part")
+    temp_path.write_text(json.dumps(list(emails)), encoding="utf-8")
+    os.replace(temp_path, target)
+    logger.info("upload.submission_order_saved", extra={"user_id": user_id, "task_id": task_id, "count": len(emails)})
+
+
+def load_submission_order(user_id: str, task_id: str) -> Optional[List[str]]:
+    path = _orders_root(user_id) / f"{task_id}.json"
+    if not path.is_file() or _is_expired(path, _retention_cutoff()):
+        return None
+    try:
+        emails = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError as exc:
+        logger.error("upload.submission_order_invalid", extra={"user_id": user_id, "task_id": task_id, "error": str(exc)})
+        return None
+    if not isinstance(emails, list):
+        logger.error("upload.submission_order_invalid", extra={"user_id": user_id, "task_id": task_id})
+        return None
+    return [str(email) for email in emails]
+
+
+def prune_expired_uploads(now: Optional[float] = None) -> int:
+    """
+    Delete kept originals and submission orders older than UPLOAD_RETENTION_DAYS.
+    Both are written once when a task is created, so the file age is the age of the task.
+    Returns the number of files removed.
+    """
+    cutoff = _retention_cutoff(now)
+    root = _uploads_root()
+    removed = 0
+    for pattern in ("*/originals/*", "*/orders/*"):
+        for path in root.glob(pattern):
+            if path.is_file() and _is_expired(path, cutoff):
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
+
+
+async def _run_retention_sweeper() -> None:
+    while True:
+        try:
+            removed = await anyio.to_thread.run_sync(prune_expired_uploads)
+        except OSError as exc:
+            logger.warning("upload.retention_sweep_failed", extra={"error": str(exc)})
+        else:
+            if removed:
+                logger.info("upload.retention_swept", extra={"removed": removed})
+        await anyio.sleep(RETENTION_SWEEP_SECONDS)
+
+
+@asynccontextmanager
+async def run_upload_retention() -> AsyncIterator[None]:
+    """Remove expired customer files at startup and then hourly while the context is open."""
+    async with anyio.create_task_group() as task_group:
+        task_group.start_soon(_run_retention_sweeper)
+        try:
+            yield
+        finally:
+            task_group.cancel_scope.cancel()
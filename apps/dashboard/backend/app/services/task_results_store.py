@@ -0,0 +1,574 @@
+"""
+Local SQLite store for the results of completed tasks.
+
+Completed task results never change, so the jobs of a finished task are copied once from the
+upstream jobs pages and then served locally (offset paging, filters, sorting). The store is
+disabled unless TASK_RESULTS_STORE_PATH is configured, and it evicts least-recently-used tasks
+once the stored payload size exceeds TASK_RESULTS_STORE_MAX_MB.
+
+Each task row carries a state. A worker claims a load by writing a 'loading' row in the shared
+database, so only one process pages a task from the upstream at a time; the claim is refreshed
+after every page and taken over once it goes quiet for LOAD_STALE_SECONDS. A task whose payload
+alone exceeds the size limit is recorded as 'too_large' instead of being stored and evicted again.
+"""
+
+import logging
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from threading import Lock
+from typing import Any, Optional
+
+import anyio
+from fastapi import BackgroundTasks
+from starlette.concurrency import run_in_threadpool
+
+from ..clients.external import ExternalAPIClient, ExternalAPIError, TaskDetailResponse, TaskEmailJob, TaskJobsResponse
+from ..core.settings import get_settings
+from . import storage
+from .domain_clustering import OriginalPositions
+
+logger = logging.getLogger(__name__)
+
+JOB_SORT_COLUMNS = {
+    "position": "position",
+    "email": "email_address",
+    "domain": "domain",
+    "status": "email_status",
+    "validated_at": "validated_at",
+}
+_TERMINAL_STATUSES = {"completed", "failed"}
+
+STATE_LOADING = "loading"
+STATE_STORED = "stored"
+STATE_TOO_LARGE = "too_large"
+LOAD_STALE_SECONDS = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_results (
+    user_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    job_count INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    last_accessed_at REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'stored',
+    load_id TEXT,
+    PRIMARY KEY (user_id, task_id)
+);
+CREATE TABLE IF NOT EXISTS task_result_jobs (
+    user_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    email_address TEXT,
+    domain TEXT,
+    job_status TEXT,
+    email_status TEXT,
+    is_role_based INTEGER,
+    is_disposable INTEGER,
+    is_catchall INTEGER,
+    validated_at TEXT,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (user_id, task_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_task_result_jobs_status
+    ON task_result_jobs (user_id, task_id, email_status, position);
+CREATE INDEX IF NOT EXISTS idx_task_result_jobs_domain
+    ON task_result_jobs (user_id, task_id, domain, position);
+CREATE INDEX IF NOT EXISTS idx_task_result_jobs_flags
+    ON task_result_jobs (user_id, task_id, is_role_based, is_disposable, is_catchall, position);
+CREATE INDEX IF NOT EXISTS idx_task_results_accessed
+    ON task_results (last_accessed_at);
+"""
+
+_STATE_LOCK = Lock()
+_INITIALIZED_PATHS: set[str] = set()
+_INCOMPLETE_CHECKED_AT: dict[tuple[str, str], float] = {}
+
+
+def _normalize_text(value: object) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    trimmed = value.strip()
+    return trimmed or None
+
+
+def _store_path() -> Optional[Path]:
+    configured = _normalize_text(get_settings().task_results_store_path)
+    return Path(configured) if configured else None
+
+
+def is_enabled() -> bool:
+    return _store_path() is not None
+
+
+def _connect() -> sqlite3.Connection:
+    path = _store_path()
+    if path is None:
+        raise RuntimeError("Task results store is not configured")
+    key = str(path)
+    with _STATE_LOCK:
+        needs_init = key not in _INITIALIZED_PATHS
+    if needs_init:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(key, timeout=10)
+    if needs_init:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(task_results)")}
+        if "state" not in columns:
+            # Stores created before load claims existed only held fully stored tasks.
+            conn.execute("ALTER TABLE task_results ADD COLUMN state TEXT NOT NULL DEFAULT 'stored'")
+            conn.execute("ALTER TABLE task_results ADD COLUMN load_id TEXT")
+        conn.commit()
+        with _STATE_LOCK:
+            _INITIALIZED_PATHS.add(key)
+    return conn
+
+
+def _flag(value: object) -> Optional[int]:
+    if isinstance(value, bool):
+        return int(value)
+    return None
+
+
+def _job_row(user_id: str, task_id: str, position: int, job: TaskEmailJob) -> tuple[Any, ...]:
+    email = job.email or {}
+    address = _normalize_text(job.email_address) or _normalize_text(email.get("email_address"))
+    domain = address.rsplit("@", 1)[1].lower() if address and "@" in address else None
+    email_status = _normalize_text(email.get("status"))
+    return (
+        user_id,
+        task_id,
+        position,
+        address.lower() if address else None,
+        domain,
+        _normalize_text(job.status),
+        email_status.lower() if email_status else None,
+        _flag(email.get("is_role_based")),
+        _flag(email.get("is_disposable")),
+        _flag(email.get("is_catchall")),
+        _normalize_text(email.get("validated_at")),
+        job.model_dump_json(),
+    )
+
+
+def is_task_complete(task: TaskDetailResponse) -> bool:
+    if _normalize_text(task.finished_at):
+        return True
+    file_status = _normalize_text(task.file.status) if task.file else None
+    if file_status and file_status.lower() in _TERMINAL_STATUSES:
+        return True
+    progress_percent = task.metrics.progress_percent if task.metrics else None
+    return isinstance(progress_percent, int) and progress_percent >= 100
+
+
+def _max_bytes() -> int:
+    return get_settings().task_results_store_max_mb * 1024 * 1024
+
+
+def task_state(user_id: str, task_id: str) -> Optional[str]:
+    """Return the stored state of a task, or None when the store holds nothing for it."""
+    if not is_enabled():
+        return None
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT state FROM task_results WHERE user_id = ? AND task_id = ?",
+            (user_id, task_id),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def has_task(user_id: str, task_id: str) -> bool:
+    return task_state(user_id, task_id) == STATE_STORED
+
+
+def _insert_jobs(
+    conn: sqlite3.Connection,
+    user_id: str,
+    task_id: str,
+    start_position: int,
+    jobs: list[TaskEmailJob],
+    original_positions: Optional[OriginalPositions] = None,
+) -> int:
+    positions = [start_position + index for index in range(len(jobs))]
+    if original_positions is not None:
+        positions = [original_positions.resolve(job.email_address, position) for position, job in zip(positions, jobs)]
+    rows = [_job_row(user_id, task_id, position, job) for position, job in zip(positions, jobs)]
+    # Pages are written under a load claim; replacing keeps a retried page from hitting the primary key.
+    conn.executemany("INSERT OR REPLACE INTO task_result_jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return sum(len(row[-1]) for row in rows)
+
+
+def _commit_task(conn: sqlite3.Connection, user_id: str, task_id: str, job_count: int, size_bytes: int) -> bool:
+    """Record a fully written task, or refuse it when its payload alone exceeds the size limit."""
+    if size_bytes > _max_bytes():
+        _mark_too_large(conn, user_id, task_id, size_bytes)
+        return False
+    now = time.time()
+    conn.execute(
+        "INSERT OR REPLACE INTO task_results"
+        " (user_id, task_id, job_count, size_bytes, stored_at, last_accessed_at, state, load_id)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+        (user_id, task_id, job_count, size_bytes, now, now, STATE_STORED),
+    )
+    conn.commit()
+    _evict(conn)
+    logger.info(
+        "task_results_store.stored",
+        extra={"user_id": user_id, "task_id": task_id, "job_count": job_count, "size_bytes": size_bytes},
+    )
+    return True
+
+
+def _mark_too_large(conn: sqlite3.Connection, user_id: str, task_id: str, size_bytes: int) -> None:
+    """
+    Drop the rows of a task that cannot fit in the store and remember its size, so later requests
+    do not page it from the upstream again. The task is retried once the limit is raised above it.
+    """
+    now = time.time()
+    conn.execute("DELETE FROM task_result_jobs WHERE user_id = ? AND task_id = ?", (user_id, task_id))
+    conn.execute(
+        "INSERT OR REPLACE INTO task_results"
+        " (user_id, task_id, job_count, size_bytes, stored_at, last_accessed_at, state, load_id)"
+        " VALUES (?, ?, 0, ?, ?, ?, ?, NULL)",
+        (user_id, task_id, size_bytes, now, now, STATE_TOO_LARGE),
+    )
+    conn.commit()
+    logger.warning(
+        "task_results_store.task_too_large",
+        extra={"user_id": user_id, "task_id": task_id, "size_bytes": size_bytes, "max_bytes": _max_bytes()},
+    )
+
+
+def _load_original_positions(user_id: str, task_id: str) -> Optional[OriginalPositions]:
+    """Tasks submitted in domain-clustered order are stored in their original order."""
+    emails = storage.load_submission_order(user_id, task_id)
+    return OriginalPositions(emails) if emails is not None else None
+
+
+def store_task_jobs(user_id: str, task_id: str, jobs: list[TaskEmailJob]) -> bool:
+    original_positions = _load_original_positions(user_id, task_id)
+    with closing(_connect()) as conn:
+        conn.execute("DELETE FROM task_result_jobs WHERE user_id = ? AND task_id = ?", (user_id, task_id))
+        size_bytes = _insert_jobs(conn, user_id, task_id, 0, jobs, original_positions)
+        return _commit_task(conn, user_id, task_id, len(jobs), size_bytes)
+
+
+def _evict(conn: sqlite3.Connection) -> None:
+    # Only stored tasks hold rows; the task just stored is the most recently used, and it fits on its
+    # own, so it is never the one evicted.
+    max_bytes = _max_bytes()
+    total = conn.execute(
+        "SELECT COALESCE(SUM(size_bytes), 0) FROM task_results WHERE state = ?", (STATE_STORED,)
+    ).fetchone()[0]
+    if total <= max_bytes:
+        return
+    evicted = []
+    for user_id, task_id, size_bytes in conn.execute(
+        "SELECT user_id, task_id, size_bytes FROM task_results WHERE state = ? ORDER BY last_accessed_at ASC",
+        (STATE_STORED,),
+    ).fetchall():
+        if total <= max_bytes:
+            break
+        conn.execute("DELETE FROM task_result_jobs WHERE user_id = ? AND task_id = ?", (user_id, task_id))
+        conn.execute("DELETE FROM task_results WHERE user_id = ? AND task_id = ?", (user_id, task_id))
+        total -= size_bytes
+        evicted.append(task_id)
+    conn.commit()
+    logger.info("task_results_store.evicted", extra={"task_ids": evicted, "remaining_bytes": total})
+
+
+def query_task_jobs(
+    user_id: str,
+    task_id: str,
+    *,
+    limit: int,
+    offset: int,
+    email_status: Optional[str] = None,
+    domain: Optional[str] = None,
+    is_role_based: Optional[bool] = None,
+    is_disposable: Optional[bool] = None,
+    is_catchall: Optional[bool] = None,
+    sort: str = "position",
+    descending: bool = False,
+) -> Optional[TaskJobsResponse]:
+    if sort not in JOB_SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort}")
+    clauses = ["user_id = ?", "task_id = ?"]
+    params: list[Any] = [user_id, task_id]
+    if email_status:
+        clauses.append("email_status = ?")
+        params.append(email_status.strip().lower())
+    if domain:
+        clauses.append("domain = ?")
+        params.append(domain.strip().lower())
+    for column, value in (
+        ("is_role_based", is_role_based),
+        ("is_disposable", is_disposable),
+        ("is_catchall", is_catchall),
+    ):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(int(value))
+    where = " AND ".join(clauses)
+    direction = "DESC" if descending else "ASC"
+    order_by = JOB_SORT_COLUMNS[sort]
+    order = f"{order_by} {direction}, position {direction}" if order_by != "position" else f"position {direction}"
+
+    with closing(_connect()) as conn:
+        updated = conn.execute(
+            "UPDATE task_results SET last_accessed_at = ? WHERE user_id = ? AND task_id = ? AND state = ?",
+            (time.time(), user_id, task_id, STATE_STORED),
+        )
+        if updated.rowcount == 0:
+            return None
+        conn.commit()
+        count = conn.execute(f"SELECT COUNT(*) FROM task_result_jobs WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT payload FROM task_result_jobs WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            [*params, limit, offset],
+        ).fetchall()
+    jobs = [TaskEmailJob.model_validate_json(payload) for (payload,) in rows]
+    return TaskJobsResponse(jobs=jobs, count=count, limit=limit, offset=offset)
+
+
+def export_task_jobs(user_id: str, task_id: str, target: Path, batch_size: int = 1000) -> int:
+    """
+    Write every stored job of a task to ``target`` in position order, one JSON object per line.
+    Stored payloads are copied as-is in batches, so no job is parsed and memory stays bounded.
+    Returns the number of jobs written.
+    """
+    count = 0
+    with closing(_connect()) as conn, target.open("w", encoding="utf-8") as handle:
+        cursor = conn.execute(
+            "SELECT payload FROM task_result_jobs WHERE user_id = ? AND task_id = ? ORDER BY position ASC",
+            (user_id, task_id),
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return count
+            handle.writelines(f"{payload}\n" for (payload,) in rows)
+            count += len(rows)
+
+
+async def iter_upstream_job_pages(client: ExternalAPIClient, task_id: str, page_size: int):
+    offset = 0
+    while True:
+        page = await client.list_task_jobs(task_id, limit=page_size, offset=offset)
+        jobs = list(page.jobs or [])
+        if jobs:
+            yield jobs
+        offset += len(jobs)
+        if len(jobs) < page_size or (page.count is not None and offset >= page.count):
+            return
+
+
+def _claim_task_load(user_id: str, task_id: str, now: Optional[float] = None) -> tuple[Optional[str], Optional[str]]:
+    """
+    Claim the load of a task for this worker and clear any rows left by an earlier attempt.
+    Returns (load id, None) when claimed, otherwise (None, state) with the state that blocked the claim.
+    """
+    now = time.time() if now is None else now
+    load_id = uuid.uuid4().hex
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT state, size_bytes, stored_at FROM task_results WHERE user_id = ? AND task_id = ?",
+            (user_id, task_id),
+        ).fetchone()
+        if row is not None:
+            state, size_bytes, stored_at = row
+            blocked = (
+                state == STATE_STORED
+                or (state == STATE_LOADING and now - stored_at < LOAD_STALE_SECONDS)
+                or (state == STATE_TOO_LARGE and size_bytes > _max_bytes())
+            )
+            if blocked:
+                conn.rollback()
+                return None, state
+        conn.execute("DELETE FROM task_result_jobs WHERE user_id = ? AND task_id = ?", (user_id, task_id))
+        conn.execute(
+            "INSERT OR REPLACE INTO task_results"
+            " (user_id, task_id, job_count, size_bytes, stored_at, last_accessed_at, state, load_id)"
+            " VALUES (?, ?, 0, 0, ?, ?, ?, ?)",
+            (user_id, task_id, now, now, STATE_LOADING, load_id),
+        )
+        conn.commit()
+    return load_id, None
+
+
+def _release_task_load(user_id: str, task_id: str, load_id: str) -> None:
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        released = conn.execute(
+            "DELETE FROM task_results WHERE user_id = ? AND task_id = ? AND load_id = ?",
+            (user_id, task_id, load_id),
+        )
+        if released.rowcount:
+            conn.execute("DELETE FROM task_result_jobs WHERE user_id = ? AND task_id = ?", (user_id, task_id))
+        conn.commit()
+
+
+def _append_task_jobs(
+    user_id: str,
+    task_id: str,
+    load_id: str,
+    start_position: int,
+    jobs: list[TaskEmailJob],
+    original_positions: Optional[OriginalPositions],
+) -> Optional[int]:
+    """Write one page under the load claim and refresh it; returns None once another worker took it over."""
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        claimed = conn.execute(
+            "UPDATE task_results SET stored_at = ? WHERE user_id = ? AND task_id = ? AND load_id = ?",
+            (time.time(), user_id, task_id, load_id),
+        )
+        if claimed.rowcount == 0:
+            conn.rollback()
+            return None
+        size_bytes = _insert_jobs(conn, user_id, task_id, start_position, jobs, original_positions)
+        conn.commit()
+    return size_bytes
+
+
+def _finish_task_load(user_id: str, task_id: str, load_id: str, job_count: int, size_bytes: int) -> Optional[bool]:
+    """Record the loaded task; returns None when the claim was lost, otherwise whether the task was stored."""
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT 1 FROM task_results WHERE user_id = ? AND task_id = ? AND load_id = ?",
+            (user_id, task_id, load_id),
+        ).fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        return _commit_task(conn, user_id, task_id, job_count, size_bytes)
+
+
+def _refuse_task_load(user_id: str, task_id: str, load_id: str, size_bytes: int) -> None:
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT 1 FROM task_results WHERE user_id = ? AND task_id = ? AND load_id = ?",
+            (user_id, task_id, load_id),
+        ).fetchone()
+        if row is None:
+            conn.rollback()
+            return
+        _mark_too_large(conn, user_id, task_id, size_bytes)
+
+
+async def load_task(client: ExternalAPIClient, *, user_id: str, task_id: str) -> bool:
+    """
+    Copy the jobs of a completed task from the upstream into the store.
+    Returns True when the task is stored, False when it is incomplete, too large, loading elsewhere or
+    failed to load. SQLite work runs in the thread pool so a long backfill never blocks the event loop.
+    """
+    settings = get_settings()
+    key = (user_id, task_id)
+    now = time.monotonic()
+    with _STATE_LOCK:
+        checked_at = _INCOMPLETE_CHECKED_AT.get(key)
+        if checked_at is not None and now - checked_at < settings.task_results_store_recheck_seconds:
+            return False
+
+    start = time.time()
+    load_id: Optional[str] = None
+    try:
+        load_id, state = await run_in_threadpool(_claim_task_load, user_id, task_id)
+        if load_id is None:
+            return state == STATE_STORED
+        detail = await client.get_task_detail(task_id)
+        if not is_task_complete(detail):
+            with _STATE_LOCK:
+                _INCOMPLETE_CHECKED_AT[key] = now
+            return False
+        original_positions = await run_in_threadpool(_load_original_positions, user_id, task_id)
+        max_bytes = _max_bytes()
+        job_count = 0
+        size_bytes = 0
+        pages = 0
+        # Each page is committed as it arrives so the write lock is never held across upstream calls.
+        # Job rows stay invisible until the task row is marked stored, so partial loads are never served.
+        async for jobs in iter_upstream_job_pages(client, task_id, settings.task_results_store_page_size):
+            written = await run_in_threadpool(
+                _append_task_jobs, user_id, task_id, load_id, job_count, jobs, original_positions
+            )
+            if written is None:
+                logger.info("task_results_store.load_taken_over", extra={"user_id": user_id, "task_id": task_id})
+                load_id = None
+                return False
+            size_bytes += written
+            job_count += len(jobs)
+            pages += 1
+            if size_bytes > max_bytes:
+                # Stop paging as soon as the task cannot fit; the marker keeps later requests from retrying.
+                await run_in_threadpool(_refuse_task_load, user_id, task_id, load_id, size_bytes)
+                load_id = None
+                return False
+        stored = await run_in_threadpool(_finish_task_load, user_id, task_id, load_id, job_count, size_bytes)
+        load_id = None
+        if not stored:
+            return False
+        with _STATE_LOCK:
+            _INCOMPLETE_CHECKED_AT.pop(key, None)
+        logger.info(
+            "task_results_store.loaded",
+            extra={
+                "user_id": user_id,
+                "task_id": task_id,
+                "pages": pages,
+                "duration_ms": round((time.time() - start) * 1000, 2),
+            },
+        )
+        return True
+    except ExternalAPIError as exc:
+        logger.warning(
+            "task_results_store.load_failed",
+            extra={"user_id": user_id, "task_id": task_id, "status_code": exc.status_code, "details": exc.details},
+        )
+        return False
+    except Exception as exc:  # noqa: BLE001
+        logger.exception(
+            "task_results_store.load_exception",
+            extra={"user_id": user_id, "task_id": task_id, "error": str(exc)},
+        )
+        return False
+    finally:
+        if load_id is not None:
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(_release_task_load, user_id, task_id, load_id)
+
+
+async def ensure_task_loaded(
+    client: ExternalAPIClient,
+    *,
+    user_id: str,
+    task_id: str,
+    background: Optional[BackgroundTasks] = None,
+) -> bool:
+    """
+    Make sure the results of a completed task are stored locally.
+    Returns True when the task can be served from the store, False when callers should use the upstream.
+    With ``background`` a missing task is loaded after the response is sent and False is returned,
+    so the caller serves the current request from the upstream instead of waiting for the backfill.
+    """
+    if not is_enabled():
+        return False
+    if await run_in_threadpool(has_task, user_id, task_id):
+        return True
+    if background is not None:
+        background.add_task(load_task, client, user_id=user_id, task_id=task_id)
+        return False
+    return await load_task(client, user_id=user_id, task_id=task_id)
+
+
+def clear_task_results_state() -> None:
+    with _STATE_LOCK:
+        _INITIALIZED_PATHS.clear()
+        _INCOMPLETE_CHECKED_AT.clear()
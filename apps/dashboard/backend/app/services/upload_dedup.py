@@ -0,0 +1,82 @@
+"""
+Short-lived index of recent batch uploads, keyed by user, file content, email column and every
+option that changes how the file is parsed.
+
+Re-uploading the exact same file (for example after a browser retry) within
+UPLOAD_DEDUP_WINDOW_SECONDS returns the earlier upload response instead of creating and billing
+a new upstream task. While the first upload is still in flight, an identical one waits for its
+outcome rather than racing it. The index is per process and held in memory.
+"""
+
+import hashlib
+import json
+import logging
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import anyio
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 10_000
+
+_RECENT_UPLOADS: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_PENDING_UPLOADS: Dict[str, anyio.Event] = {}
+_UPLOAD_DEDUP_LOCK = Lock()
+
+
+def upload_fingerprint(
+    user_id: str, content_sha256: str, email_column: str, parse_options: Mapping[str, Any]
+) -> str:
+    """Same file, same column and same parse options; any difference yields a different task."""
+    options = json.dumps(dict(parse_options), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{user_id}\0{content_sha256}\0{email_column}\0{options}".encode("utf-8")).hexdigest()
+
+
+def _prune(now: float) -> None:
+    expired = [key for key, (expires_at, _) in _RECENT_UPLOADS.items() if expires_at <= now]
+    for key in expired:
+        del _RECENT_UPLOADS[key]
+    # Entries are inserted in time order, so the first ones are the oldest.
+    while len(_RECENT_UPLOADS) >= MAX_ENTRIES:
+        del _RECENT_UPLOADS[next(iter(_RECENT_UPLOADS))]
+
+
+async def claim_upload(fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the recorded response for a recent identical upload, or None once the caller owns it.
+
+    A caller that gets None must call ``release_upload`` when done, after ``record_upload`` on success.
+    """
+    while True:
+        with _UPLOAD_DEDUP_LOCK:
+            entry = _RECENT_UPLOADS.get(fingerprint)
+            if entry is not None and entry[0] > monotonic():
+                return dict(entry[1])
+            pending = _PENDING_UPLOADS.get(fingerprint)
+            if pending is None:
+                _PENDING_UPLOADS[fingerprint] = anyio.Event()
+                return None
+        await pending.wait()
+
+
+def record_upload(fingerprint: str, response: Dict[str, Any], window_seconds: int) -> None:
+    now = monotonic()
+    with _UPLOAD_DEDUP_LOCK:
+        _prune(now)
+        _RECENT_UPLOADS.pop(fingerprint, None)
+        _RECENT_UPLOADS[fingerprint] = (now + window_seconds, dict(response))
+
+
+def release_upload(fingerprint: str) -> None:
+    with _UPLOAD_DEDUP_LOCK:
+        pending = _PENDING_UPLOADS.pop(fingerprint, None)
+    if pending is not None:
+        pending.set()
+
+
+def clear_upload_dedup_state() -> None:
+    with _UPLOAD_DEDUP_LOCK:
+        _RECENT_UPLOADS.clear()
+        _PENDING_UPLOADS.clear()
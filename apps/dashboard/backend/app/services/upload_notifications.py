@@ -1,16 +1,27 @@
 import hashlib
 import hmac
 import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from functools import partial
 from typing import Any, Mapping, Optional
 
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 
-from ..clients.external import ExternalAPIClient, ExternalAPIError, TaskDetailResponse
+from ..clients.external import ExternalAPIClient, ExternalAPIError, TaskDetailResponse, UploadStatusResponse
 from ..core.settings import get_settings
-from . import supabase_client
+from . import email_outbox, notification_digest, recipient_cache, supabase_client
 from .billing_events import delete_billing_event, record_billing_event
 from .external_credits import _resolve_admin_token
-from .smtp_mailer import SMTPConfigurationError, SMTPDeliveryError, send_bulk_upload_notification_email
+from .smtp_mailer import (
+    DigestEntry,
+    SMTPConfigurationError,
+    SMTPDeliveryError,
+    deliver,
+    send_bulk_upload_notification_email,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +43,7 @@ def _normalize_outcome(value: object) -> Optional[str]:
     return None
 
 
-def _resolve_outcome(task_detail: TaskDetailResponse, payload_data: dict[str, Any]) -> Optional[str]:
-    file_metadata = getattr(task_detail, "file", None)
-    file_status = _normalize_outcome(getattr(file_metadata, "status", None) if file_metadata else None)
-    if file_status:
-        return file_status
-
+def _outcome_from_stats(payload_data: dict[str, Any]) -> Optional[str]:
     stats = payload_data.get("stats") if isinstance(payload_data, dict) else None
     if not isinstance(stats, dict):
         return None
@@ -51,6 +57,14 @@ def _resolve_outcome(task_detail: TaskDetailResponse, payload_data: dict[str, An
     return None
 
 
+def _resolve_outcome(task_detail: TaskDetailResponse, payload_data: dict[str, Any]) -> Optional[str]:
+    file_metadata = getattr(task_detail, "file", None)
+    file_status = _normalize_outcome(getattr(file_metadata, "status", None) if file_metadata else None)
+    if file_status:
+        return file_status
+    return _outcome_from_stats(payload_data)
+
+
 def _is_task_completion_payload(data: object) -> bool:
     if not isinstance(data, dict):
         return False
@@ -77,12 +91,7 @@ def _resolve_file_name(task: TaskDetailResponse) -> Optional[str]:
     return _normalize_text(getattr(file_metadata, "filename", None)) or _normalize_text(getattr(task, "file_name", None))
 
 
-def _resolve_email_count(task: TaskDetailResponse, payload_data: dict[str, Any]) -> Optional[int]:
-    file_metadata = getattr(task, "file", None)
-    file_count = getattr(file_metadata, "email_count", None) if file_metadata else None
-    if isinstance(file_count, int) and file_count >= 0:
-        return file_count
-
+def _email_count_from_payload(payload_data: dict[str, Any]) -> Optional[int]:
     stats = payload_data.get("stats") if isinstance(payload_data, dict) else None
     if isinstance(stats, dict):
         total = stats.get("total")
@@ -96,6 +105,146 @@ def _resolve_email_count(task: TaskDetailResponse, payload_data: dict[str, Any])
     return None
 
 
+def _resolve_email_count(task: TaskDetailResponse, payload_data: dict[str, Any]) -> Optional[int]:
+    file_metadata = getattr(task, "file", None)
+    file_count = getattr(file_metadata, "email_count", None) if file_metadata else None
+    if isinstance(file_count, int) and file_count >= 0:
+        return file_count
+    return _email_count_from_payload(payload_data)
+
+
+@dataclass
+class _TaskMetadata:
+    file_backed: Optional[bool]
+    outcome: Optional[str]
+    user_id: Optional[str]
+    file_name: Optional[str]
+    email_count: Optional[int]
+    source: str
+
+    def is_sufficient(self) -> bool:
+        if self.file_backed is False:
+            return True
+        return self.file_backed is True and None not in (self.outcome, self.user_id, self.file_name, self.email_count)
+
+
+def _payload_upload_id(payload_data: dict[str, Any]) -> Optional[str]:
+    file_data = payload_data.get("file")
+    if isinstance(file_data, dict) and _normalize_text(file_data.get("upload_id")):
+        return _normalize_text(file_data.get("upload_id"))
+    return _normalize_text(payload_data.get("upload_id"))
+
+
+def _metadata_from_payload(payload_data: dict[str, Any]) -> _TaskMetadata:
+    file_data = payload_data.get("file")
+    file_data = file_data if isinstance(file_data, dict) else {}
+    file_name = _normalize_text(file_data.get("filename")) or _normalize_text(payload_data.get("file_name"))
+    is_file_backed = payload_data.get("is_file_backed")
+    if isinstance(is_file_backed, bool):
+        file_backed: Optional[bool] = is_file_backed or bool(file_name or _payload_upload_id(payload_data))
+    else:
+        # Without an explicit flag, file details prove a file-backed task but their absence proves nothing.
+        file_backed = True if file_name or _payload_upload_id(payload_data) else None
+    file_count = file_data.get("email_count")
+    if not isinstance(file_count, int) or file_count < 0:
+        file_count = _email_count_from_payload(payload_data)
+    return _TaskMetadata(
+        file_backed=file_backed,
+        outcome=_normalize_outcome(file_data.get("status")) or _outcome_from_stats(payload_data),
+        user_id=_normalize_text(payload_data.get("user_id")),
+        file_name=file_name,
+        email_count=file_count,
+        source="payload",
+    )
+
+
+def _metadata_from_upload_status(upload: UploadStatusResponse, payload_data: dict[str, Any]) -> _TaskMetadata:
+    upload_task = upload.task
+    return _TaskMetadata(
+        file_backed=True,
+        outcome=_normalize_outcome(upload.status) or _outcome_from_stats(payload_data),
+        user_id=_normalize_text(upload.user_id)
+        or _normalize_text(getattr(upload_task, "user_id", None))
+        or _normalize_text(payload_data.get("user_id")),
+        file_name=_normalize_text(upload.filename),
+        email_count=upload.email_count
+        if isinstance(upload.email_count, int) and upload.email_count >= 0
+        else _email_count_from_payload(payload_data),
+        source="upload_status",
+    )
+
+
+def _metadata_from_task_detail(task_detail: TaskDetailResponse, payload_data: dict[str, Any]) -> _TaskMetadata:
+    return _TaskMetadata(
+        file_backed=_is_file_backed_task(task_detail),
+        outcome=_resolve_outcome(task_detail, payload_data),
+        user_id=_resolve_user_id(task_detail, payload_data),
+        file_name=_resolve_file_name(task_detail),
+        email_count=_resolve_email_count(task_detail, payload_data),
+        source="task_detail",
+    )
+
+
+async def _resolve_task_metadata(task_id: str, payload_data: dict[str, Any]) -> Optional[_TaskMetadata]:
+    """
+    Decide file-backed status, outcome, user, file name and count from the payload when it carries
+    them all. Otherwise ask the upstream: the upload status (no jobs) when the payload names the
+    upload, the full task detail as a last resort. Returns None when no admin client is available.
+    """
+    metadata = _metadata_from_payload(payload_data)
+    if metadata.is_sufficient():
+        logger.info("bulk_upload_notification.metadata_resolved", extra={"task_id": task_id, "source": "payload"})
+        return metadata
+
+    client = _build_admin_client()
+    if client is None:
+        return None
+
+    upload_id = _payload_upload_id(payload_data)
+    start = time.monotonic()
+    if upload_id:
+        try:
+            upload = await client.get_upload_status(upload_id)
+        except ExternalAPIError as exc:
+            # The task detail below answers the same questions, just with a heavier response.
+            logger.warning(
+                "bulk_upload_notification.upload_status_failed",
+                extra={
+                    "task_id": task_id,
+                    "upload_id": upload_id,
+                    "status_code": exc.status_code,
+                    "details": exc.details,
+                },
+            )
+            upload_id = None
+        else:
+            metadata = _metadata_from_upload_status(upload, payload_data)
+    try:
+        if not upload_id or not metadata.is_sufficient():
+            task_detail = await client.get_task_detail(task_id)
+            metadata = _metadata_from_task_detail(task_detail, payload_data)
+    except ExternalAPIError as exc:
+        logger.error(
+            "bulk_upload_notification.task_detail_failed",
+            extra={
+                "task_id": task_id,
+                "status_code": exc.status_code,
+                "details": exc.details,
+                "duration_ms": round((time.monotonic() - start) * 1000, 2),
+            },
+        )
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Unable to fetch task detail") from exc
+    logger.info(
+        "bulk_upload_notification.metadata_resolved",
+        extra={
+            "task_id": task_id,
+            "source": metadata.source,
+            "upstream_ms": round((time.monotonic() - start) * 1000, 2),
+        },
+    )
+    return metadata
+
+
 def _resolve_recipient_email(user_id: str) -> Optional[str]:
     try:
         profile = supabase_client.fetch_profile(user_id)
@@ -151,10 +300,20 @@ def _build_admin_client() -> Optional[ExternalAPIClient]:
     )
 
 
+def verify_bulk_upload_signature(raw_body: bytes, headers: Mapping[str, str]) -> None:
+    _verify_signature(raw_body, headers, get_settings().bulk_upload_webhook_secret_key)
+
+
 async def process_bulk_upload_webhook(*, payload: dict[str, Any], raw_body: bytes, headers: Mapping[str, str]) -> dict[str, Any]:
-    settings = get_settings()
-    _verify_signature(raw_body, headers, settings.bulk_upload_webhook_secret_key)
+    verify_bulk_upload_signature(raw_body, headers)
+    return await handle_bulk_upload_event(payload)
 
+
+async def handle_bulk_upload_event(payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    Send the completion notification for a verified webhook payload.
+    Raises HTTPException(503) on failures worth retrying.
+    """
     event_type = _normalize_text(payload.get("event_type"))
     task_id = _normalize_text(payload.get("task_id"))
     data = payload.get("data")
@@ -176,37 +335,28 @@ async def process_bulk_upload_webhook(*, payload: dict[str, Any], raw_body: byte
 
     payload_data: dict[str, Any] = data
 
-    client = _build_admin_client()
-    if client is None:
+    metadata = await _resolve_task_metadata(task_id, payload_data)
+    if metadata is None:
         return {"received": True, "processed": False, "reason": "admin_token_missing"}
 
-    try:
-        task_detail = await client.get_task_detail(task_id)
-    except ExternalAPIError as exc:
-        logger.error(
-            "bulk_upload_notification.task_detail_failed",
-            extra={"task_id": task_id, "status_code": exc.status_code, "details": exc.details},
-        )
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Unable to fetch task detail") from exc
-
-    if not _is_file_backed_task(task_detail):
+    if not metadata.file_backed:
         logger.info(
             "bulk_upload_notification.non_file_task_ignored",
             extra={"task_id": task_id},
         )
         return {"received": True, "processed": False, "reason": "not_file_backed"}
 
-    outcome = _resolve_outcome(task_detail, payload_data)
+    outcome = metadata.outcome
     if outcome is None:
         logger.warning("bulk_upload_notification.outcome_unknown", extra={"task_id": task_id})
         return {"received": True, "processed": False, "reason": "outcome_unknown"}
 
-    user_id = _resolve_user_id(task_detail, payload_data)
+    user_id = metadata.user_id
     if not user_id:
         logger.warning("bulk_upload_notification.user_id_missing", extra={"task_id": task_id})
         return {"received": True, "processed": False, "reason": "user_id_missing"}
 
-    recipient_email = _resolve_recipient_email(user_id)
+    recipient_email = await recipient_cache.get_recipient_email(user_id, _resolve_recipient_email)
     if not recipient_email:
         logger.warning(
             "bulk_upload_notification.recipient_missing",
@@ -214,8 +364,8 @@ async def process_bulk_upload_webhook(*, payload: dict[str, Any], raw_body: byte
         )
         return {"received": True, "processed": False, "reason": "recipient_missing"}
 
-    file_name = _resolve_file_name(task_detail)
-    email_count = _resolve_email_count(task_detail, payload_data)
+    file_name = metadata.file_name
+    email_count = metadata.email_count
     if not file_name or email_count is None:
         logger.warning(
             "bulk_upload_notification.task_metadata_missing",
@@ -229,7 +379,8 @@ async def process_bulk_upload_webhook(*, payload: dict[str, Any], raw_body: byte
         return {"received": True, "processed": False, "reason": "task_metadata_missing"}
 
     idempotency_event_id = f"bulk_upload_notification:{task_id}:{outcome}"
-    recorded = record_billing_event(
+    record_idempotency_event = partial(
+        record_billing_event,
         event_id=idempotency_event_id,
         user_id=user_id,
         event_type=f"bulk_upload_notification.{outcome}",
@@ -238,29 +389,103 @@ async def process_bulk_upload_webhook(*, payload: dict[str, Any], raw_body: byte
         credits_granted=0,
         raw=payload,
     )
-    if not recorded:
+    duplicate = {"received": True, "processed": False, "reason": "duplicate_or_not_recorded"}
+
+    # Queued completions are written before the idempotency record (the queue is keyed by the
+    # event id), so a crash in between cannot leave a record for a notification never queued.
+    try:
+        digest_added = await notification_digest.add_completion(
+            user_id=user_id,
+            recipient_email=recipient_email,
+            entry=DigestEntry(outcome=outcome, file_name=file_name, email_count=email_count),
+            event_id=idempotency_event_id,
+        )
+    except sqlite3.Error as exc:
+        logger.error(
+            "bulk_upload_notification.digest_outbox_write_failed",
+            extra={"task_id": task_id, "event_id": idempotency_event_id, "error": str(exc)},
+        )
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Email queue unavailable") from exc
+    if digest_added is not None:
+        recorded = await run_in_threadpool(record_idempotency_event)
+        if not digest_added or not recorded:
+            if digest_added:
+                await notification_digest.withdraw_completion(user_id=user_id, event_id=idempotency_event_id)
+            logger.info(
+                "bulk_upload_notification.duplicate_or_not_recorded",
+                extra={"task_id": task_id, "event_id": idempotency_event_id, "outcome": outcome},
+            )
+            return duplicate
+        return {
+            "received": True,
+            "processed": True,
+            "task_id": task_id,
+            "outcome": outcome,
+            "recipient_email": recipient_email,
+            "file_name": file_name,
+            "email_count": email_count,
+            "digest": True,
+        }
+
+    if email_outbox.is_enabled():
+        try:
+            queued = await email_outbox.enqueue_notification(
+                message_key=idempotency_event_id,
+                recipient_email=recipient_email,
+                outcome=outcome,
+                file_name=file_name,
+                email_count=email_count,
+            )
+        except sqlite3.Error as exc:
+            logger.error(
+                "bulk_upload_notification.outbox_write_failed",
+                extra={"task_id": task_id, "event_id": idempotency_event_id, "error": str(exc)},
+            )
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Email queue unavailable") from exc
+        recorded = await run_in_threadpool(record_idempotency_event)
+        if not queued or not recorded:
+            if queued:
+                await run_in_threadpool(email_outbox.withdraw_message, idempotency_event_id)
+            logger.info(
+                "bulk_upload_notification.duplicate_or_not_recorded",
+                extra={"task_id": task_id, "event_id": idempotency_event_id, "outcome": outcome},
+            )
+            return duplicate
+        return {
+            "received": True,
+            "processed": True,
+            "task_id": task_id,
+            "outcome": outcome,
+            "recipient_email": recipient_email,
+            "file_name": file_name,
+            "email_count": email_count,
+            "queued": True,
+        }
+
+    if not await run_in_threadpool(record_idempotency_event):
         logger.info(
             "bulk_upload_notification.duplicate_or_not_recorded",
             extra={"task_id": task_id, "event_id": idempotency_event_id, "outcome": outcome},
         )
-        return {"received": True, "processed": False, "reason": "duplicate_or_not_recorded"}
+        return duplicate
 
     try:
-        send_bulk_upload_notification_email(
+        await deliver(
+            send_bulk_upload_notification_email,
             recipient_email=recipient_email,
             outcome=outcome,
             file_name=file_name,
             email_count=email_count,
         )
     except SMTPConfigurationError as exc:
-        delete_billing_event(idempotency_event_id)
+        await run_in_threadpool(delete_billing_event, idempotency_event_id)
         logger.error(
             "bulk_upload_notification.smtp_configuration_error",
             extra={"task_id": task_id, "event_id": idempotency_event_id, "error": str(exc)},
         )
         return {"received": True, "processed": False, "reason": "smtp_configuration_error"}
     except SMTPDeliveryError as exc:
-        delete_billing_event(idempotency_event_id)
+        await run_in_threadpool(delete_billing_event, idempotency_event_id)
         logger.error(
             "bulk_upload_notification.smtp_delivery_error",
             extra={"task_id": task_id, "event_id": idempotency_event_id, "error": str(exc)},
@@ -0,0 +1,333 @@
+"""
+Durable local inbox for bulk-upload webhooks.
+
+The webhook route verifies the signature, appends the event to a SQLite inbox and answers 202,
+so slow upstream, Supabase or SMTP work never holds the sender's request open. Worker tasks
+started with the app claim events in arrival order and run the notification handler with
+exponential retry; events that keep failing (or fail permanently) are marked dead. Identical
+deliveries share one inbox row, and a task's events are handled one at a time in arrival order.
+A claimed event carries a lease that its worker renews while the handler runs; an event whose
+lease ran out (its worker died or hung) is claimed again, and at startup only such events are
+returned to the queue. SQLite work runs in worker threads, never on the event loop. The inbox is
+disabled unless WEBHOOK_INBOX_PATH is configured.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager, closing
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from threading import Lock
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import anyio
+from fastapi import HTTPException
+
+from ..core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 3600.0
+DONE_RETENTION_SECONDS = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_inbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_key TEXT NOT NULL UNIQUE,
+    task_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    received_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    finished_at REAL,
+    last_error TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_pending
+    ON webhook_inbox (status, next_attempt_at, id);
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_task
+    ON webhook_inbox (task_id, status, id);
+"""
+
+# The oldest due event whose task has no earlier unfinished event, so each task is handled in order.
+# An event still 'processing' after its lease ran out belongs to a worker that died or hung, and
+# is claimed again like a due one; otherwise it would block its task until the next restart.
+_CLAIM_QUERY = """
+SELECT id, task_id, payload, attempts FROM webhook_inbox AS event
+WHERE ((status = 'pending' AND next_attempt_at <= ?) OR (status = 'processing' AND lease_expires_at <= ?))
+  AND NOT EXISTS (
+      SELECT 1 FROM webhook_inbox AS earlier
+      WHERE earlier.task_id = event.task_id AND earlier.id < event.id
+        AND earlier.status IN ('pending', 'processing')
+  )
+ORDER BY id
+LIMIT 1
+"""
+
+EventHandler = Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]
+
+_STATE_LOCK = Lock()
+_INITIALIZED_PATHS: set[str] = set()
+_WAKE: Optional[anyio.Event] = None
+
+
+@dataclass
+class InboxEvent:
+    id: int
+    task_id: str
+    payload: dict[str, Any]
+    attempts: int
+
+
+def _inbox_path() -> Optional[Path]:
+    configured = (get_settings().webhook_inbox_path or "").strip()
+    return Path(configured) if configured else None
+
+
+def is_enabled() -> bool:
+    return _inbox_path() is not None
+
+
+def _connect() -> sqlite3.Connection:
+    path = _inbox_path()
+    if path is None:
+        raise RuntimeError("Webhook inbox is not configured")
+    key = str(path)
+    with _STATE_LOCK:
+        needs_init = key not in _INITIALIZED_PATHS
+    if needs_init:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(key, timeout=10)
+    if needs_init:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(webhook_inbox)")}
+        if "lease_expires_at" not in columns:
+            # Inboxes created before leases existed.
+            conn.execute("ALTER TABLE webhook_inbox ADD COLUMN lease_expires_at REAL")
+        conn.commit()
+        with _STATE_LOCK:
+            _INITIALIZED_PATHS.add(key)
+    return conn
+
+
+def _store_event(payload: dict[str, Any], raw_body: bytes) -> tuple[int, bool]:
+    event_key = hashlib.sha256(raw_body).hexdigest()
+    task_id = payload.get("task_id")
+    task_id = task_id.strip() if isinstance(task_id, str) else ""
+    now = time.time()
+    with closing(_connect()) as conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO webhook_inbox (event_key, task_id, payload, status, received_at, next_attempt_at)"
+            " VALUES (?, ?, ?, 'pending', ?, ?)",
+            (event_key, task_id, json.dumps(payload), now, now),
+        )
+        conn.commit()
+        created = cursor.rowcount == 1
+        event_id = cursor.lastrowid
+        if not created:
+            event_id = conn.execute("SELECT id FROM webhook_inbox WHERE event_key = ?", (event_key,)).fetchone()[0]
+    logger.info("webhook_inbox.enqueued", extra={"event_id": event_id, "task_id": task_id, "duplicate": not created})
+    return event_id, created
+
+
+async def enqueue_event(payload: dict[str, Any], raw_body: bytes) -> tuple[int, bool]:
+    """
+    Store a verified webhook delivery. Returns the inbox id and False when the same body was
+    already received (the sender retried), in which case nothing new is queued.
+    """
+    event_id, created = await anyio.to_thread.run_sync(_store_event, payload, raw_body)
+    # Set on the event loop: anyio events are not thread-safe.
+    if created and _WAKE is not None:
+        _WAKE.set()
+    return event_id, created
+
+
+def claim_next_event(now: Optional[float] = None) -> Optional[InboxEvent]:
+    now = time.time() if now is None else now
+    lease_expires_at = now + get_settings().webhook_inbox_lease_seconds
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(_CLAIM_QUERY, (now, now)).fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        event_id, task_id, payload, attempts = row
+        conn.execute(
+            "UPDATE webhook_inbox SET status = 'processing', attempts = attempts + 1, lease_expires_at = ?"
+            " WHERE id = ?",
+            (lease_expires_at, event_id),
+        )
+        conn.commit()
+    return InboxEvent(id=event_id, task_id=task_id, payload=json.loads(payload), attempts=attempts + 1)
+
+
+def renew_lease(event_id: int) -> None:
+    with closing(_connect()) as conn:
+        conn.execute(
+            "UPDATE webhook_inbox SET lease_expires_at = ? WHERE id = ? AND status = 'processing'",
+            (time.time() + get_settings().webhook_inbox_lease_seconds, event_id),
+        )
+        conn.commit()
+
+
+def complete_event(event_id: int) -> None:
+    with closing(_connect()) as conn:
+        conn.execute(
+            "UPDATE webhook_inbox SET status = 'done', finished_at = ?, last_error = NULL, lease_expires_at = NULL"
+            " WHERE id = ?",
+            (time.time(), event_id),
+        )
+        conn.commit()
+
+
+def fail_event(event: InboxEvent, error: str, *, retryable: bool) -> str:
+    """Schedule a retry with exponential backoff, or mark the event dead. Returns the new status."""
+    settings = get_settings()
+    now = time.time()
+    dead = not retryable or event.attempts >= settings.webhook_inbox_max_attempts
+    delay = min(settings.webhook_inbox_retry_seconds * 2 ** (event.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+    status = "dead" if dead else "pending"
+    with closing(_connect()) as conn:
+        # Only the latest claim may reschedule: a worker whose lease was taken over must not reset the row.
+        conn.execute(
+            "UPDATE webhook_inbox SET status = ?, next_attempt_at = ?, finished_at = ?, last_error = ?,"
+            " lease_expires_at = NULL WHERE id = ? AND attempts = ?",
+            (status, now + delay, now if dead else None, error[:2000], event.id, event.attempts),
+        )
+        conn.commit()
+    return status
+
+
+def recover_interrupted_events(now: Optional[float] = None) -> int:
+    """
+    Return events left 'processing' by a stopped process to the queue. Events whose lease is still
+    being renewed belong to another live process and are left alone.
+    """
+    now = time.time() if now is None else now
+    with closing(_connect()) as conn:
+        cursor = conn.execute(
+            "UPDATE webhook_inbox SET status = 'pending', lease_expires_at = NULL"
+            " WHERE status = 'processing' AND (lease_expires_at IS NULL OR lease_expires_at <= ?)",
+            (now,),
+        )
+        conn.commit()
+    return cursor.rowcount
+
+
+def prune_finished_events(now: Optional[float] = None) -> int:
+    cutoff = (time.time() if now is None else now) - DONE_RETENTION_SECONDS
+    with closing(_connect()) as conn:
+        cursor = conn.execute(
+            "DELETE FROM webhook_inbox WHERE status IN ('done', 'dead') AND finished_at < ?", (cutoff,)
+        )
+        conn.commit()
+    return cursor.rowcount
+
+
+async def _renew_lease_while_running(event_id: int) -> None:
+    interval = get_settings().webhook_inbox_lease_seconds / 3
+    while True:
+        await anyio.sleep(interval)
+        try:
+            await anyio.to_thread.run_sync(renew_lease, event_id)
+        except sqlite3.Error as exc:
+            logger.warning("webhook_inbox.lease_renew_failed", extra={"event_id": event_id, "error": str(exc)})
+
+
+async def _run_handler(handler: EventHandler, event: InboxEvent) -> tuple[Optional[dict[str, Any]], str, bool]:
+    try:
+        return await handler(event.payload), "", False
+    except HTTPException as exc:
+        # Client errors (bad signature, bad payload) will not succeed on a retry.
+        return None, f"{exc.status_code}: {exc.detail}", exc.status_code >= 500
+    except Exception as exc:  # noqa: BLE001
+        return None, f"{type(exc).__name__}: {exc}", True
+
+
+async def process_next_event(handler: EventHandler) -> bool:
+    """Handle one due event; returns False when nothing was due."""
+    event = await anyio.to_thread.run_sync(claim_next_event)
+    if event is None:
+        return False
+    start = time.time()
+    async with anyio.create_task_group() as task_group:
+        task_group.start_soon(_renew_lease_while_running, event.id)
+        result, error, retryable = await _run_handler(handler, event)
+        task_group.cancel_scope.cancel()
+    if not error:
+        await anyio.to_thread.run_sync(complete_event, event.id)
+        logger.info(
+            "webhook_inbox.processed",
+            extra={
+                "event_id": event.id,
+                "task_id": event.task_id,
+                "attempts": event.attempts,
+                "processed": (result or {}).get("processed"),
+                "reason": (result or {}).get("reason"),
+                "duration_ms": round((time.time() - start) * 1000, 2),
+            },
+        )
+        return True
+    status = await anyio.to_thread.run_sync(partial(fail_event, event, error, retryable=retryable))
+    log = logger.error if status == "dead" else logger.warning
+    log(
+        "webhook_inbox.dead_lettered" if status == "dead" else "webhook_inbox.retry_scheduled",
+        extra={"event_id": event.id, "task_id": event.task_id, "attempts": event.attempts, "error": error},
+    )
+    return True
+
+
+async def _run_worker(handler: EventHandler, poll_seconds: float) -> None:
+    global _WAKE
+    while True:
+        try:
+            if await process_next_event(handler):
+                continue
+        except sqlite3.Error as exc:
+            logger.error("webhook_inbox.worker_error", extra={"error": str(exc)})
+        wake = _WAKE
+        if wake is None:
+            return
+        with anyio.move_on_after(poll_seconds):
+            await wake.wait()
+        if _WAKE is wake and wake.is_set():
+            _WAKE = anyio.Event()
+
+
+@asynccontextmanager
+async def run_webhook_inbox(handler: EventHandler) -> AsyncIterator[None]:
+    """Run the inbox workers for the lifetime of the context (no-op when the inbox is disabled)."""
+    global _WAKE
+    if not is_enabled():
+        yield
+        return
+    settings = get_settings()
+    recovered = await anyio.to_thread.run_sync(recover_interrupted_events)
+    pruned = await anyio.to_thread.run_sync(prune_finished_events)
+    logger.info(
+        "webhook_inbox.started",
+        extra={"workers": settings.webhook_inbox_workers, "recovered": recovered, "pruned": pruned},
+    )
+    _WAKE = anyio.Event()
+    try:
+        async with anyio.create_task_group() as task_group:
+            for _ in range(settings.webhook_inbox_workers):
+                task_group.start_soon(_run_worker, handler, settings.webhook_inbox_poll_seconds)
+            try:
+                yield
+            finally:
+                task_group.cancel_scope.cancel()
+    finally:
+        _WAKE = None
+        logger.info("webhook_inbox.stopped")
+
+
+def clear_webhook_inbox_state() -> None:
+    with _STATE_LOCK:
+        _INITIALIZED_PATHS.clear()
@@ -0,0 +1,146 @@
+"""
+Benchmark per-request authentication overhead with and without the verified-token cache.
+
+Runs the auth dependency directly (no HTTP stack) for one token reused across many requests, as a
+dashboard session does. Scenarios:
+  - hs256: the token carries a confirmation claim, verification is a single HMAC check;
+  - hs256_lookup: no confirmation claim, so each uncached request also looks up the auth user
+    (simulated with --lookup-ms of latency);
+  - rs256_jwks: HS256 fails and the token is verified with an RSA key from a (pre-fetched) JWKS.
+    Skipped when the cryptography package is not installed.
+
+Usage:
+    source .venv/bin/activate
+    python backend/scripts/benchmark_auth_token_cache.py --requests 2000 --lookup-ms 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+import jwt
+from starlette.requests import Request
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+os.environ.setdefault("EMAIL_API_BASE_URL", "https://api.benchmark")
+os.environ.setdefault("SUPABASE_URL", "https://sb.benchmark")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("SUPABASE_AUTH_COOKIE_NAME", "sb-benchmark-auth-token")
+os.environ.setdefault("MANUAL_MAX_EMAILS", "10000")
+os.environ.setdefault("LATEST_UPLOADS_LIMIT", "6")
+
+from app.core import auth as auth_module  # noqa: E402
+from app.core import token_cache  # noqa: E402
+from app.core.settings import get_settings  # noqa: E402
+from app.services import supabase_client  # noqa: E402
+
+
+def log_event(name: str, payload: Dict[str, Any]) -> None:
+    output = {"event": name, **payload}
+    print(json.dumps(output, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark auth overhead with and without the token cache")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario and mode")
+    parser.add_argument("--lookup-ms", type=float, default=20.0, help="Simulated Supabase auth-user lookup latency")
+    return parser.parse_args()
+
+
+def _claims(confirmed: bool) -> Dict[str, Any]:
+    claims: Dict[str, Any] = {
+        "sub": "user-benchmark",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+        "app_metadata": {"role": "user"},
+    }
+    if confirmed:
+        claims["confirmed_at"] = "2024-01-01T00:00:00Z"
+    return claims
+
+
+def _rs256_token() -> Optional[str]:
+    try:
+        from cryptography.hazmat.primitives.asymmetric import rsa
+    except ImportError:
+        return None
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk["kid"] = "benchmark"
+    auth_module._jwks_cache.update({"keys": {"keys": [jwk]}, "expires_at": time.time() + 86400})
+    return jwt.encode(_claims(confirmed=True), private_key, algorithm="RS256", headers={"kid": "benchmark"})
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+
+def _measure(token: str, requests: int) -> Dict[str, Any]:
+    settings = get_settings()
+    request = _request()
+    authorization = f"Bearer {token}"
+    token_cache.clear_token_cache()
+    start = time.perf_counter()
+    for _ in range(requests):
+        auth_module.get_current_user(request, authorization=authorization, dev_api_key=None, settings=settings)
+    elapsed = time.perf_counter() - start
+    return {
+        "per_request_us": round(elapsed / requests * 1_000_000, 2),
+        "total_ms": round(elapsed * 1000, 2),
+        "cache": token_cache.token_cache_stats(),
+    }
+
+
+def run() -> int:
+    args = parse_args()
+    secret = os.environ["SUPABASE_JWT_SECRET"]
+
+    def lookup_user(_user_id: str) -> SimpleNamespace:
+        time.sleep(args.lookup_ms / 1000)
+        return SimpleNamespace(confirmed_at="2024-01-01T00:00:00Z", email_confirmed_at=None, email="bench@example.com")
+
+    supabase_client.fetch_auth_user = lookup_user  # type: ignore[assignment]
+
+    scenarios: Dict[str, Callable[[], Optional[str]]] = {
+        "hs256": lambda: jwt.encode(_claims(confirmed=True), secret, algorithm="HS256"),
+        "hs256_lookup": lambda: jwt.encode(_claims(confirmed=False), secret, algorithm="HS256"),
+        "rs256_jwks": _rs256_token,
+    }
+    for name, build_token in scenarios.items():
+        token = build_token()
+        if token is None:
+            log_event("auth_token_cache", {"scenario": name, "skipped": "cryptography not installed"})
+            continue
+        # Lookups dominate the uncached hs256_lookup run, so it gets fewer requests.
+        requests = max(1, min(args.requests, 50)) if name == "hs256_lookup" else args.requests
+        results = {}
+        for mode, size in (("uncached", "0"), ("cached", "4096")):
+            os.environ["AUTH_TOKEN_CACHE_SIZE"] = size
+            get_settings.cache_clear()
+            results[mode] = _measure(token, requests)
+        uncached_us = results["uncached"]["per_request_us"]
+        cached_us = results["cached"]["per_request_us"]
+        log_event(
+            "auth_token_cache",
+            {
+                "scenario": name,
+                "requests": requests,
+                **results,
+                "speedup": round(uncached_us / cached_us, 1) if cached_us else None,
+            },
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,93 @@
+"""
+Benchmark the email classification index: load time and lookups per second.
+
+Builds an index from synthetic disposable domains, then classifies generated addresses one at a
+time (classify) and in batches (classify_many). Addresses mix disposable, role-based and regular
+mailboxes across a configurable number of distinct domains.
+
+Usage:
+    source .venv/bin/activate
+    python backend/scripts/benchmark_email_classification.py --domains 200000 --emails 1000000 5000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from app.services.email_classification import ClassificationIndex, write_classification_index  # noqa: E402
+
+
+def log_event(name: str, payload: Dict[str, Any]) -> None:
+    output = {"event": name, **payload}
+    print(json.dumps(output, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark email classification lookups")
+    parser.add_argument("--domains", type=int, default=200_000, help="Disposable domains in the index")
+    parser.add_argument("--emails", type=int, nargs="+", default=[1_000_000], help="Addresses per run")
+    parser.add_argument("--distinct-domains", type=int, default=5_000, help="Distinct domains among the addresses")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="classify_many batch size")
+    return parser.parse_args()
+
+
+def generate_emails(count: int, distinct_domains: int) -> List[str]:
+    emails = []
+    for index in range(count):
+        domain_index = index % distinct_domains
+        # Every tenth domain is one of the indexed disposable domains.
+        domain = f"temp{domain_index}.disposable.test" if domain_index % 10 == 0 else f"corp{domain_index}.example.com"
+        local_part = "info" if index % 25 == 0 else f"user{index}"
+        emails.append(f"{local_part}@{domain}")
+    return emails
+
+
+def run() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "classification.idx"
+        write_classification_index(path, (f"temp{index}.disposable.test" for index in range(args.domains)))
+        start = time.perf_counter()
+        index = ClassificationIndex(path)
+        load_ms = round((time.perf_counter() - start) * 1000, 3)
+        try:
+            for count in args.emails:
+                emails = generate_emails(count, args.distinct_domains)
+                start = time.perf_counter()
+                single_disposable = sum(index.classify(email).is_disposable for email in emails)
+                single_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                batch_disposable = 0
+                for offset in range(0, count, args.batch_size):
+                    batch = index.classify_many(emails[offset : offset + args.batch_size])
+                    batch_disposable += sum(item.is_disposable for item in batch)
+                batch_seconds = time.perf_counter() - start
+                assert single_disposable == batch_disposable
+                log_event(
+                    "email_classification_lookups",
+                    {
+                        "index_domains": args.domains,
+                        "index_bytes": path.stat().st_size,
+                        "load_ms": load_ms,
+                        "emails": count,
+                        "disposable": batch_disposable,
+                        "classify_per_second": round(count / single_seconds),
+                        "classify_many_per_second": round(count / batch_seconds),
+                    },
+                )
+        finally:
+            index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,117 @@
+"""
+Benchmark email-column extraction throughput (rows per second) per parsing engine.
+
+Generates a synthetic CSV with several filler columns and a share of case-variant duplicates,
+then times parse_emails_from_upload with the row-based engine and with the optional pyarrow
+columnar engine (when installed). An XLSX run with column projection can be added with
+--xlsx-rows.
+
+Usage:
+    source .venv/bin/activate
+    pip install pyarrow  # in requirements.txt; without it only the row engine runs
+    python backend/scripts/benchmark_email_extraction.py --rows 100000 1000000 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import openpyxl
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from app.services import columnar_parsing  # noqa: E402
+from app.services.file_processing import parse_emails_from_upload  # noqa: E402
+
+
+def log_event(name: str, payload: Dict[str, Any]) -> None:
+    output = {"event": name, **payload}
+    print(json.dumps(output, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark email extraction engines")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000], help="CSV rows per run")
+    parser.add_argument("--columns", type=int, default=8, help="Filler columns besides the email column")
+    parser.add_argument("--duplicate-every", type=int, default=5, help="Every Nth row repeats an earlier email")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per engine")
+    parser.add_argument("--xlsx-rows", type=int, default=0, help="Also benchmark an XLSX file with this many rows")
+    return parser.parse_args()
+
+
+def _row_values(index: int, columns: int, duplicate_every: int) -> list[str]:
+    source = index - 1 if duplicate_every and index % duplicate_every == 0 else index
+    email = f"User{source}@Domain{source % 500}.example.com"
+    return [f"value-{index}-{column}" for column in range(columns)] + [email]
+
+
+def write_csv(path: Path, rows: int, columns: int, duplicate_every: int) -> None:
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        handle.write(",".join([f"col{column}" for column in range(columns)] + ["email"]) + "\n")
+        for index in range(rows):
+            handle.write(",".join(_row_values(index, columns, duplicate_every)) + "\n")
+
+
+def write_xlsx(path: Path, rows: int, columns: int, duplicate_every: int) -> None:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([f"col{column}" for column in range(columns)] + ["email"])
+    for index in range(rows):
+        sheet.append(_row_values(index, columns, duplicate_every))
+    workbook.save(path)
+
+
+def _time_engine(filename: str, path: Path, email_column: str, engine: str, repeat: int) -> Dict[str, Any]:
+    best = float("inf")
+    parsed = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = parse_emails_from_upload(filename, path, email_column, True, True, None, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    assert parsed is not None
+    return {"engine": parsed.engine, "best_ms": round(best * 1000, 2), "unique": len(parsed.emails)}
+
+
+def run() -> int:
+    args = parse_args()
+    email_column = str(args.columns + 1)
+    engines = ["python", "auto"] if columnar_parsing.is_available() else ["python"]
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = Path(tmp) / f"bench-{rows}.csv"
+            write_csv(path, rows, args.columns, args.duplicate_every)
+            results = []
+            for engine in engines:
+                result = _time_engine("bench.csv", path, email_column, engine, args.repeat)
+                result["rows_per_second"] = round(rows / (result["best_ms"] / 1000)) if result["best_ms"] else None
+                results.append(result)
+            log_event(
+                "email_extraction_csv",
+                {
+                    "rows": rows,
+                    "file_bytes": path.stat().st_size,
+                    "columnar_available": columnar_parsing.is_available(),
+                    "results": results,
+                },
+            )
+        if args.xlsx_rows:
+            path = Path(tmp) / "bench.xlsx"
+            write_xlsx(path, args.xlsx_rows, args.columns, args.duplicate_every)
+            result = _time_engine("bench.xlsx", path, email_column, "python", args.repeat)
+            result["rows_per_second"] = round(args.xlsx_rows / (result["best_ms"] / 1000)) if result["best_ms"] else None
+            log_event(
+                "email_extraction_xlsx",
+                {"rows": args.xlsx_rows, "file_bytes": path.stat().st_size, "results": [result]},
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,310 @@
+"""
+Benchmark suite for upload parsing and enriched output generation.
+
+Generates deterministic corpora (CSV, XLSX and XLS; narrow and wide; configurable duplicate
+ratios) and measures parse_emails_from_upload per engine and write_verified_output per format.
+Every case runs in a fresh child process so peak RSS belongs to that case alone. Results are
+written as one JSON document (see --output) meant to be kept and compared between releases.
+
+Notes:
+- XLSX corpora are written with openpyxl's write-only mode (inline strings, no dimension record).
+- XLS corpora need xlwt (pip install xlwt) and are capped at 65,535 data rows by the format;
+  larger XLS cases are reported as skipped.
+- --trace-allocations adds a second, traced run per case for tracemalloc peaks; it is slow.
+
+Usage:
+    source .venv/bin/activate
+    python backend/scripts/benchmark_file_processing.py --rows 10000 100000 --output bench.json
+    python backend/scripts/benchmark_file_processing.py --rows 1000000 5000000 --formats csv \\
+        --corpus-dir /tmp/bench-corpora --output bench-large.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import openpyxl
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from app.services import columnar_parsing  # noqa: E402
+from app.services.file_processing import (  # noqa: E402
+    output_extension_for,
+    parse_emails_from_upload,
+    write_verified_output,
+)
+
+SUITE_VERSION = 1
+XLS_MAX_DATA_ROWS = 65_535
+SHAPES = {"narrow": 1, "wide": 24}
+_STATUSES = ("valid", "invalid", "catchall", "unknown")
+
+
+def log_event(name: str, payload: Dict[str, Any]) -> None:
+    output = {"event": name, **payload}
+    print(json.dumps(output, indent=2), file=sys.stderr)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark file parsing and output generation")
+    parser.add_argument("--formats", nargs="+", default=["csv", "xlsx", "xls"], choices=["csv", "xlsx", "xls"])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="Data rows per corpus")
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=list(SHAPES))
+    parser.add_argument("--duplicate-ratios", type=float, nargs="+", default=[0.0, 0.5])
+    parser.add_argument("--operations", nargs="+", default=["parse", "write"], choices=["parse", "write"])
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per case (best is reported)")
+    parser.add_argument("--seed", type=int, default=1234, help="Corpus generator seed")
+    parser.add_argument("--corpus-dir", type=Path, help="Keep generated corpora here and reuse them")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--trace-allocations", action="store_true", help="Also record tracemalloc peaks")
+    return parser.parse_args()
+
+
+def _email_column_index(shape: str) -> int:
+    # Wide corpora keep the email in the middle so parsers have to skip columns on both sides.
+    return SHAPES[shape] // 2
+
+
+def iter_corpus_rows(rows: int, shape: str, duplicate_ratio: float, seed: int) -> Iterator[List[Any]]:
+    """Yield the header and ``rows`` data rows; identical arguments always yield identical rows."""
+    rng = random.Random(f"{seed}:{shape}:{duplicate_ratio}")
+    fillers = SHAPES[shape]
+    email_index = _email_column_index(shape)
+    header = [f"col{column}" for column in range(fillers)]
+    header.insert(email_index, "email")
+    yield header
+    for index in range(rows):
+        if index and rng.random() < duplicate_ratio:
+            # Duplicates repeat an earlier address with different casing.
+            source = rng.randrange(index)
+            email = f"User{source}@Domain{source % 997}.Example.com"
+        else:
+            email = f"user{index}@domain{index % 997}.example.com"
+        row: List[Any] = [f"v{index}-{column}" if column % 3 else rng.randrange(1_000_000) for column in range(fillers)]
+        row.insert(email_index, email)
+        yield row
+
+
+def write_corpus(path: Path, fmt: str, rows: int, shape: str, duplicate_ratio: float, seed: int) -> None:
+    corpus = iter_corpus_rows(rows, shape, duplicate_ratio, seed)
+    temp_path = path.with_name(f"tmp-{path.name}")
+    if fmt == "csv":
+        with temp_path.open("w", encoding="utf-8", newline="") as handle:
+            for row in corpus:
+                handle.write(",".join(str(value) for value in row) + "\n")
+    elif fmt == "xlsx":
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in corpus:
+            sheet.append(row)
+        workbook.save(temp_path)
+    else:
+        import xlwt
+
+        workbook = xlwt.Workbook()
+        sheet = workbook.add_sheet("Sheet1")
+        for row_index, row in enumerate(corpus):
+            for column, value in enumerate(row):
+                sheet.write(row_index, column, value)
+        workbook.save(str(temp_path))
+    os.replace(temp_path, path)
+
+
+def build_task_detail(emails: List[str]) -> Dict[str, Any]:
+    jobs = [
+        {
+            "email_address": email.lower(),
+            "email": {
+                "status": _STATUSES[index % len(_STATUSES)],
+                "is_role_based": index % 11 == 0,
+                "validated_at": "2024-01-01T00:00:00Z",
+            },
+        }
+        for index, email in enumerate(emails)
+    ]
+    return {"jobs": jobs}
+
+
+def _max_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Executed in a fresh child process per case."""
+    source = Path(case["path"])
+    filename = source.name
+    column_letter = str(case["email_column_index"] + 1)
+    output_path: Optional[Path] = None
+
+    if case["operation"] == "parse":
+
+        def operation() -> int:
+            parsed = parse_emails_from_upload(
+                filename, source, column_letter, True, True, None, engine=case["engine"]
+            )
+            try:
+                case["engine_used"] = parsed.engine
+                return len(parsed.emails)
+            finally:
+                parsed.close()
+
+    else:
+        parsed = parse_emails_from_upload(filename, source, column_letter, True, True, None)
+        task_detail = build_task_detail(list(parsed.emails))
+        parsed.close()
+        output_path = source.with_name(f"out-{os.getpid()}{output_extension_for(filename)}")
+
+        def operation() -> int:
+            write_verified_output(source, output_path, case["email_column_index"], True, task_detail)
+            return len(task_detail["jobs"])
+
+    rss_before = _max_rss_bytes()
+    best = float("inf")
+    unique = 0
+    for _ in range(case["repeat"]):
+        start = time.perf_counter()
+        unique = operation()
+        best = min(best, time.perf_counter() - start)
+    result = {
+        "seconds": round(best, 4),
+        "rows_per_second": round(case["rows"] / best) if best else None,
+        "unique_emails": unique,
+        "rss_before_mb": round(rss_before / 1024 / 1024, 1),
+        "peak_rss_mb": round(_max_rss_bytes() / 1024 / 1024, 1),
+        "engine_used": case.get("engine_used"),
+    }
+    if case["trace_allocations"]:
+        tracemalloc.start()
+        try:
+            operation()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["alloc_peak_mb"] = round(peak / 1024 / 1024, 1)
+    if output_path is not None:
+        result["output_bytes"] = output_path.stat().st_size
+        output_path.unlink()
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "openpyxl": openpyxl.__version__,
+        "columnar_available": columnar_parsing.is_available(),
+    }
+
+
+def build_cases(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    engines = ["python", "auto"] if columnar_parsing.is_available() else ["python"]
+    cases = []
+    for fmt in args.formats:
+        for rows in args.rows:
+            for shape in args.shapes:
+                for duplicate_ratio in args.duplicate_ratios:
+                    for operation in args.operations:
+                        # Only CSV has a second parsing engine.
+                        for engine in engines if operation == "parse" and fmt == "csv" else ["python"]:
+                            cases.append(
+                                {
+                                    "format": fmt,
+                                    "rows": rows,
+                                    "shape": shape,
+                                    "columns": SHAPES[shape] + 1,
+                                    "email_column_index": _email_column_index(shape),
+                                    "duplicate_ratio": duplicate_ratio,
+                                    "operation": operation,
+                                    "engine": engine,
+                                    "repeat": args.repeat,
+                                    "trace_allocations": args.trace_allocations,
+                                }
+                            )
+    return cases
+
+
+def _skip_reason(case: Dict[str, Any]) -> Optional[str]:
+    if case["format"] != "xls":
+        return None
+    if case["rows"] > XLS_MAX_DATA_ROWS:
+        return f"xls holds at most {XLS_MAX_DATA_ROWS} data rows"
+    try:
+        import xlwt  # noqa: F401
+    except ImportError:
+        return "xlwt is not installed"
+    return None
+
+
+def run() -> int:
+    args = parse_args()
+    temp_dir = None
+    corpus_dir = args.corpus_dir
+    if corpus_dir is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix="bench-file-processing-")
+        corpus_dir = Path(temp_dir.name)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    # max_tasks_per_child=1 gives every case its own process, so ru_maxrss is per case.
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+            for case in build_cases(args):
+                reason = _skip_reason(case)
+                if reason:
+                    results.append({**case, "skipped": reason})
+                    continue
+                name = f"{case['shape']}-{case['rows']}-dup{case['duplicate_ratio']}-seed{args.seed}.{case['format']}"
+                path = corpus_dir / name
+                if not path.exists():
+                    start = time.perf_counter()
+                    write_corpus(path, case["format"], case["rows"], case["shape"], case["duplicate_ratio"], args.seed)
+                    log_event("corpus_written", {"path": str(path), "seconds": round(time.perf_counter() - start, 2)})
+                case["path"] = str(path)
+                measured = executor.submit(_run_case, case).result()
+                result = {**case, "file_bytes": path.stat().st_size, **measured}
+                del result["path"]
+                results.append(result)
+                log_event("file_processing_case", result)
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    report = {"suite": "file_processing", "version": SUITE_VERSION, "environment": environment(), "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
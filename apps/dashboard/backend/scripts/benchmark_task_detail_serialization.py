@@ -0,0 +1,135 @@
+"""
+Benchmark TaskDetailResponse serialization time and bytes on the wire.
+
+Compares rendering through JSONResponse (FastAPI's former default) with ORJSONResponse (the app
+default, also used for conditional task responses). Both go through jsonable_encoder first, as
+FastAPI does for route return values. Also reports the gzip size at the configured compression
+level for each payload size.
+
+Usage:
+    source .venv/bin/activate
+    python backend/scripts/benchmark_task_detail_serialization.py --sizes 10 100 1000 10000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from app.clients.external import TaskDetailResponse  # noqa: E402
+
+_STATUSES = ("valid", "invalid", "catchall", "unknown")
+
+
+def log_event(name: str, payload: Dict[str, Any]) -> None:
+    output = {"event": name, **payload}
+    print(json.dumps(output, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark task detail serialization and compression")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="Jobs per task")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per serializer")
+    parser.add_argument("--gzip-level", type=int, default=6, help="gzip compression level")
+    return parser.parse_args()
+
+
+def build_task_detail(job_count: int) -> TaskDetailResponse:
+    jobs = []
+    for index in range(job_count):
+        address = f"user{index}@domain{index % 250}.example.com"
+        status = _STATUSES[index % len(_STATUSES)]
+        steps = [
+            {
+                "id": f"step-{index}-{step}",
+                "step": step,
+                "status": "completed",
+                "created_at": "2024-01-01T00:00:00Z",
+                "completed_at": "2024-01-01T00:00:01Z",
+            }
+            for step in ("syntax", "domain", "smtp")
+        ]
+        jobs.append(
+            {
+                "id": f"job-{index}",
+                "email_address": address,
+                "status": "completed",
+                "task_id": "task-benchmark",
+                "email": {
+                    "email_address": address,
+                    "status": status,
+                    "is_role_based": index % 17 == 0,
+                    "is_disposable": index % 31 == 0,
+                    "domain_name": f"domain{index % 250}.example.com",
+                    "validated_at": "2024-01-01T00:00:01Z",
+                    "verification_steps": steps,
+                },
+                "created_at": "2024-01-01T00:00:00Z",
+                "updated_at": "2024-01-01T00:00:01Z",
+            }
+        )
+    return TaskDetailResponse.model_validate(
+        {
+            "id": "task-benchmark",
+            "user_id": "user-benchmark",
+            "created_at": "2024-01-01T00:00:00Z",
+            "finished_at": "2024-01-01T00:10:00Z",
+            "metrics": {"progress_percent": 100, "total_email_addresses": job_count},
+            "jobs": jobs,
+        }
+    )
+
+
+def _time(fn: Callable[[], bytes], repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3), body
+
+
+def run() -> int:
+    args = parse_args()
+    for size in args.sizes:
+        detail = build_task_detail(size)
+        serializers: Dict[str, Callable[[], bytes]] = {
+            "json_response": lambda: JSONResponse(jsonable_encoder(detail)).body,
+            "orjson_response": lambda: ORJSONResponse(jsonable_encoder(detail)).body,
+        }
+        results = {}
+        for name, fn in serializers.items():
+            duration_ms, body = _time(fn, args.repeat)
+            results[name] = {"best_ms": duration_ms, "bytes": len(body)}
+        raw = serializers["orjson_response"]()
+        gzip_ms, compressed = _time(lambda: gzip.compress(raw, compresslevel=args.gzip_level), args.repeat)
+        log_event(
+            "task_detail_serialization",
+            {
+                "jobs": size,
+                "serializers": results,
+                "gzip": {
+                    "level": args.gzip_level,
+                    "best_ms": gzip_ms,
+                    "bytes": len(compressed),
+                    "ratio": round(len(compressed) / len(raw), 4) if raw else None,
+                },
+            },
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,77 @@
+"""
+Build the memory-mapped disposable-domain / role-account index used by email classification.
+
+Input files hold one entry per line; blank lines and lines starting with "#" are ignored.
+Without --role-local-parts the built-in role list is used.
+
+Usage:
+    source .venv/bin/activate
+    python backend/scripts/build_email_classification_index.py \\
+        --disposable-domains disposable_domains.txt \\
+        --output data/email_classification.idx
+    # then set EMAIL_CLASSIFICATION_INDEX_PATH=data/email_classification.idx
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from app.services.email_classification import (  # noqa: E402
+    DEFAULT_ROLE_LOCAL_PARTS,
+    ClassificationIndex,
+    write_classification_index,
+)
+
+
+def log_event(name: str, payload: Dict[str, Any]) -> None:
+    output = {"event": name, **payload}
+    print(json.dumps(output, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the email classification index")
+    parser.add_argument("--disposable-domains", type=Path, required=True, help="File with one domain per line")
+    parser.add_argument("--role-local-parts", type=Path, help="File with one role local part per line")
+    parser.add_argument("--output", type=Path, required=True, help="Index file to write")
+    return parser.parse_args()
+
+
+def read_entries(path: Path) -> Iterator[str]:
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            value = line.strip()
+            if value and not value.startswith("#"):
+                yield value
+
+
+def run() -> int:
+    args = parse_args()
+    roles = read_entries(args.role_local_parts) if args.role_local_parts else DEFAULT_ROLE_LOCAL_PARTS
+    start = time.perf_counter()
+    counts = write_classification_index(args.output, read_entries(args.disposable_domains), roles)
+    build_ms = round((time.perf_counter() - start) * 1000, 2)
+    start = time.perf_counter()
+    ClassificationIndex(args.output).close()
+    log_event(
+        "email_classification_index_built",
+        {
+            "output": str(args.output),
+            "file_bytes": args.output.stat().st_size,
+            "build_ms": build_ms,
+            "load_ms": round((time.perf_counter() - start) * 1000, 3),
+            **counts,
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -9,6 +9,10 @@ if str(BACKEND_ROOT) not in sys.path:
     sys.path.append(str(BACKEND_ROOT))
 
 from app.core.settings import get_settings
+from app.core.token_cache import clear_token_cache
+from app.services.recipient_cache import clear_recipient_cache
+from app.services.smtp_mailer import close_smtp_pool
+from app.services.upload_dedup import clear_upload_dedup_state
 
 
 @pytest.fixture(autouse=True)
@@ -19,6 +23,37 @@ def clear_settings_cache(monkeypatch):
     get_settings.cache_clear()
 
 
+@pytest.fixture(autouse=True)
+def clear_upload_dedup():
+    # Identical test uploads must not be answered from a previous test's dedup index
+    clear_upload_dedup_state()
+    yield
+    clear_upload_dedup_state()
+
+
+@pytest.fixture(autouse=True)
+def clear_recipient_emails():
+    # Recipient lookups are patched per test, so a cached email must not leak into the next one
+    clear_recipient_cache()
+    yield
+    clear_recipient_cache()
+
+
+@pytest.fixture(autouse=True)
+def clear_verified_tokens():
+    # Tests reuse the same token strings with different secrets, users and patched lookups
+    clear_token_cache()
+    yield
+    clear_token_cache()
+
+
+@pytest.fixture(autouse=True)
+def close_smtp_connections():
+    # Pooled connections belong to the SMTP fake or server of the test that opened them
+    yield
+    close_smtp_pool()
+
+
 @pytest.fixture(autouse=True)
 def set_required_limits_env(monkeypatch):
     monkeypatch.setenv("MANUAL_MAX_EMAILS", "10000")
@@ -1,3 +1,4 @@
+import threading
 from types import SimpleNamespace
 
 import pytest
@@ -6,7 +7,7 @@ import httpx
 
 from app.api import tasks as tasks_module
 from app.api.tasks import router
-from app.clients.external import TaskDetailResponse, TaskFileMetadata
+from app.clients.external import ExternalAPIError, TaskDetailResponse, TaskFileMetadata, UploadStatusResponse
 from app.core import settings as settings_module
 from app.services import upload_notifications
 from app.services.smtp_mailer import SMTPDeliveryError
@@ -180,10 +181,21 @@ async def test_process_bulk_upload_webhook_delivery_failure_raises_503(monkeypat
             )
 
     deleted = {"event": None}
+    billing_threads = []
+
+    def record(**kwargs):
+        billing_threads.append(threading.get_ident())
+        return True
+
+    def delete(event_id):
+        billing_threads.append(threading.get_ident())
+        deleted["event"] = event_id
+        return True
+
     monkeypatch.setattr(upload_notifications, "_build_admin_client", lambda: FakeClient())
     monkeypatch.setattr(upload_notifications.supabase_client, "fetch_profile", lambda user_id: {"email": "user@example.com"})
-    monkeypatch.setattr(upload_notifications, "record_billing_event", lambda **kwargs: True)
-    monkeypatch.setattr(upload_notifications, "delete_billing_event", lambda event_id: deleted.update({"event": event_id}) or True)
+    monkeypatch.setattr(upload_notifications, "record_billing_event", record)
+    monkeypatch.setattr(upload_notifications, "delete_billing_event", delete)
 
     def fail_send(**kwargs):
         raise SMTPDeliveryError("failed")
@@ -205,6 +217,107 @@ async def test_process_bulk_upload_webhook_delivery_failure_raises_503(monkeypat
 
     assert exc.value.status_code == 503
     assert deleted["event"] == "bulk_upload_notification:task-4:completed"
+    # Supabase round-trips run in worker threads, not on the event loop.
+    assert len(billing_threads) == 2 and threading.get_ident() not in billing_threads
+
+
+@pytest.mark.anyio
+async def test_process_bulk_upload_webhook_uses_payload_without_upstream(monkeypatch):
+    def no_client():
+        raise AssertionError("upstream lookup not expected")
+
+    sent = {}
+    monkeypatch.setattr(upload_notifications, "_build_admin_client", no_client)
+    monkeypatch.setattr(upload_notifications.supabase_client, "fetch_profile", lambda user_id: {"email": "user@example.com"})
+    monkeypatch.setattr(upload_notifications, "record_billing_event", lambda **kwargs: True)
+    monkeypatch.setattr(upload_notifications, "send_bulk_upload_notification_email", lambda **kwargs: sent.update(kwargs))
+
+    payload = {
+        "event_type": "email_verification_completed",
+        "task_id": "task-7",
+        "data": {
+            "user_id": "user-1",
+            "file": {"filename": "emails.csv", "upload_id": "upload-7"},
+            "stats": {"total": 3, "completed": 3, "failed": 0},
+            "jobs": [],
+        },
+    }
+    manual = {
+        "event_type": "email_verification_completed",
+        "task_id": "task-8",
+        "data": {"is_file_backed": False, "stats": {"total": 1, "completed": 1, "failed": 0}, "jobs": [{}]},
+    }
+
+    result = await upload_notifications.process_bulk_upload_webhook(payload=payload, raw_body=b"{}", headers={})
+    ignored = await upload_notifications.process_bulk_upload_webhook(payload=manual, raw_body=b"{}", headers={})
+
+    assert result["processed"] is True
+    assert sent == {
+        "recipient_email": "user@example.com",
+        "outcome": "completed",
+        "file_name": "emails.csv",
+        "email_count": 3,
+    }
+    assert ignored["reason"] == "not_file_backed"
+
+
+@pytest.mark.anyio
+async def test_process_bulk_upload_webhook_prefers_upload_status_over_task_detail(monkeypatch):
+    class FakeClient:
+        async def get_upload_status(self, upload_id):
+            return UploadStatusResponse(upload_id=upload_id, filename="leads.csv", email_count=9, user_id="user-1")
+
+        async def get_task_detail(self, task_id):
+            raise AssertionError("task detail not expected")
+
+    sent = {}
+    monkeypatch.setattr(upload_notifications, "_build_admin_client", lambda: FakeClient())
+    monkeypatch.setattr(upload_notifications.supabase_client, "fetch_profile", lambda user_id: {"email": "user@example.com"})
+    monkeypatch.setattr(upload_notifications, "record_billing_event", lambda **kwargs: True)
+    monkeypatch.setattr(upload_notifications, "send_bulk_upload_notification_email", lambda **kwargs: sent.update(kwargs))
+
+    payload = {
+        "event_type": "email_verification_completed",
+        "task_id": "task-9",
+        "data": {"upload_id": "upload-9", "stats": {"total": 9, "completed": 8, "failed": 1}, "jobs": []},
+    }
+
+    result = await upload_notifications.process_bulk_upload_webhook(payload=payload, raw_body=b"{}", headers={})
+
+    assert result["processed"] is True
+    assert (sent["file_name"], sent["email_count"], sent["outcome"]) == ("leads.csv", 9, "failed")
+
+
+@pytest.mark.anyio
+async def test_process_bulk_upload_webhook_falls_back_to_task_detail_when_upload_status_fails(monkeypatch):
+    class FakeClient:
+        async def get_upload_status(self, upload_id):
+            raise ExternalAPIError(502, "Bad gateway")
+
+        async def get_task_detail(self, task_id):
+            return TaskDetailResponse(
+                id=task_id,
+                user_id="user-1",
+                is_file_backed=True,
+                file=TaskFileMetadata(filename="leads.csv", email_count=9, status="completed"),
+            )
+
+    sent = {}
+    monkeypatch.setattr(upload_notifications, "_build_admin_client", lambda: FakeClient())
+    monkeypatch.setattr(upload_notifications.supabase_client, "fetch_profile", lambda user_id: {"email": "user@example.com"})
+    monkeypatch.setattr(upload_notifications, "record_billing_event", lambda **kwargs: True)
+    monkeypatch.setattr(upload_notifications, "send_bulk_upload_notification_email", lambda **kwargs: sent.update(kwargs))
+
+    payload = {
+        "event_type": "email_verification_completed",
+        "task_id": "task-9",
+        "data": {"upload_id": "upload-9", "stats": {"total": 9, "completed": 9, "failed": 0}, "jobs": []},
+    }
+
+    result = await upload_notifications.process_bulk_upload_webhook(payload=payload, raw_body=b"{}", headers={})
+
+    assert result["processed"] is True
+    assert (sent["file_name"], sent["email_count"]) == ("leads.csv", 9)
 
 
 @pytest.mark.anyio
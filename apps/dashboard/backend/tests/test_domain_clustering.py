@@ -0,0 +1,131 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import tasks as tasks_module
+from app.api.tasks import router
+from app.clients.external import BatchFileUploadResponse, TaskEmailJob, TaskResponse
+from app.core.auth import AuthContext
+from app.services import storage, task_results_store
+from app.services.domain_clustering import OriginalPositions, cluster_emails, cluster_order
+
+EMAILS = [
+    "a1@alpha.com",
+    "b1@beta.com",
+    "a2@Alpha.com",
+    "c1@gamma.com",
+    "a3@alpha.com",
+    "b2@beta.com",
+    "a4@alpha.com",
+]
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("SUBMISSION_DOMAIN_RUN_LENGTH", "2")
+    monkeypatch.setattr(storage, "_uploads_root", lambda: tmp_path)
+
+
+def test_cluster_order_interleaves_domains_in_stable_runs():
+    assert cluster_emails(EMAILS, 2) == [
+        "a1@alpha.com",
+        "a2@Alpha.com",
+        "b1@beta.com",
+        "b2@beta.com",
+        "c1@gamma.com",
+        "a3@alpha.com",
+        "a4@alpha.com",
+    ]
+    assert cluster_emails(EMAILS, 100)[:4] == ["a1@alpha.com", "a2@Alpha.com", "a3@alpha.com", "a4@alpha.com"]
+    assert sorted(cluster_order(["x"] * 5 + ["y"] * 3, 1)) == list(range(8))
+    with pytest.raises(ValueError):
+        cluster_order(["x"], 0)
+
+
+def test_original_positions_handle_repeats_and_unknown_emails():
+    positions = OriginalPositions(["a@x.com", "b@y.com", "a@x.com"])
+
+    assert [positions.resolve(email, index) for index, email in enumerate(["A@x.com", "a@x.com", "b@y.com"])] == [
+        0,
+        2,
+        1,
+    ]
+    assert positions.resolve("other@z.com", 4) == 7
+
+
+def test_stored_jobs_are_listed_in_original_order(monkeypatch, tmp_path):
+    monkeypatch.setenv("TASK_RESULTS_STORE_PATH", str(tmp_path / "results.sqlite3"))
+    task_results_store.clear_task_results_state()
+    storage.persist_submission_order("user-1", "task-1", [email.lower() for email in EMAILS])
+    submitted = cluster_emails(EMAILS, 2)
+    jobs = [TaskEmailJob(id=f"job-{index}", email_address=email.lower()) for index, email in enumerate(submitted)]
+
+    task_results_store.store_task_jobs("user-1", "task-1", jobs)
+    result = task_results_store.query_task_jobs("user-1", "task-1", limit=10, offset=0)
+
+    assert [job.email_address for job in result.jobs] == [email.lower() for email in EMAILS]
+    task_results_store.clear_task_results_state()
+
+
+class FakeClient:
+    def __init__(self):
+        self.created = []
+        self.uploaded = []
+
+    async def create_task(self, emails, webhook_url=None):
+        self.created.append(list(emails))
+        return TaskResponse(id="task-1")
+
+    async def upload_batch_file(self, filename, content, webhook_url=None, email_column=None):
+        self.uploaded.append(content.read())
+        return BatchFileUploadResponse(task_id="task-2", upload_id="upload-2", filename=filename, email_count=3)
+
+
+def _build_app(client):
+    app = FastAPI()
+    app.include_router(router)
+
+    async def fake_user():
+        return AuthContext(user_id="user-1", claims={}, token="t", role="user")
+
+    app.dependency_overrides[tasks_module.get_current_user] = fake_user
+    app.dependency_overrides[tasks_module.get_user_external_client] = lambda: client
+    return app
+
+
+@pytest.mark.anyio
+async def test_manual_task_is_submitted_clustered_and_order_saved():
+    fake = FakeClient()
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/tasks", json={"emails": EMAILS})
+
+    assert response.status_code == 200
+    assert fake.created == [cluster_emails(EMAILS, 2)]
+    assert storage.load_submission_order("user-1", "task-1") == [email.lower() for email in EMAILS]
+
+
+@pytest.mark.anyio
+async def test_csv_upload_is_submitted_clustered_and_order_saved(tmp_path):
+    fake = FakeClient()
+    content = b"name,email\nA,a1@alpha.com\nB,b1@beta.com\nC,a2@alpha.com\n"
+    metadata = [{"file_name": "emails.csv", "email_column": "B", "first_row_has_labels": True}]
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/api/tasks/upload",
+            files=[("files", ("emails.csv", content, "text/csv"))],
+            data={"file_metadata": json.dumps(metadata)},
+        )
+
+    assert response.status_code == 200
+    assert fake.uploaded == [b"email\r\na1@alpha.com\r\na2@alpha.com\r\nb1@beta.com\r\n"]
+    assert storage.load_submission_order("user-1", "task-2") == ["a1@alpha.com", "b1@beta.com", "a2@alpha.com"]
+    assert [path.name for path in (tmp_path / "user-1").iterdir() if path.is_file()] == []
@@ -0,0 +1,83 @@
+import pytest
+
+from app.services.email_canonical import ProviderRule, canonical_email
+from app.services.file_processing import parse_emails_from_upload, write_verified_output
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("John.Doe+news@Gmail.com", "johndoe@gmail.com"),
+        ("j.o.h.n.doe@googlemail.com", "johndoe@gmail.com"),
+        ("jane+promo@outlook.com", "jane@outlook.com"),
+        ("jane.smith@outlook.com", "jane.smith@outlook.com"),
+        ("Mary-Jane@yahoo.com", "mary-jane@yahoo.com"),
+        ("first.last+tag@example.com", "first.last+tag@example.com"),
+        ("+tag@gmail.com", "+tag@gmail.com"),
+        ("not-an-email", "not-an-email"),
+    ],
+)
+def test_canonical_email_applies_provider_rules(value, expected):
+    assert canonical_email(value) == expected
+
+
+def test_hyphenated_yahoo_addresses_keep_their_own_identity(tmp_path):
+    data = b"id,email\n1,mary@yahoo.com\n2,mary-jane@yahoo.com\n"
+    source = tmp_path / "emails.csv"
+    source.write_bytes(data)
+    output = tmp_path / "out.csv"
+    details = {"jobs": [{"email_address": "mary@yahoo.com", "email": {"status": "valid"}}]}
+
+    parsed = parse_emails_from_upload("emails.csv", data, "B", True, True, None, canonical_dedup=True)
+    write_verified_output(source, output, 1, True, details, canonical_dedup=True)
+
+    assert parsed.emails == ["mary@yahoo.com", "mary-jane@yahoo.com"]
+    assert output.read_text(encoding="utf-8").splitlines()[1:] == [
+        "1,mary@yahoo.com,valid,,",
+        "2,mary-jane@yahoo.com,,,",
+    ]
+
+
+def test_canonical_email_accepts_custom_rules():
+    rules = {"corp.example": ProviderRule(strip_dots=True, tag_separator="_")}
+
+    assert canonical_email("A.B_sales@corp.example", rules) == "ab@corp.example"
+    assert canonical_email("a.b+x@gmail.com", rules) == "a.b+x@gmail.com"
+
+
+def test_canonical_dedup_verifies_each_mailbox_once():
+    data = (
+        "id,email\n1,John.Doe+news@gmail.com\n2,johndoe@gmail.com\n3,j.o.h.n.doe@googlemail.com\n"
+        "4,jane+a@outlook.com\n5,jane+b@outlook.com\n6,other@example.com\n"
+    ).encode()
+
+    plain = parse_emails_from_upload("emails.csv", data, "B", True, True, None)
+    canonical = parse_emails_from_upload("emails.csv", data, "B", True, True, None, canonical_dedup=True)
+
+    assert len(plain.emails) == 6
+    assert canonical.emails == ["John.Doe+news@gmail.com", "jane+a@outlook.com", "other@example.com"]
+
+
+@pytest.mark.parametrize("join_memory_budget_bytes", [None, 0])
+def test_output_fans_results_out_to_every_spelling(join_memory_budget_bytes, tmp_path):
+    source = tmp_path / "emails.csv"
+    source.write_text(
+        "id,email\n1,John.Doe+news@gmail.com\n2,johndoe@gmail.com\n3,jane@example.com\n", encoding="utf-8"
+    )
+    output = tmp_path / "out.csv"
+    details = {
+        "jobs": [
+            {"email_address": "john.doe+news@gmail.com", "email": {"status": "valid", "is_role_based": False}},
+            {"email_address": "jane@example.com", "email": {"status": "invalid"}},
+        ]
+    }
+
+    write_verified_output(
+        source, output, 1, True, details, join_memory_budget_bytes=join_memory_budget_bytes, canonical_dedup=True
+    )
+
+    assert output.read_text(encoding="utf-8").splitlines()[1:] == [
+        "1,John.Doe+news@gmail.com,valid,false,",
+        "2,johndoe@gmail.com,valid,false,",
+        "3,jane@example.com,invalid,,",
+    ]
@@ -0,0 +1,147 @@
+import pytest
+
+from app.core.settings import get_settings
+from app.services import file_processing_pool
+from app.services.email_classification import (
+    ClassificationIndex,
+    clear_classification_index,
+    get_classification_index,
+    write_classification_index,
+)
+from app.services.file_processing import write_verified_output
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    yield
+    clear_classification_index()
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = tmp_path / "classification.idx"
+    write_classification_index(path, ["Mailinator.com", "temp-mail.org.", ""], ["info", "no-reply"])
+    return path
+
+
+def test_index_classifies_disposable_domains_and_role_accounts(index_path):
+    index = ClassificationIndex(index_path)
+    try:
+        results = index.classify_many(
+            ["info@mailinator.com", "No.Reply+news@corp.example.com", "jane@sub.MAILINATOR.com", "jane@example.com"]
+        )
+    finally:
+        index.close()
+
+    assert [(item.is_disposable, item.is_role_based) for item in results] == [
+        (True, True),
+        (False, True),
+        (True, False),
+        (False, False),
+    ]
+
+
+def test_invalid_index_files_are_rejected(tmp_path):
+    path = tmp_path / "broken.idx"
+    path.write_bytes(b"not an index")
+
+    with pytest.raises(ValueError):
+        ClassificationIndex(path)
+
+
+def test_configured_index_is_loaded_once(monkeypatch, index_path):
+    assert get_classification_index() is None
+
+    monkeypatch.setenv("EMAIL_CLASSIFICATION_INDEX_PATH", str(index_path))
+    get_settings.cache_clear()
+    index = get_classification_index()
+
+    assert index is not None
+    assert index.domain_count == 2
+    assert get_classification_index() is index
+
+
+def test_output_fills_missing_role_flags_from_index(index_path, tmp_path):
+    source = tmp_path / "emails.csv"
+    source.write_text("id,email\n1,Info@example.com\n2,jane@example.com\n3,support@example.com\n", encoding="utf-8")
+    output = tmp_path / "out.csv"
+    details = {
+        "jobs": [
+            {"email_address": "info@example.com", "email": {"status": "valid"}},
+            {"email_address": "jane@example.com", "email": {"status": "valid"}},
+            {"email_address": "support@example.com", "email": {"status": "valid", "is_role_based": False}},
+        ]
+    }
+
+    write_verified_output(source, output, 1, True, details, str(index_path))
+
+    assert output.read_text(encoding="utf-8").splitlines()[1:] == [
+        "1,Info@example.com,valid,true,",
+        "2,jane@example.com,valid,false,",
+        "3,support@example.com,valid,false,",
+    ]
+
+
+@pytest.mark.anyio
+async def test_parse_job_reports_classification_counts(monkeypatch, index_path, tmp_path):
+    monkeypatch.setenv("EMAIL_CLASSIFICATION_INDEX_PATH", str(index_path))
+    source = tmp_path / "emails.csv"
+    source.write_text("id,email\n1,info@a.example.com\n2,x@mailinator.com\n3,y@b.example.com\n", encoding="utf-8")
+
+    parsed = await file_processing_pool.parse_upload_file(
+        source,
+        filename="emails.csv",
+        email_column="B",
+        first_row_has_labels=True,
+        remove_duplicates=True,
+        max_emails=None,
+        emails_path=tmp_path / "emails.jsonl",
+    )
+
+    assert parsed.email_count == 3
+    assert (parsed.disposable_count, parsed.role_based_count) == (1, 1)
+
+
+@pytest.mark.anyio
+async def test_parse_job_can_leave_disposable_addresses_out_of_the_upstream_file(monkeypatch, index_path, tmp_path):
+    monkeypatch.setenv("EMAIL_CLASSIFICATION_INDEX_PATH", str(index_path))
+    source = tmp_path / "emails.csv"
+    source.write_text("id,email\n1,info@a.example.com\n2,x@mailinator.com\n3,y@b.example.com\n", encoding="utf-8")
+
+    parsed = await file_processing_pool.parse_upload_file(
+        source,
+        filename="emails.csv",
+        email_column="B",
+        first_row_has_labels=True,
+        remove_duplicates=True,
+        max_emails=None,
+        emails_path=tmp_path / "emails.jsonl",
+        upstream_path=tmp_path / "upstream.csv",
+        skip_disposable=True,
+    )
+
+    assert (parsed.email_count, parsed.skipped_disposable_count) == (2, 1)
+    assert list(parsed.iter_emails()) == ["info@a.example.com", "y@b.example.com"]
+    assert (tmp_path / "upstream.csv").read_text(encoding="utf-8").split() == [
+        "email",
+        "info@a.example.com",
+        "y@b.example.com",
+    ]
+
+
+def test_reloading_the_index_leaves_the_previous_one_readable(monkeypatch, index_path, tmp_path):
+    monkeypatch.setenv("EMAIL_CLASSIFICATION_INDEX_PATH", str(index_path))
+    get_settings.cache_clear()
+    previous = get_classification_index()
+    other_path = tmp_path / "other.idx"
+    write_classification_index(other_path, ["example.org"])
+
+    current = get_classification_index(str(other_path))
+
+    assert current is not previous
+    assert previous.classify("x@mailinator.com").is_disposable is True
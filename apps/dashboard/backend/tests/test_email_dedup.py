@@ -0,0 +1,84 @@
+import pytest
+
+from app.services.email_dedup import CompactHashSet, EmailDeduplicator, EmailSpool, email_fingerprint
+from app.services.file_processing import FileProcessingError, parse_emails_from_upload
+
+
+def _candidates(count: int) -> list[str]:
+    # Every third email repeats an earlier one with different casing.
+    values = []
+    for index in range(count):
+        if index % 3 == 2:
+            values.append(f"USER{index - 2}@Example.com")
+        else:
+            values.append(f"user{index}@example.com")
+    return values
+
+
+def _expected(values: list[str]) -> list[str]:
+    seen: set[str] = set()
+    unique = []
+    for value in values:
+        if value.lower() not in seen:
+            seen.add(value.lower())
+            unique.append(value)
+    return unique
+
+
+def test_compact_hash_set_grows_and_reports_membership():
+    fingerprints = CompactHashSet(capacity=4)
+    initial_bytes = fingerprints.nbytes
+    values = [email_fingerprint(f"user{index}@example.com") for index in range(1000)]
+
+    assert all(fingerprints.add(value) for value in values)
+    assert not any(fingerprints.add(value) for value in values)
+    assert len(fingerprints) == 1000
+    assert values[500] in fingerprints
+    assert email_fingerprint("missing@example.com") not in fingerprints
+    assert fingerprints.nbytes > initial_bytes
+    assert email_fingerprint("A@Example.com") == email_fingerprint("a@example.com")
+
+
+@pytest.mark.parametrize("stream_emails", [False, True])
+def test_spill_mode_preserves_first_seen_order(stream_emails, tmp_path):
+    values = _candidates(3000)
+    deduplicator = EmailDeduplicator(
+        stream_emails=stream_emails,
+        memory_budget_bytes=4096,
+        spill_partitions=8,
+        spill_dir=str(tmp_path),
+    )
+    for value in values:
+        deduplicator.add(value)
+
+    assert deduplicator.spilled is True
+    assert deduplicator.unique_count is None
+    emails = deduplicator.finish()
+    try:
+        assert isinstance(emails, EmailSpool) is stream_emails
+        assert list(emails) == _expected(values)
+        assert len(emails) == 2000
+    finally:
+        if isinstance(emails, EmailSpool):
+            emails.close()
+
+
+def test_parse_upload_can_stream_unique_emails_to_disk():
+    data = "id,email\n" + "".join(f"{index},{value}\n" for index, value in enumerate(_candidates(300)))
+
+    parsed = parse_emails_from_upload("emails.csv", data.encode(), "B", True, True, None, stream_emails=True)
+    try:
+        assert isinstance(parsed.emails, EmailSpool)
+        assert len(parsed.emails) == 200
+        assert list(parsed.emails) == _expected(_candidates(300))
+    finally:
+        parsed.close()
+
+
+def test_parse_upload_enforces_max_emails_after_spill():
+    data = "id,email\n" + "".join(f"{index},{value}\n" for index, value in enumerate(_candidates(3000)))
+
+    with pytest.raises(FileProcessingError) as exc_info:
+        parse_emails_from_upload("emails.csv", data.encode(), "B", True, True, 1999, dedup_memory_budget_bytes=4096)
+
+    assert exc_info.value.details == {"max_emails": 1999, "seen": 2000}
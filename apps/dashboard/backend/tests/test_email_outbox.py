@@ -0,0 +1,277 @@
+import sqlite3
+import time
+
+import anyio
+import pytest
+
+from app.core import settings as settings_module
+from app.services import email_outbox, notification_digest, upload_notifications
+from app.services.smtp_mailer import DigestEntry, SMTPDeliveryError
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("EMAIL_OUTBOX_PATH", str(tmp_path / "outbox.sqlite3"))
+    monkeypatch.setenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "2")
+    monkeypatch.setenv("EMAIL_OUTBOX_RETRY_SECONDS", "0.01")
+    monkeypatch.setenv("EMAIL_OUTBOX_POLL_SECONDS", "0.05")
+    monkeypatch.setenv("EMAIL_OUTBOX_RATE_PER_SECOND", "0")
+    settings_module.get_settings.cache_clear()
+    email_outbox.clear_email_outbox_state()
+    notification_digest.clear_notification_digest_state()
+    yield
+    email_outbox.clear_email_outbox_state()
+    notification_digest.clear_notification_digest_state()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        email_outbox, "send_bulk_upload_notification_email", lambda **kwargs: sent.append(("single", kwargs))
+    )
+    monkeypatch.setattr(email_outbox, "send_bulk_upload_digest_email", lambda **kwargs: sent.append(("digest", kwargs)))
+    return sent
+
+
+def _rows(tmp_path):
+    with sqlite3.connect(tmp_path / "outbox.sqlite3") as conn:
+        return conn.execute("SELECT message_key, kind, status, attempts FROM email_outbox ORDER BY id").fetchall()
+
+
+def _digest_entries(tmp_path):
+    with sqlite3.connect(tmp_path / "outbox.sqlite3") as conn:
+        return conn.execute("SELECT user_id, event_id FROM email_outbox_digest_entries ORDER BY rowid").fetchall()
+
+
+def _completion_payload(task_id="task-1"):
+    return {
+        "event_type": "email_verification_completed",
+        "task_id": task_id,
+        "data": {
+            "user_id": "user-1",
+            "is_file_backed": True,
+            "file": {"filename": "emails.csv", "email_count": 2, "status": "completed"},
+            "stats": {"total": 2, "completed": 2, "failed": 0},
+            "jobs": [{}, {}],
+        },
+    }
+
+
+async def _queue(file_name="emails.csv"):
+    return await email_outbox.enqueue_notification(
+        message_key=f"bulk_upload_notification:{file_name}:completed",
+        recipient_email="user@example.com",
+        outcome="completed",
+        file_name=file_name,
+        email_count=3,
+    )
+
+
+@pytest.mark.anyio
+async def test_webhook_queues_email_instead_of_sending(monkeypatch, tmp_path):
+    deleted = []
+    monkeypatch.setattr(
+        upload_notifications.supabase_client, "fetch_profile", lambda user_id: {"email": "user@example.com"}
+    )
+    queued_before_record = []
+
+    def record(**kwargs):
+        queued_before_record.append(_rows(tmp_path))
+        return True
+
+    monkeypatch.setattr(upload_notifications, "record_billing_event", record)
+    monkeypatch.setattr(upload_notifications, "delete_billing_event", deleted.append)
+
+    def unexpected_send(**kwargs):
+        raise AssertionError("webhook handling must not talk to SMTP")
+
+    monkeypatch.setattr(upload_notifications, "send_bulk_upload_notification_email", unexpected_send)
+
+    result = await upload_notifications.handle_bulk_upload_event(_completion_payload())
+
+    assert result["processed"] is True
+    assert result["queued"] is True
+    assert _rows(tmp_path) == [
+        ("bulk_upload_notification:task-1:completed", "bulk_upload_notification", "pending", 0)
+    ]
+    assert queued_before_record == [_rows(tmp_path)]
+    assert deleted == []
+
+
+@pytest.mark.anyio
+async def test_webhook_withdraws_queued_email_when_already_recorded(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        upload_notifications.supabase_client, "fetch_profile", lambda user_id: {"email": "user@example.com"}
+    )
+    monkeypatch.setattr(upload_notifications, "record_billing_event", lambda **kwargs: False)
+
+    result = await upload_notifications.handle_bulk_upload_event(_completion_payload())
+
+    assert result["reason"] == "duplicate_or_not_recorded"
+    assert _rows(tmp_path) == []
+
+
+@pytest.mark.anyio
+async def test_startup_recovers_only_messages_whose_lease_expired(tmp_path):
+    await _queue("a.csv")
+    await _queue("b.csv")
+    claimed = [email_outbox.claim_next_message(), email_outbox.claim_next_message()]
+    # The first claim belonged to a process that stopped without finishing.
+    with sqlite3.connect(tmp_path / "outbox.sqlite3") as conn:
+        conn.execute("UPDATE email_outbox SET lease_expires_at = 0 WHERE id = ?", (claimed[0].id,))
+
+    assert email_outbox.recover_interrupted_messages() == 1
+    assert [row[2] for row in _rows(tmp_path)] == ["pending", "sending"]
+
+
+@pytest.mark.anyio
+async def test_stalled_sends_are_claimed_again_while_running(tmp_path):
+    await _queue("a.csv")
+    now = time.time()
+    stalled = email_outbox.claim_next_message(now=now)
+    assert email_outbox.claim_next_message(now=now) is None
+
+    reclaimed = email_outbox.claim_next_message(now=now + 3600)
+    assert (reclaimed.id, reclaimed.attempts) == (stalled.id, 2)
+    # The stalled worker's late failure must not reset the new claim.
+    email_outbox.fail_message(stalled, "SMTPDeliveryError: timed out")
+    assert _rows(tmp_path)[0][2:] == ("sending", 2)
+
+
+@pytest.mark.anyio
+async def test_dispatcher_sends_each_message_once(sent, tmp_path):
+    assert await _queue("a.csv")
+    assert not await _queue("a.csv")
+    assert await _queue("b.csv")
+
+    assert await email_outbox.dispatch_next_message()
+    assert await email_outbox.dispatch_next_message()
+    assert not await email_outbox.dispatch_next_message()
+
+    assert [kwargs["file_name"] for _, kwargs in sent] == ["a.csv", "b.csv"]
+    assert [row[2] for row in _rows(tmp_path)] == ["sent", "sent"]
+
+
+@pytest.mark.anyio
+async def test_failed_messages_are_retried_then_dead_lettered(monkeypatch, tmp_path):
+    def fail_send(**kwargs):
+        raise SMTPDeliveryError("SMTP send failed")
+
+    monkeypatch.setattr(email_outbox, "send_bulk_upload_notification_email", fail_send)
+    await _queue()
+
+    assert await email_outbox.dispatch_next_message()
+    assert _rows(tmp_path)[0][2:] == ("pending", 1)
+    assert not await email_outbox.dispatch_next_message()
+
+    await anyio.sleep(0.05)
+    assert await email_outbox.dispatch_next_message()
+    assert _rows(tmp_path)[0][2:] == ("dead", 2)
+
+
+@pytest.mark.anyio
+async def test_closed_digest_window_is_queued_as_one_message(monkeypatch, sent, tmp_path):
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_WINDOW_SECONDS", "60")
+    settings_module.get_settings.cache_clear()
+
+    async with notification_digest.run_notification_digest():
+        for file_name in ("a.csv", "b.csv"):
+            await notification_digest.add_completion(
+                user_id="user-1",
+                recipient_email="user@example.com",
+                entry=DigestEntry(outcome="completed", file_name=file_name, email_count=1),
+                event_id=f"bulk_upload_notification:{file_name}:completed",
+            )
+
+        assert _digest_entries(tmp_path) == [
+            ("user-1", "bulk_upload_notification:a.csv:completed"),
+            ("user-1", "bulk_upload_notification:b.csv:completed"),
+        ]
+
+    assert sent == []
+    assert _digest_entries(tmp_path) == []
+    assert [row[1:3] for row in _rows(tmp_path)] == [("bulk_upload_digest", "pending")]
+
+    assert await email_outbox.dispatch_next_message()
+    assert sent[0][0] == "digest"
+    assert [entry.file_name for entry in sent[0][1]["entries"]] == ["a.csv", "b.csv"]
+
+
+@pytest.mark.anyio
+async def test_dispatcher_respects_rate_limit(monkeypatch, sent):
+    monkeypatch.setenv("EMAIL_OUTBOX_RATE_PER_SECOND", "20")
+    settings_module.get_settings.cache_clear()
+
+    start = time.monotonic()
+    async with email_outbox.run_email_outbox():
+        for index in range(4):
+            await _queue(f"file-{index}.csv")
+        with anyio.fail_after(5):
+            while len(sent) < 4:
+                await anyio.sleep(0.01)
+    elapsed = time.monotonic() - start
+
+    assert len(sent) == 4
+    assert elapsed >= 0.15
+
+
+@pytest.mark.anyio
+async def test_digest_entries_left_by_a_stopped_process_are_queued(monkeypatch, tmp_path):
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_WINDOW_SECONDS", "0.05")
+    settings_module.get_settings.cache_clear()
+    # Written by a process that stopped before the window closed.
+    email_outbox.add_digest_entry(
+        user_id="user-1",
+        recipient_email="user@example.com",
+        entry=DigestEntry(outcome="completed", file_name="a.csv", email_count=1),
+        event_id="bulk_upload_notification:a.csv:completed",
+        window_seconds=0.05,
+    )
+
+    async with notification_digest.run_notification_digest():
+        with anyio.fail_after(5):
+            while not _rows(tmp_path):
+                await anyio.sleep(0.01)
+
+    assert _rows(tmp_path) == [
+        ("bulk_upload_notification:a.csv:completed", "bulk_upload_notification", "pending", 0)
+    ]
+    assert _digest_entries(tmp_path) == []
+
+
+@pytest.mark.anyio
+async def test_digest_completion_is_withdrawn_when_already_recorded(monkeypatch, tmp_path):
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_WINDOW_SECONDS", "60")
+    settings_module.get_settings.cache_clear()
+    monkeypatch.setattr(
+        upload_notifications.supabase_client, "fetch_profile", lambda user_id: {"email": "user@example.com"}
+    )
+    recorded = []
+
+    def record(**kwargs):
+        recorded.append(kwargs["event_id"])
+        # Only the first delivery of the event gets to write the idempotency record.
+        return recorded.count(kwargs["event_id"]) == 1
+
+    monkeypatch.setattr(upload_notifications, "record_billing_event", record)
+
+    async with notification_digest.run_notification_digest():
+        first = await upload_notifications.handle_bulk_upload_event(_completion_payload())
+        repeated = await upload_notifications.handle_bulk_upload_event(_completion_payload())
+        assert _digest_entries(tmp_path) == [("user-1", "bulk_upload_notification:task-1:completed")]
+        email_outbox.queue_due_digests(now=float("inf"))
+        late = await upload_notifications.handle_bulk_upload_event(_completion_payload())
+        assert _digest_entries(tmp_path) == []
+
+    assert (first["digest"], repeated["reason"], late["reason"]) == (
+        True,
+        "duplicate_or_not_recorded",
+        "duplicate_or_not_recorded",
+    )
+    assert [row[0] for row in _rows(tmp_path)] == ["bulk_upload_notification:task-1:completed"]
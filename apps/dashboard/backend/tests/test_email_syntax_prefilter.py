@@ -0,0 +1,175 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+import httpx
+
+from app.api import tasks as tasks_module
+from app.api.tasks import router
+from app.clients.external import BatchFileUploadResponse, TaskResponse
+from app.core.auth import AuthContext
+from app.services import storage
+from app.services.email_syntax import is_plausible_email, partition_emails
+from app.services.file_processing import parse_emails_from_upload, write_verified_output
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+
+
+class FakeClient:
+    def __init__(self):
+        self.created_with = None
+        self.uploaded = None
+        self.verify_calls = 0
+
+    async def create_task(self, emails, webhook_url=None):
+        self.created_with = emails
+        return TaskResponse(id="task-1", email_count=len(emails))
+
+    async def upload_batch_file(self, filename, content, webhook_url=None, email_column=None):
+        self.uploaded = content.read()
+        return BatchFileUploadResponse(task_id="task-upload", email_count=self.uploaded.count(b"\n") - 1)
+
+    async def verify_email(self, email):
+        self.verify_calls += 1
+        raise AssertionError("implausible emails must not reach upstream")
+
+
+def _build_app(client):
+    app = FastAPI()
+    app.include_router(router)
+
+    async def fake_user():
+        return AuthContext(user_id="user-syntax", claims={}, token="t", role="user")
+
+    app.dependency_overrides[tasks_module.get_current_user] = fake_user
+    app.dependency_overrides[tasks_module.get_user_external_client] = lambda: client
+    return app
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["first.last+tag@sub.example.com", '"quoted user"@example.com', "用户@例子.广告", "user@[192.168.0.1]"],
+)
+def test_plausible_addresses_are_kept(value):
+    assert is_plausible_email(value) is True
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", "plain", "a b@example.com", "a@@example.com", "a@localhost", ".a@example.com", "a..b@example.com",
+     "a@-example.com", "a@example..com", "a@1.2.3.4", "x" * 65 + "@example.com"],
+)
+def test_obviously_invalid_addresses_are_rejected(value):
+    assert is_plausible_email(value) is False
+
+
+def test_partition_emails_preserves_order():
+    assert partition_emails(["a@example.com", "nope", "b@example.com", "c@"]) == (
+        ["a@example.com", "b@example.com"],
+        ["nope", "c@"],
+    )
+
+
+@pytest.mark.anyio
+async def test_manual_task_forwards_only_plausible_emails():
+    fake = FakeClient()
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/api/tasks", json={"emails": [" alpha@example.com ", "not an email", "beta@example.com", 42]}
+        )
+
+    assert response.status_code == 200
+    assert fake.created_with == ["alpha@example.com", "beta@example.com"]
+    body = response.json()
+    assert body["email_count"] == 2
+    assert body["rejected_emails"] == [
+        {"email": "not an email", "status": "invalid_syntax"},
+        {"email": "42", "status": "invalid_syntax"},
+    ]
+
+
+@pytest.mark.anyio
+async def test_manual_task_with_only_invalid_emails_is_rejected_locally():
+    fake = FakeClient()
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/tasks", json={"emails": ["nope", "also@nope"]})
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["error"] == "no_valid_emails"
+    assert fake.created_with is None
+
+
+@pytest.mark.anyio
+async def test_verify_answers_invalid_syntax_without_upstream_call():
+    fake = FakeClient()
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/verify", json={"email": "missing-at.example.com"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "invalid_syntax"
+    assert fake.verify_calls == 0
+
+
+@pytest.mark.parametrize("engine", ["auto", "python"])
+def test_upload_parsing_reports_syntax_rejections(engine):
+    rows = ["id,email"] + [f"{index},user{index}@example.com" for index in range(30)] + ["30,junk", "31,a b@example.com"]
+    data = ("\n".join(rows) + "\n").encode()
+
+    parsed = parse_emails_from_upload("emails.csv", data, "B", True, True, None, engine=engine, syntax_filter=True)
+
+    assert len(parsed.emails) == 30
+    assert parsed.syntax_rejections is not None
+    assert parsed.syntax_rejections.count == 2
+    assert parsed.syntax_rejections.samples == ["junk", "a b@example.com"]
+
+
+@pytest.mark.anyio
+async def test_upload_forwards_only_plausible_rows(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "_uploads_root", lambda: tmp_path)
+    fake = FakeClient()
+    source = b"name,email\nAda,ada@example.com\nJunk,not an email\nBob,bob@example.com\nBlank,a@@b.com\n"
+    metadata = [{"file_name": "crm.csv", "email_column": "B", "first_row_has_labels": True, "remove_duplicates": False}]
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/api/tasks/upload",
+            files=[("files", ("crm.csv", source, "text/csv"))],
+            data={"file_metadata": json.dumps(metadata)},
+        )
+
+    assert response.status_code == 200
+    assert fake.uploaded == b"email\r\nada@example.com\r\nbob@example.com\r\n"
+    body = response.json()[0]
+    assert body["email_count"] == 2
+    assert body["rejected_count"] == 2
+    assert body["rejected_emails"] == [
+        {"email": "not an email", "status": "invalid_syntax"},
+        {"email": "a@@b.com", "status": "invalid_syntax"},
+    ]
+
+
+@pytest.mark.parametrize("join_memory_budget_bytes", [None, 0])
+def test_output_marks_rows_that_were_never_sent_upstream(join_memory_budget_bytes, tmp_path):
+    source = tmp_path / "emails.csv"
+    source.write_text("id,email\n1,ok@example.com\n2,not an email\n3,\n4,later@example.com\n", encoding="utf-8")
+    output = tmp_path / "out.csv"
+    details = {"jobs": [{"email_address": "ok@example.com", "email": {"status": "valid"}}]}
+
+    write_verified_output(source, output, 1, True, details, join_memory_budget_bytes=join_memory_budget_bytes)
+
+    assert output.read_text(encoding="utf-8").splitlines()[1:] == [
+        "1,ok@example.com,valid,,",
+        "2,not an email,invalid_syntax,,",
+        "3,,,,",
+        "4,later@example.com,,,",
+    ]
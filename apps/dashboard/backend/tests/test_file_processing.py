@@ -0,0 +1,230 @@
+import io
+import tracemalloc
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+from app.services.file_processing import (
+    CSV_SNIFF_SAMPLE_CHARS,
+    FileProcessingError,
+    output_extension_for,
+    parse_emails_from_upload,
+    write_verified_output,
+)
+
+
+def test_parse_csv_accepts_bytes_path_and_stream(tmp_path):
+    data = b"\xef\xbb\xbfname;email\nAlice;alice@example.com\nBob;bob@example.com\n"
+    path = tmp_path / "emails.csv"
+    path.write_bytes(data)
+
+    for source in (data, path, io.BytesIO(data)):
+        parsed = parse_emails_from_upload("emails.csv", source, "B", True, True, None)
+        assert parsed.emails == ["alice@example.com", "bob@example.com"]
+        assert parsed.email_column_index == 1
+
+
+def test_parse_csv_reads_single_column_files():
+    parsed = parse_emails_from_upload("emails.csv", b"email\nmia@example.com\nmike@example.com\n", "A", True, False, None)
+
+    assert parsed.emails == ["mia@example.com", "mike@example.com"]
+
+
+def test_parse_csv_keeps_rows_that_straddle_the_sniff_sample():
+    leading = "".join(f"row{index},user{index}@example.com\n" for index in range(60))
+    assert len(leading) < CSV_SNIFF_SAMPLE_CHARS
+    quoted = "x" * CSV_SNIFF_SAMPLE_CHARS
+    data = f'note,email\n{leading}"{quoted}\nstill quoted",straddle@example.com\nlast,last@example.com\n'.encode()
+
+    parsed = parse_emails_from_upload("emails.csv", data, "B", True, False, None)
+
+    assert len(parsed.emails) == 62
+    assert parsed.emails[-2:] == ["straddle@example.com", "last@example.com"]
+
+
+def test_parse_csv_rejects_non_utf8_after_the_sample():
+    data = b"email\n" + b"user@example.com\n" * 500 + b"\xff\xfe@example.com\n"
+
+    with pytest.raises(FileProcessingError, match="UTF-8"):
+        parse_emails_from_upload("emails.csv", data, "A", True, False, None)
+
+
+def test_parse_csv_streams_large_files_with_bounded_memory(tmp_path):
+    path = tmp_path / "large.csv"
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write("id,email,notes\n")
+        for index in range(100_000):
+            handle.write(f"{index},same@example.com,{'n' * 40}\n")
+
+    tracemalloc.start()
+    try:
+        parsed = parse_emails_from_upload("large.csv", path, "B", True, True, None, engine="python")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert parsed.emails == ["same@example.com"]
+    assert path.stat().st_size > 5_000_000
+    assert peak < 1_000_000
+
+
+def test_write_csv_output_streams_source_rows(tmp_path):
+    source = tmp_path / "emails.csv"
+    source.write_bytes(b"name,email\r\nAlice,Alice@Example.com\r\nBob,bob@example.com\r\n")
+    output = tmp_path / "out.csv"
+    details = {"jobs": [{"email_address": "alice@example.com", "email": {"status": "valid", "is_role_based": False}}]}
+
+    write_verified_output(source, output, 1, True, details)
+
+    assert output.read_text(encoding="utf-8").splitlines() == [
+        "name,email,verification_status,is_role_based,validated_at",
+        "Alice,Alice@Example.com,valid,false,",
+        "Bob,bob@example.com,,,",
+    ]
+
+
+def _messy_csv() -> bytes:
+    rows = ["name,email,notes"]
+    for index in range(400):
+        email = f"  User{index % 150}@Example.com " if index % 2 else f"user{index % 150}@example.com"
+        rows.append(f'"Person, {index}",{email if index % 7 else ""},"multi\nline {index}"')
+    return ("\n".join(rows) + "\n").encode()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"remove_duplicates": True},
+        {"remove_duplicates": False},
+        {"remove_duplicates": True, "stream_emails": True, "syntax_filter": True},
+        {"remove_duplicates": True, "canonical_dedup": True, "dedup_memory_budget_bytes": 0},
+    ],
+)
+def test_columnar_engine_matches_row_parser(options):
+    pytest.importorskip("pyarrow")
+    data = _messy_csv()
+    remove_duplicates = options.pop("remove_duplicates")
+
+    columnar = parse_emails_from_upload("emails.csv", data, "B", True, remove_duplicates, None, **options)
+    rows = parse_emails_from_upload("emails.csv", data, "B", True, remove_duplicates, None, engine="python", **options)
+
+    assert columnar.engine == "arrow"
+    assert rows.engine == "python"
+    assert list(columnar.emails) == list(rows.emails)
+    columnar.close()
+    rows.close()
+
+
+def test_columnar_engine_falls_back_on_ragged_rows():
+    pytest.importorskip("pyarrow")
+    regular = "".join(f"user{index},user{index}@example.com\n" for index in range(20))
+    data = f"name,email\n{regular}Bob,bob@example.com,extra\nCarl\n".encode()
+
+    parsed = parse_emails_from_upload("emails.csv", data, "B", True, True, None)
+
+    assert parsed.engine == "python"
+    assert len(parsed.emails) == 21
+    assert parsed.emails[-1] == "bob@example.com"
+
+
+def test_xlsx_parser_reads_only_the_email_column(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["name", "email", "notes"])
+    sheet.append(["Alice", " alice@example.com ", "x"])
+    sheet.append(["Bob", "ALICE@example.com", "y"])
+    sheet.append(["Carl", None, "z"])
+    sheet.append(["Dana", "dana@example.com"])
+    path = tmp_path / "emails.xlsx"
+    workbook.save(path)
+
+    parsed = parse_emails_from_upload("emails.xlsx", path, "B", True, True, None)
+
+    assert parsed.emails == ["alice@example.com", "dana@example.com"]
+    assert parsed.email_column_index == 1
+
+
+@pytest.mark.parametrize("sheets", [1, 2])
+def test_xlsx_parser_closes_the_workbook(monkeypatch, tmp_path, sheets):
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["alice@example.com"])
+    for index in range(1, sheets):
+        workbook.create_sheet(f"extra-{index}")
+    path = tmp_path / "emails.xlsx"
+    workbook.save(path)
+    opened = []
+    load_workbook = openpyxl.load_workbook
+
+    def tracking_load_workbook(*args, **kwargs):
+        opened.append(load_workbook(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(openpyxl, "load_workbook", tracking_load_workbook)
+    try:
+        parse_emails_from_upload("emails.xlsx", path, "A", False, True, None)
+    except FileProcessingError:
+        assert sheets > 1
+
+    assert len(opened) == 1
+    assert opened[0]._archive.fp is None
+
+
+def test_write_xlsx_output_streams_rows_and_appends_result_columns(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Contacts"
+    sheet.append(["name", "email", "score"])
+    sheet.append(["Alice", "Alice@Example.com", 7])
+    sheet.append(["Bob", "bob@example.com"])
+    sheet.append([])
+    sheet.append(["Dana", "dana@example.com", 3])
+    source = tmp_path / "emails.xlsx"
+    workbook.save(source)
+    output = tmp_path / "out.xlsx"
+    details = {
+        "jobs": [
+            {"email_address": "alice@example.com", "email": {"status": "valid", "is_role_based": False}},
+            {"email_address": "dana@example.com", "email": {"status": "invalid", "is_role_based": True}},
+        ]
+    }
+
+    write_verified_output(source, output, 1, True, details)
+
+    result = openpyxl.load_workbook(output, read_only=True)
+    rows = list(result["Contacts"].iter_rows(values_only=True))
+    result.close()
+    assert rows == [
+        ("name", "email", "score", "verification_status", "is_role_based", "validated_at"),
+        ("Alice", "Alice@Example.com", 7, "valid", "false", None),
+        ("Bob", "bob@example.com", None, None, None, None),
+        (None, None, None, None, None, None),
+        ("Dana", "dana@example.com", 3, "invalid", "true", None),
+    ]
+
+
+XLS_FIXTURE = Path(__file__).parent / "fixtures" / "contacts.xls"
+
+
+def test_parse_xls_iterates_the_email_column_lazily():
+    from_path = parse_emails_from_upload("contacts.xls", XLS_FIXTURE, "B", True, True, None)
+    from_bytes = parse_emails_from_upload("contacts.xls", XLS_FIXTURE.read_bytes(), "B", True, False, None)
+
+    assert from_path.emails == ["Alice@Example.com", "bob@example.com"]
+    assert from_bytes.emails == ["Alice@Example.com", "bob@example.com", "ALICE@example.com"]
+
+
+def test_write_xls_output_is_streamed_as_xlsx(tmp_path):
+    output = tmp_path / f"out{output_extension_for('contacts.xls')}"
+    details = {"jobs": [{"email_address": "alice@example.com", "email": {"status": "valid", "is_role_based": False}}]}
+
+    write_verified_output(XLS_FIXTURE, output, 1, True, details)
+
+    result = openpyxl.load_workbook(output, read_only=True)
+    rows = list(result["Contacts"].iter_rows(values_only=True))
+    result.close()
+    assert output.suffix == ".xlsx"
+    assert rows[0] == ("name", "email", "score", "verification_status", "is_role_based", "validated_at")
+    assert rows[1] == ("Alice", " Alice@Example.com ", 7, "valid", "false", None)
+    assert rows[2] == ("Bob", "bob@example.com", None, None, None, None)
+    assert rows[3] == ("Carl", "ALICE@example.com", 1, "valid", "false", None)
@@ -0,0 +1,136 @@
+import tracemalloc
+
+import pytest
+
+from app.services import columnar_parsing, file_processing_pool
+from app.services.domain_clustering import cluster_emails
+from app.services.file_processing import FileProcessingError
+
+SOURCE_CSV = "id,email\n" + "".join(f"{index},User{index % 40}@Example.com\n" for index in range(120))
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+
+
+@pytest.fixture
+def pool():
+    yield file_processing_pool.start_file_processing_pool(1, 30.0)
+    file_processing_pool.stop_file_processing_pool()
+
+
+@pytest.mark.anyio
+async def test_parse_runs_in_child_process_and_returns_emails_by_path(pool, tmp_path):
+    source = tmp_path / "emails.csv"
+    source.write_text(SOURCE_CSV, encoding="utf-8")
+
+    parsed = await file_processing_pool.parse_upload_file(
+        source,
+        filename="emails.csv",
+        email_column="B",
+        first_row_has_labels=True,
+        remove_duplicates=True,
+        max_emails=None,
+        emails_path=tmp_path / "emails.jsonl",
+    )
+
+    assert parsed.email_count == 40
+    assert parsed.email_column_index == 1
+    assert parsed.engine == ("arrow" if columnar_parsing.is_available() else "python")
+    assert list(parsed.iter_emails())[:2] == ["User0@Example.com", "User1@Example.com"]
+
+
+@pytest.mark.anyio
+async def test_processing_errors_are_raised_in_the_caller(pool, tmp_path):
+    source = tmp_path / "emails.csv"
+    source.write_text(SOURCE_CSV, encoding="utf-8")
+
+    with pytest.raises(FileProcessingError) as exc_info:
+        await file_processing_pool.parse_upload_file(
+            source,
+            filename="emails.csv",
+            email_column="B",
+            first_row_has_labels=True,
+            remove_duplicates=True,
+            max_emails=10,
+            emails_path=tmp_path / "emails.jsonl",
+        )
+
+    assert exc_info.value.details == {"max_emails": 10, "seen": 11}
+
+
+@pytest.mark.anyio
+async def test_jobs_past_their_timeout_are_killed(pool, tmp_path):
+    source = tmp_path / "emails.csv"
+    source.write_text(SOURCE_CSV, encoding="utf-8")
+    kwargs = {
+        "source_path": str(source),
+        "output_path": str(tmp_path / "out.csv"),
+        "email_column_index": 1,
+        "first_row_has_labels": True,
+        "jobs_path": str(tmp_path / "missing.jsonl"),
+    }
+
+    with pytest.raises(file_processing_pool.FileJobTimeoutError):
+        await pool.run("output", kwargs, timeout_seconds=0.001)
+    with pytest.raises(file_processing_pool.FileJobFailedError):
+        await pool.run("output", kwargs)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("workers", [1, 0])
+async def test_output_job_writes_file_with_or_without_a_pool(workers, tmp_path):
+    file_processing_pool.start_file_processing_pool(workers, 30.0)
+    source = tmp_path / "emails.csv"
+    source.write_text(SOURCE_CSV, encoding="utf-8")
+    output = tmp_path / "out.csv"
+    jobs = tmp_path / "jobs.jsonl"
+    jobs.write_text('{"email_address": "user0@example.com", "email": {"status": "valid"}}\n', encoding="utf-8")
+
+    try:
+        await file_processing_pool.write_verified_output_file(source, output, 1, True, jobs, 1)
+    finally:
+        file_processing_pool.stop_file_processing_pool()
+
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "id,email,verification_status,is_role_based,validated_at"
+    assert lines[1] == "0,User0@Example.com,valid,,"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["emails.csv", "jobs.jsonl", "out.csv"]
+
+
+@pytest.mark.parametrize("run_length", [0, 3])
+def test_upstream_csv_is_written_without_holding_the_emails(run_length, tmp_path):
+    source = tmp_path / "emails.csv"
+    with source.open("w", encoding="utf-8") as handle:
+        handle.write("id,email\n")
+        for index in range(50_000):
+            handle.write(f"{index},user{index}@domain{index % 7}.example\n")
+    upstream = tmp_path / "upstream.csv"
+
+    tracemalloc.start()
+    try:
+        file_processing_pool._parse_job(
+            str(source),
+            "emails.csv",
+            "B",
+            True,
+            False,
+            None,
+            str(tmp_path / "emails.jsonl"),
+            upstream_path=str(upstream),
+            run_length=run_length,
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    emails = [f"user{index}@domain{index % 7}.example" for index in range(50_000)]
+    expected = cluster_emails(emails, run_length) if run_length else emails
+    assert upstream.read_text(encoding="utf-8").splitlines() == ["email", *expected]
+    # Parsing alone peaks near 1.7 MB; holding the emails in a list would add about 4 MB.
+    assert peak < 3_000_000
@@ -0,0 +1,202 @@
+import threading
+
+import anyio
+import pytest
+
+from app.core import settings as settings_module
+from app.services import notification_digest, smtp_mailer
+from app.services.smtp_mailer import DigestEntry, SMTPDeliveryError
+
+
+@pytest.fixture(autouse=True)
+def base_env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_WINDOW_SECONDS", "60")
+    settings_module.get_settings.cache_clear()
+    notification_digest.clear_notification_digest_state()
+    yield
+    notification_digest.clear_notification_digest_state()
+    settings_module.get_settings.cache_clear()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        notification_digest, "send_bulk_upload_notification_email", lambda **kwargs: sent.append(("single", kwargs))
+    )
+    monkeypatch.setattr(
+        notification_digest, "send_bulk_upload_digest_email", lambda **kwargs: sent.append(("digest", kwargs))
+    )
+    return sent
+
+
+async def _add(user_id, file_name, outcome="completed", email_count=10):
+    return await notification_digest.add_completion(
+        user_id=user_id,
+        recipient_email=f"{user_id}@example.com",
+        entry=DigestEntry(outcome=outcome, file_name=file_name, email_count=email_count),
+        event_id=f"bulk_upload_notification:{file_name}:{outcome}",
+    )
+
+
+@pytest.mark.anyio
+async def test_completions_within_window_share_one_email(sent):
+    async with notification_digest.run_notification_digest():
+        assert await _add("user-1", "a.csv")
+        assert await _add("user-1", "b.csv", outcome="failed", email_count=5)
+        assert await _add("user-2", "c.csv")
+        assert await notification_digest.flush_due_digests() == 0
+
+    kinds = sorted((kind, kwargs["recipient_email"]) for kind, kwargs in sent)
+    assert kinds == [("digest", "user-1@example.com"), ("single", "user-2@example.com")]
+    digest = next(kwargs for kind, kwargs in sent if kind == "digest")
+    assert [entry.file_name for entry in digest["entries"]] == ["a.csv", "b.csv"]
+    single = next(kwargs for kind, kwargs in sent if kind == "single")
+    assert (single["outcome"], single["file_name"], single["email_count"]) == ("completed", "c.csv", 10)
+
+
+@pytest.mark.anyio
+async def test_flusher_sends_when_window_closes(monkeypatch, sent):
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_WINDOW_SECONDS", "0.05")
+    settings_module.get_settings.cache_clear()
+
+    async with notification_digest.run_notification_digest():
+        await _add("user-1", "a.csv")
+        with anyio.fail_after(5):
+            while not sent:
+                await anyio.sleep(0.01)
+
+    assert [kind for kind, _ in sent] == ["single"]
+
+
+@pytest.mark.anyio
+async def test_digest_is_off_without_window_or_flusher(monkeypatch, sent):
+    assert await _add("user-1", "a.csv") is None
+
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_WINDOW_SECONDS", "0")
+    settings_module.get_settings.cache_clear()
+    async with notification_digest.run_notification_digest():
+        assert await _add("user-1", "a.csv") is None
+
+
+@pytest.mark.anyio
+async def test_repeated_and_withdrawn_completions_are_not_sent(sent):
+    async with notification_digest.run_notification_digest():
+        assert await _add("user-1", "a.csv") is True
+        assert await _add("user-1", "a.csv") is False
+        assert await _add("user-1", "b.csv") is True
+        await notification_digest.withdraw_completion(
+            user_id="user-1", event_id="bulk_upload_notification:b.csv:completed"
+        )
+
+    assert [(kind, kwargs["file_name"]) for kind, kwargs in sent] == [("single", "a.csv")]
+
+
+@pytest.mark.anyio
+async def test_failed_delivery_is_retried_with_backoff(monkeypatch):
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_RETRY_SECONDS", "0.01")
+    settings_module.get_settings.cache_clear()
+    attempts = []
+    deleted = []
+
+    def flaky(**kwargs):
+        attempts.append([entry.file_name for entry in kwargs["entries"]])
+        if len(attempts) == 1:
+            raise SMTPDeliveryError("SMTP send failed")
+
+    monkeypatch.setattr(notification_digest, "send_bulk_upload_digest_email", flaky)
+    monkeypatch.setattr(notification_digest, "delete_billing_event", deleted.append)
+
+    async with notification_digest.run_notification_digest():
+        await _add("user-1", "a.csv")
+        await _add("user-1", "b.csv")
+        assert await notification_digest.flush_due_digests(now=float("inf")) == 1
+        # The failed window is kept, and a completion arriving meanwhile joins the retry.
+        await _add("user-1", "c.csv")
+        with anyio.fail_after(5):
+            while len(attempts) < 2:
+                await anyio.sleep(0.01)
+
+    assert attempts == [["a.csv", "b.csv"], ["a.csv", "b.csv", "c.csv"]]
+    assert deleted == []
+
+
+@pytest.mark.anyio
+async def test_failed_delivery_releases_idempotency_records_without_retries(monkeypatch):
+    monkeypatch.setenv("BULK_UPLOAD_DIGEST_MAX_ATTEMPTS", "2")
+    settings_module.get_settings.cache_clear()
+    deleted = []
+    threads = []
+
+    def fail(**kwargs):
+        raise SMTPDeliveryError("SMTP send failed")
+
+    def delete(event_id):
+        threads.append(threading.get_ident())
+        deleted.append(event_id)
+
+    monkeypatch.setattr(notification_digest, "send_bulk_upload_digest_email", fail)
+    monkeypatch.setattr(notification_digest, "delete_billing_event", delete)
+
+    async with notification_digest.run_notification_digest():
+        await _add("user-1", "a.csv")
+        await _add("user-1", "b.csv")
+        await notification_digest.flush_due_digests(now=float("inf"))
+        assert deleted == []
+        await notification_digest.flush_due_digests(now=float("inf"))
+
+    assert deleted == ["bulk_upload_notification:a.csv:completed", "bulk_upload_notification:b.csv:completed"]
+    assert threading.get_ident() not in threads
+
+
+def test_digest_email_lists_every_file(monkeypatch):
+    for name, value in {
+        "SMTP_SERVER": "smtp.test",
+        "SMTP_PORT": "587",
+        "SMTP_USERNAME": "user@test",
+        "SMTP_PASSWORD": "pass",
+        "SMTP_STARTTLS_REQUIRED": "false",
+        "SMTP_FROM_EMAIL": "support@example.com",
+        "SMTP_FROM_NAME": "Notifier",
+        "SMTP_REPLY_TO": "support@example.com",
+        "BULK_UPLOAD_EMAIL_SUBJECT_DIGEST": "{file_count} uploads finished",
+        "BULK_UPLOAD_EMAIL_BODY_DIGEST": "Total={email_count} failed={failed_count}\\n{files}",
+    }.items():
+        monkeypatch.setenv(name, value)
+    settings_module.get_settings.cache_clear()
+    messages = []
+
+    class FakeSMTP:
+        def __init__(self, host, port, timeout):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def login(self, username, password):
+            pass
+
+        def send_message(self, message):
+            messages.append(message)
+
+    monkeypatch.setattr(smtp_mailer.smtplib, "SMTP", FakeSMTP)
+
+    smtp_mailer.send_bulk_upload_digest_email(
+        recipient_email="user@example.com",
+        entries=[DigestEntry("completed", "a.csv", 10), DigestEntry("failed", "b.csv", 5)],
+    )
+
+    assert messages[0]["Subject"] == "2 uploads finished"
+    assert messages[0].get_content().splitlines() == [
+        "Total=15 failed=1",
+        "- a.csv: 10 emails (completed)",
+        "- b.csv: 5 emails (failed)",
+    ]
@@ -0,0 +1,97 @@
+import time
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import account as account_module
+from app.core.auth import AuthContext
+from app.core.settings import get_settings
+from app.services import recipient_cache
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+
+
+class CountingLoader:
+    def __init__(self, email="user@example.com", delay=0.0):
+        self.email = email
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, user_id):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.email
+
+
+@pytest.mark.anyio
+async def test_resolved_email_is_cached_until_invalidated():
+    loader = CountingLoader()
+
+    assert await recipient_cache.get_recipient_email("user-1", loader) == "user@example.com"
+    assert await recipient_cache.get_recipient_email("user-1", loader) == "user@example.com"
+    assert loader.calls == 1
+
+    recipient_cache.invalidate_recipient_email("user-1")
+    loader.email = "new@example.com"
+    assert await recipient_cache.get_recipient_email("user-1", loader) == "new@example.com"
+    assert loader.calls == 2
+
+
+@pytest.mark.anyio
+async def test_missing_email_is_not_cached_and_ttl_zero_disables(monkeypatch):
+    loader = CountingLoader(email=None)
+    await recipient_cache.get_recipient_email("user-1", loader)
+    await recipient_cache.get_recipient_email("user-1", loader)
+    assert loader.calls == 2
+
+    monkeypatch.setenv("NOTIFICATION_RECIPIENT_CACHE_TTL_SECONDS", "0")
+    get_settings.cache_clear()
+    loader = CountingLoader()
+    await recipient_cache.get_recipient_email("user-2", loader)
+    await recipient_cache.get_recipient_email("user-2", loader)
+    assert loader.calls == 2
+
+
+@pytest.mark.anyio
+async def test_concurrent_lookups_for_one_user_share_a_round_trip():
+    loader = CountingLoader(delay=0.05)
+    results = []
+
+    async def lookup():
+        results.append(await recipient_cache.get_recipient_email("user-1", loader))
+
+    async with anyio.create_task_group() as task_group:
+        for _ in range(5):
+            task_group.start_soon(lookup)
+
+    assert results == ["user@example.com"] * 5
+    assert loader.calls == 1
+
+
+def test_profile_update_invalidates_cached_email(monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(recipient_cache, "invalidate_recipient_email", invalidated.append)
+    monkeypatch.setattr(
+        account_module.supabase_client,
+        "upsert_profile",
+        lambda uid, email, display_name, avatar_url=None: {"user_id": uid, "display_name": display_name},
+    )
+    app = FastAPI()
+    app.include_router(account_module.router)
+    app.dependency_overrides[account_module.get_current_user] = lambda: AuthContext(
+        user_id="u-1", claims={}, token="t"
+    )
+
+    resp = TestClient(app).patch("/api/account/profile", json={"display_name": "New"})
+
+    assert resp.status_code == 200
+    assert invalidated == ["u-1"]
@@ -0,0 +1,41 @@
+import pytest
+import httpx
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("RESPONSE_GZIP_MIN_BYTES", "2048")
+
+
+def _build_app():
+    from app.main import create_app
+
+    app = create_app()
+
+    @app.get("/bench/large")
+    def large() -> dict:
+        return {"jobs": [{"email_address": f"user{index}@example.com", "status": "valid"} for index in range(500)]}
+
+    return app
+
+
+@pytest.mark.anyio
+async def test_large_responses_are_gzipped_and_small_ones_are_not():
+    app = _build_app()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        small = await client.get("/health", headers={"Accept-Encoding": "gzip"})
+        large = await client.get("/bench/large", headers={"Accept-Encoding": "gzip"})
+
+    assert small.status_code == 200
+    assert "content-encoding" not in small.headers
+    assert small.json() == {"status": "ok"}
+    assert large.status_code == 200
+    assert large.headers["content-encoding"] == "gzip"
+    assert int(large.headers["content-length"]) < 2048
+    assert len(large.json()["jobs"]) == 500
@@ -0,0 +1,109 @@
+import openpyxl
+import orjson
+import pytest
+
+from app.services.file_processing import write_verified_output
+from app.services.results_index import ResultsIndex, iter_jobs_file, sorted_merge_results
+
+TIMESTAMPS = [
+    "2024-01-01T00:00:00Z",
+    "2024-01-01T08:30:00.250000+00:00",
+    "2024-01-01T08:30:00",
+    "2024-01-01T08:30:00.000000Z",
+    "2024-01-01T10:30:00+02:00",
+    "yesterday",
+    None,
+]
+
+
+def _details(count=40):
+    jobs = []
+    for index in range(count):
+        email = {"status": ["valid", "invalid", "catchall"][index % 3], "validated_at": TIMESTAMPS[index % 7]}
+        if index % 4:
+            email["is_role_based"] = bool(index % 2)
+        jobs.append({"email_address": f"User{index}@Example.com", "email": email})
+    # A later result for the same address replaces the earlier one.
+    jobs.append({"email_address": "user0@example.com", "email": {"status": "unknown"}})
+    jobs.append({"email": {"email_address": "nested@example.com", "status": "valid"}})
+    jobs.append({"email_address": "  ", "email": {"status": "valid"}})
+    return {"jobs": jobs}
+
+
+def _dict_map(details):
+    results = {}
+    for job in details["jobs"]:
+        email = job.get("email") or {}
+        key = str(job.get("email_address") or email.get("email_address") or "").strip().lower()
+        if key:
+            results[key] = {
+                "verification_status": email.get("status") or job.get("status"),
+                "is_role_based": email.get("is_role_based"),
+                "validated_at": email.get("validated_at"),
+            }
+    return results
+
+
+def test_results_index_matches_dict_lookups():
+    details = _details()
+    index = ResultsIndex.from_task_detail(details)
+    expected = _dict_map(details)
+
+    assert len(index) == len(expected)
+    for key, result in expected.items():
+        assert index.get(key) == result
+    assert index.get("missing@example.com", {}) == {}
+    assert "user5@example.com" in index
+
+
+@pytest.mark.parametrize("run_records", [3, 1000])
+def test_sorted_merge_results_align_with_rows(run_records, tmp_path):
+    details = _details()
+    expected = _dict_map(details)
+    keys = ["user7@example.com", "", "nobody@example.com", "user0@example.com", "user7@example.com", "nested@example.com"]
+
+    with sorted_merge_results(details, iter(keys), run_records=run_records, spill_dir=str(tmp_path)) as results:
+        assert [results.get(key, {}) for key in keys] == [expected.get(key, {}) for key in keys]
+        with pytest.raises(RuntimeError):
+            results.get("user7@example.com")
+
+
+@pytest.mark.parametrize("extension", [".csv", ".xlsx"])
+def test_out_of_core_join_writes_same_output(extension, tmp_path):
+    details = _details()
+    source = tmp_path / f"emails{extension}"
+    rows = [("name", "email")] + [(f"n{index}", f"USER{index % 45}@example.com") for index in range(60)]
+    if extension == ".csv":
+        source.write_text("".join(f"{name},{email}\n" for name, email in rows), encoding="utf-8")
+    else:
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(source)
+
+    in_memory = tmp_path / f"memory{extension}"
+    on_disk = tmp_path / f"disk{extension}"
+    write_verified_output(source, in_memory, 1, True, details)
+    write_verified_output(source, on_disk, 1, True, details, join_memory_budget_bytes=0)
+
+    if extension == ".csv":
+        assert on_disk.read_bytes() == in_memory.read_bytes()
+    else:
+        sheets = [list(openpyxl.load_workbook(path).active.values) for path in (in_memory, on_disk)]
+        assert sheets[0] == sheets[1]
+        assert sheets[0][1][2:4] == ("unknown", None)
+
+
+def test_streamed_jobs_without_a_count_use_the_out_of_core_join(tmp_path):
+    details = _details()
+    source = tmp_path / "emails.csv"
+    source.write_text("name,email\n" + "".join(f"n{index},user{index}@example.com\n" for index in range(20)), "utf-8")
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_bytes(b"".join(orjson.dumps(job) + b"\n" for job in details["jobs"]))
+
+    in_memory = tmp_path / "memory.csv"
+    streamed = tmp_path / "streamed.csv"
+    write_verified_output(source, in_memory, 1, True, details)
+    write_verified_output(source, streamed, 1, True, {"jobs": iter_jobs_file(jobs_file)}, join_memory_budget_bytes=1 << 30)
+
+    assert streamed.read_bytes() == in_memory.read_bytes()
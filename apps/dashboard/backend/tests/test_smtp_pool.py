@@ -0,0 +1,200 @@
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from functools import partial
+
+import anyio
+import pytest
+
+from app.core import settings as settings_module
+from app.services import smtp_mailer, smtp_pool
+from app.services.smtp_pool import SMTPConnectionPool
+
+
+@pytest.fixture(autouse=True)
+def base_env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("SMTP_SERVER", "smtp.test")
+    monkeypatch.setenv("SMTP_PORT", "587")
+    monkeypatch.setenv("SMTP_USERNAME", "user@test")
+    monkeypatch.setenv("SMTP_PASSWORD", "pass")
+    monkeypatch.setenv("SMTP_STARTTLS_REQUIRED", "false")
+    monkeypatch.setenv("SMTP_FROM_EMAIL", "support@example.com")
+    monkeypatch.setenv("SMTP_FROM_NAME", "Notifier")
+    monkeypatch.setenv("SMTP_REPLY_TO", "support@example.com")
+    monkeypatch.setenv("BULK_UPLOAD_EMAIL_SUBJECT_COMPLETED", "Upload done: {file_name}")
+    monkeypatch.setenv("BULK_UPLOAD_EMAIL_SUBJECT_FAILED", "Upload failed: {file_name}")
+    monkeypatch.setenv("BULK_UPLOAD_EMAIL_BODY_COMPLETED", "Done\\nCount={email_count}")
+    monkeypatch.setenv("BULK_UPLOAD_EMAIL_BODY_FAILED", "Failed\\nCount={email_count}")
+    settings_module.get_settings.cache_clear()
+
+
+class FakeSMTP:
+    def __init__(self, host=None, port=None, timeout=None):
+        self.logins = 0
+        self.sent = []
+        self.quit_called = False
+        self.disconnected = False
+        self.noop_code = 250
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def starttls(self, context=None):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def send_message(self, message: EmailMessage):
+        if self.disconnected:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        self.sent.append(message)
+
+    def noop(self):
+        return self.noop_code, b"OK"
+
+    def quit(self):
+        self.quit_called = True
+
+    def close(self):
+        pass
+
+
+def _message(subject="Hello"):
+    message = EmailMessage()
+    message["Subject"] = subject
+    message.set_content("body")
+    return message
+
+
+def _send(**overrides):
+    kwargs = dict(recipient_email="user@example.com", outcome="completed", file_name="emails.csv", email_count=1)
+    kwargs.update(overrides)
+    smtp_mailer.send_bulk_upload_notification_email(**kwargs)
+
+
+def test_mailer_reuses_one_authenticated_connection(monkeypatch):
+    connections = []
+
+    def fake_smtp(host, port, timeout):
+        connections.append(FakeSMTP(host, port, timeout))
+        return connections[-1]
+
+    monkeypatch.setattr(smtp_mailer.smtplib, "SMTP", fake_smtp)
+
+    for index in range(3):
+        _send(file_name=f"file-{index}.csv")
+
+    assert len(connections) == 1
+    assert connections[0].logins == 1
+    assert [message["Subject"] for message in connections[0].sent] == [
+        "Upload done: file-0.csv",
+        "Upload done: file-1.csv",
+        "Upload done: file-2.csv",
+    ]
+
+    smtp_mailer.close_smtp_pool()
+    assert connections[0].quit_called
+
+
+def test_pool_size_zero_opens_a_connection_per_email(monkeypatch):
+    monkeypatch.setenv("SMTP_POOL_SIZE", "0")
+    settings_module.get_settings.cache_clear()
+    connections = []
+
+    def fake_smtp(host, port, timeout):
+        connections.append(FakeSMTP(host, port, timeout))
+        return connections[-1]
+
+    monkeypatch.setattr(smtp_mailer.smtplib, "SMTP", fake_smtp)
+
+    _send()
+    _send()
+
+    assert len(connections) == 2
+
+
+def test_pool_reconnects_once_when_server_dropped_idle_connection():
+    connections = []
+
+    def connect():
+        connections.append(FakeSMTP())
+        return connections[-1]
+
+    pool = SMTPConnectionPool(connect, max_size=1, max_idle_seconds=60)
+    pool.send(_message("first"))
+    connections[0].disconnected = True
+
+    pool.send(_message("second"))
+
+    assert len(connections) == 2
+    assert [message["Subject"] for message in connections[1].sent] == ["second"]
+
+
+def test_pool_does_not_retry_failures_on_a_fresh_connection():
+    connections = []
+
+    def connect():
+        connections.append(FakeSMTP())
+        connections[-1].disconnected = True
+        return connections[-1]
+
+    pool = SMTPConnectionPool(connect, max_size=1, max_idle_seconds=60)
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send(_message())
+    assert len(connections) == 1
+
+
+def test_pool_health_checks_and_expires_idle_connections(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(smtp_pool.time, "monotonic", lambda: clock[0])
+    connections = []
+
+    def connect():
+        connections.append(FakeSMTP())
+        return connections[-1]
+
+    pool = SMTPConnectionPool(connect, max_size=1, max_idle_seconds=60)
+    pool.send(_message())
+
+    clock[0] += smtp_pool.HEALTH_CHECK_AFTER_SECONDS + 1
+    connections[0].noop_code = 421
+    pool.send(_message())
+    assert len(connections) == 2
+
+    clock[0] += 61
+    pool.send(_message())
+    assert len(connections) == 3
+    assert connections[1].quit_called
+
+
+@pytest.mark.anyio
+async def test_deliver_runs_at_most_pool_size_sends_at_once(monkeypatch):
+    monkeypatch.setenv("SMTP_POOL_SIZE", "2")
+    settings_module.get_settings.cache_clear()
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def send(**kwargs):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+
+    async with anyio.create_task_group() as task_group:
+        for index in range(6):
+            task_group.start_soon(partial(smtp_mailer.deliver, send, recipient_email=f"user{index}@example.com"))
+
+    assert running["peak"] == 2
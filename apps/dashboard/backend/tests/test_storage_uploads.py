@@ -0,0 +1,122 @@
+import hashlib
+import io
+import json
+import os
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile
+
+from app.api import tasks as tasks_module
+from app.api.tasks import router
+from app.core.auth import AuthContext
+from app.services import storage
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setattr(storage, "_uploads_root", lambda: tmp_path)
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+@pytest.mark.anyio
+async def test_persist_upload_streams_hashes_and_renames(tmp_path):
+    data = b"email\n" + b"user@example.com\n" * 1000
+    upload = UploadFile(file=io.BytesIO(data), filename="../emails.csv")
+
+    persisted = await storage.persist_upload_file(upload, "user-1", len(data), chunk_size=256)
+
+    assert persisted.path == tmp_path / "user-1" / "emails.csv"
+    assert persisted.path.read_bytes() == data
+    assert persisted.size == len(data)
+    assert persisted.sha256 == hashlib.sha256(data).hexdigest()
+    assert [path.name for path in (tmp_path / "user-1").iterdir()] == ["emails.csv"]
+
+
+@pytest.mark.anyio
+async def test_persist_upload_stops_reading_once_limit_is_crossed(tmp_path):
+    stream = CountingStream(b"x" * 10_000)
+    upload = UploadFile(file=stream, filename="big.csv")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage.persist_upload_file(upload, "user-1", 1000, chunk_size=256)
+
+    assert exc_info.value.status_code == 400
+    assert stream.reads == 4
+    assert list((tmp_path / "user-1").iterdir()) == []
+
+
+@pytest.mark.anyio
+async def test_oversized_upload_is_rejected_before_reaching_upstream(monkeypatch, tmp_path):
+    monkeypatch.setenv("UPLOAD_MAX_MB", "1")
+
+    class FakeClient:
+        async def upload_batch_file(self, filename, content, webhook_url=None, email_column=None):
+            raise AssertionError("oversized uploads must not be forwarded")
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def fake_user():
+        return AuthContext(user_id="user-1", claims={}, token="t", role="user")
+
+    app.dependency_overrides[tasks_module.get_current_user] = fake_user
+    app.dependency_overrides[tasks_module.get_user_external_client] = lambda: FakeClient()
+    metadata = [{"file_name": "big.csv", "email_column": "A", "first_row_has_labels": True, "remove_duplicates": True}]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/api/tasks/upload",
+            files=[("files", ("big.csv", b"a@example.com\n" * 100_000, "text/csv"))],
+            data={"file_metadata": json.dumps(metadata)},
+        )
+
+    assert response.status_code == 400
+    assert list((tmp_path / "user-1").iterdir()) == []
+
+
+def test_expired_originals_and_orders_are_pruned(monkeypatch, tmp_path):
+    monkeypatch.setenv("UPLOAD_RETENTION_DAYS", "7")
+    source = tmp_path / "source.csv"
+    source.write_text("email\nuser@example.com\n", encoding="utf-8")
+    for task_id in ("task-old", "task-new"):
+        storage.persist_original_upload(
+            user_id="user-1",
+            task_id=task_id,
+            file_name="emails.csv",
+            source_path=source,
+            email_column_index=0,
+            first_row_has_labels=True,
+        )
+        storage.persist_submission_order("user-1", task_id, ["user@example.com"])
+    eight_days_ago = time.time() - 8 * 86400
+    for path in (tmp_path / "user-1").glob("*/task-old*"):
+        os.utime(path, (eight_days_ago, eight_days_ago))
+
+    # Expired files are treated as gone before the sweep runs.
+    assert storage.load_original_upload("user-1", "task-old") is None
+    assert storage.load_submission_order("user-1", "task-old") is None
+
+    assert storage.prune_expired_uploads() == 3
+    assert sorted(path.name for path in (tmp_path / "user-1" / "originals").iterdir()) == [
+        "task-new.csv",
+        "task-new.json",
+    ]
+    assert [path.name for path in (tmp_path / "user-1" / "orders").iterdir()] == ["task-new.json"]
+    assert storage.load_original_upload("user-1", "task-new") is not None
+    assert storage.load_submission_order("user-1", "task-new") == ["user@example.com"]
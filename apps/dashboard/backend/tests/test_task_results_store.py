@@ -0,0 +1,248 @@
+import sqlite3
+import time
+
+import pytest
+from fastapi import FastAPI
+import httpx
+
+from app.api import tasks as tasks_module
+from app.api.tasks import router
+from app.clients.external import TaskDetailResponse, TaskEmailJob, TaskJobsResponse
+from app.core.auth import AuthContext
+from app.services import task_results_store
+
+TASK_ID = "11111111-1111-1111-1111-111111111111"
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("TASK_RESULTS_STORE_PATH", str(tmp_path / "results.sqlite3"))
+    monkeypatch.setenv("TASK_RESULTS_STORE_PAGE_SIZE", "2")
+    task_results_store.clear_task_results_state()
+    yield
+    task_results_store.clear_task_results_state()
+
+
+def _job(index: int, status: str, domain: str = "example.com", role: bool = False) -> TaskEmailJob:
+    address = f"user{index}@{domain}"
+    return TaskEmailJob(
+        id=f"job-{index}",
+        task_id=TASK_ID,
+        email_address=address,
+        status="completed",
+        email={"email_address": address, "status": status, "is_role_based": role, "is_disposable": False},
+    )
+
+
+JOBS = [
+    _job(0, "valid"),
+    _job(1, "invalid", domain="other.com"),
+    _job(2, "valid", role=True),
+    _job(3, "catchall"),
+    _job(4, "valid", domain="other.com"),
+]
+
+
+class FakeClient:
+    def __init__(self, finished: bool = True, jobs=None):
+        self.finished = finished
+        self.jobs = JOBS if jobs is None else jobs
+        self.detail_calls = 0
+        self.jobs_calls = []
+
+    async def get_task_detail(self, task_id: str):
+        self.detail_calls += 1
+        return TaskDetailResponse(id=task_id, finished_at="2024-01-01T00:00:00Z" if self.finished else None)
+
+    async def list_task_jobs(self, task_id: str, limit: int, offset: int):
+        self.jobs_calls.append((limit, offset))
+        jobs = self.jobs[offset : offset + limit]
+        return TaskJobsResponse(jobs=jobs, count=len(self.jobs), limit=limit, offset=offset)
+
+
+def _build_app(client):
+    app = FastAPI()
+    app.include_router(router)
+
+    async def fake_user():
+        return AuthContext(user_id="user-store", claims={}, token="t")
+
+    app.dependency_overrides[tasks_module.get_current_user] = fake_user
+    app.dependency_overrides[tasks_module.get_user_external_client] = lambda: client
+    return app
+
+
+def test_query_task_jobs_filters_sorts_and_pages():
+    task_results_store.store_task_jobs("user-1", TASK_ID, JOBS)
+
+    valid = task_results_store.query_task_jobs("user-1", TASK_ID, limit=10, offset=0, email_status="VALID")
+    assert valid.count == 3
+    assert [job.id for job in valid.jobs] == ["job-0", "job-2", "job-4"]
+
+    other = task_results_store.query_task_jobs("user-1", TASK_ID, limit=1, offset=1, domain="other.com")
+    assert other.count == 2
+    assert [job.id for job in other.jobs] == ["job-4"]
+
+    role = task_results_store.query_task_jobs("user-1", TASK_ID, limit=10, offset=0, is_role_based=True)
+    assert [job.id for job in role.jobs] == ["job-2"]
+
+    by_status = task_results_store.query_task_jobs("user-1", TASK_ID, limit=2, offset=0, sort="status", descending=True)
+    assert [job.email["status"] for job in by_status.jobs] == ["valid", "valid"]
+
+    assert task_results_store.query_task_jobs("user-2", TASK_ID, limit=10, offset=0) is None
+
+
+def test_store_evicts_least_recently_used_tasks(monkeypatch):
+    monkeypatch.setenv("TASK_RESULTS_STORE_MAX_MB", "1")
+    big_jobs = [_job(index, "valid", domain="x" * 2000 + ".com") for index in range(150)]
+    task_results_store.store_task_jobs("user-1", "task-old", big_jobs)
+    task_results_store.store_task_jobs("user-1", "task-new", big_jobs)
+
+    assert task_results_store.has_task("user-1", "task-new") is True
+    assert task_results_store.has_task("user-1", "task-old") is False
+
+
+def test_store_refuses_a_task_larger_than_the_limit(monkeypatch):
+    monkeypatch.setenv("TASK_RESULTS_STORE_MAX_MB", "1")
+    small_jobs = [_job(index, "valid", domain="x" * 2000 + ".com") for index in range(150)]
+    task_results_store.store_task_jobs("user-1", "task-small", small_jobs)
+    huge_jobs = [_job(index, "valid", domain="x" * 2000 + ".com") for index in range(300)]
+
+    assert task_results_store.store_task_jobs("user-1", "task-huge", huge_jobs) is False
+    assert task_results_store.task_state("user-1", "task-huge") == task_results_store.STATE_TOO_LARGE
+    # Refusing the oversized task must not push out the tasks that do fit.
+    assert task_results_store.has_task("user-1", "task-small") is True
+
+
+@pytest.mark.anyio
+async def test_jobs_route_loads_completed_task_once_and_serves_locally():
+    client = FakeClient(finished=True)
+    app = _build_app(client)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        first = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=2&offset=3")
+        filtered = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=10&email_status=valid&domain=example.com")
+        paged = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=2&offset=1")
+
+    assert first.status_code == 200
+    assert [job["id"] for job in first.json()["jobs"]] == ["job-3", "job-4"]
+    assert filtered.status_code == 200
+    assert filtered.json()["count"] == 2
+    assert [job["id"] for job in paged.json()["jobs"]] == ["job-1", "job-2"]
+    assert client.detail_calls == 1
+    # The first page comes from the upstream; the store is filled after that response was sent.
+    assert client.jobs_calls == [(2, 3), (2, 0), (2, 2), (2, 4)]
+
+
+@pytest.mark.anyio
+async def test_filtered_request_loads_completed_task_before_answering():
+    client = FakeClient(finished=True)
+    transport = httpx.ASGITransport(app=_build_app(client))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        filtered = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=10&is_role_based=true")
+
+    assert filtered.status_code == 200
+    assert [job["id"] for job in filtered.json()["jobs"]] == ["job-2"]
+    assert client.jobs_calls == [(2, 0), (2, 2), (2, 4)]
+
+
+@pytest.mark.anyio
+async def test_jobs_route_proxies_incomplete_task_and_rejects_filters():
+    client = FakeClient(finished=False)
+    app = _build_app(client)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        proxied = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=2&offset=0")
+        filtered = await http.get(f"/api/tasks/{TASK_ID}/jobs?email_status=valid")
+
+    assert proxied.status_code == 200
+    assert [job["id"] for job in proxied.json()["jobs"]] == ["job-0", "job-1"]
+    assert filtered.status_code == 409
+    assert client.detail_calls == 1
+
+
+@pytest.mark.anyio
+async def test_oversized_task_is_refused_once_and_not_paged_again(monkeypatch):
+    monkeypatch.setenv("TASK_RESULTS_STORE_MAX_MB", "1")
+    monkeypatch.setenv("TASK_RESULTS_STORE_PAGE_SIZE", "100")
+    client = FakeClient(jobs=[_job(index, "valid", domain="x" * 2000 + ".com") for index in range(1000)])
+    transport = httpx.ASGITransport(app=_build_app(client))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        first = await http.get(f"/api/tasks/{TASK_ID}/jobs?email_status=valid")
+        second = await http.get(f"/api/tasks/{TASK_ID}/jobs?email_status=valid")
+        plain = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=1")
+
+    assert first.status_code == 422
+    assert second.status_code == 422
+    assert plain.status_code == 200
+    # Paging stops once the limit is exceeded, and later requests do not start over.
+    assert client.jobs_calls == [(100, 0), (100, 100), (100, 200), (1, 0)]
+    assert task_results_store.has_task("user-store", TASK_ID) is False
+
+
+@pytest.mark.anyio
+async def test_load_claimed_by_another_worker_is_not_repeated():
+    load_id, _ = task_results_store._claim_task_load("user-store", TASK_ID)
+    client = FakeClient(finished=True)
+    transport = httpx.ASGITransport(app=_build_app(client))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        busy = await http.get(f"/api/tasks/{TASK_ID}/jobs?email_status=valid")
+
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "5"
+    assert client.jobs_calls == []
+
+    # The other worker stalls; once its claim goes quiet the next request takes the load over.
+    stale_id, _ = task_results_store._claim_task_load(
+        "user-store", TASK_ID, now=time.time() + task_results_store.LOAD_STALE_SECONDS
+    )
+    assert stale_id is not None
+    assert task_results_store._append_task_jobs("user-store", TASK_ID, load_id, 0, JOBS, None) is None
+    task_results_store._release_task_load("user-store", TASK_ID, load_id)
+    assert task_results_store.task_state("user-store", TASK_ID) == task_results_store.STATE_LOADING
+
+
+@pytest.mark.anyio
+async def test_stale_claim_is_taken_over():
+    task_results_store._claim_task_load(
+        "user-store", TASK_ID, now=time.time() - task_results_store.LOAD_STALE_SECONDS - 1
+    )
+    client = FakeClient(finished=True)
+    transport = httpx.ASGITransport(app=_build_app(client))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        filtered = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=10&is_role_based=true")
+
+    assert filtered.status_code == 200
+    assert [job["id"] for job in filtered.json()["jobs"]] == ["job-2"]
+
+
+@pytest.mark.anyio
+async def test_filters_are_rejected_when_the_store_is_disabled(monkeypatch):
+    monkeypatch.setenv("TASK_RESULTS_STORE_PATH", "")
+    client = FakeClient(finished=True)
+    transport = httpx.ASGITransport(app=_build_app(client))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        filtered = await http.get(f"/api/tasks/{TASK_ID}/jobs?sort=email")
+        plain = await http.get(f"/api/tasks/{TASK_ID}/jobs?limit=2")
+
+    assert filtered.status_code == 501
+    assert "disabled" in filtered.json()["detail"]
+    assert plain.status_code == 200
+    assert client.detail_calls == 0
+
+
+def test_existing_stores_gain_the_state_column(tmp_path):
+    with sqlite3.connect(tmp_path / "results.sqlite3") as conn:
+        conn.execute(
+            "CREATE TABLE task_results (user_id TEXT NOT NULL, task_id TEXT NOT NULL, job_count INTEGER NOT NULL,"
+            " size_bytes INTEGER NOT NULL, stored_at REAL NOT NULL, last_accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (user_id, task_id))"
+        )
+        conn.execute("INSERT INTO task_results VALUES ('user-1', 'task-1', 0, 0, 0, 0)")
+
+    assert task_results_store.has_task("user-1", "task-1") is True
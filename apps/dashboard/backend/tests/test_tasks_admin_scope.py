@@ -6,15 +6,17 @@ from app.api import tasks as tasks_module
 from app.api.tasks import router
 from app.clients.external import BatchFileUploadResponse, TaskListResponse, TaskResponse
 from app.core.auth import AuthContext
+from app.services import storage
 
 
 @pytest.fixture(autouse=True)
-def env(monkeypatch):
+def env(monkeypatch, tmp_path):
     monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
     monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
     monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
     monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
     monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setattr(storage, "_uploads_root", lambda: tmp_path)
 
 
 def _build_app(monkeypatch, fake_user, fake_client):
@@ -0,0 +1,92 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+import httpx
+
+from app.api import tasks as tasks_module
+from app.api.tasks import router
+from app.clients.external import TaskDetailResponse, TaskListResponse, TaskMetrics
+from app.core.auth import AuthContext
+from app.core.http_cache import if_none_match_satisfied
+
+TASK_ID = "11111111-1111-1111-1111-111111111111"
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+
+
+class FakeClient:
+    def __init__(self):
+        self.progress = 10
+
+    async def list_tasks(self, limit: int, offset: int, user_id: str | None = None):
+        return TaskListResponse(count=1, limit=limit, offset=offset, tasks=[{"id": "t1", "status": "processing"}])
+
+    async def get_task_detail(self, task_id: str):
+        return TaskDetailResponse(id=task_id, metrics=TaskMetrics(progress_percent=self.progress))
+
+
+def _build_app(client):
+    app = FastAPI()
+    app.include_router(router)
+
+    async def fake_user():
+        return AuthContext(user_id="user-etag", claims={}, token="t")
+
+    async def fake_client():
+        return client
+
+    app.dependency_overrides[tasks_module.get_current_user] = fake_user
+    app.dependency_overrides[tasks_module.get_user_external_client] = fake_client
+    return app
+
+
+def test_if_none_match_uses_weak_comparison():
+    assert if_none_match_satisfied('"abc"', 'W/"abc"') is True
+    assert if_none_match_satisfied('W/"other", W/"abc"', 'W/"abc"') is True
+    assert if_none_match_satisfied("*", 'W/"abc"') is True
+    assert if_none_match_satisfied('W/"other"', 'W/"abc"') is False
+    assert if_none_match_satisfied(None, 'W/"abc"') is False
+
+
+@pytest.mark.anyio
+async def test_task_detail_returns_304_until_payload_changes():
+    fake = FakeClient()
+    app = _build_app(fake)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get(f"/api/tasks/{TASK_ID}")
+        etag = first.headers["etag"]
+        unchanged = await client.get(f"/api/tasks/{TASK_ID}", headers={"If-None-Match": etag})
+        fake.progress = 50
+        changed = await client.get(f"/api/tasks/{TASK_ID}", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert first.json()["metrics"]["progress_percent"] == 10
+    expected = TaskDetailResponse(id=TASK_ID, metrics=TaskMetrics(progress_percent=10))
+    assert first.content == ORJSONResponse(jsonable_encoder(expected)).body
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+@pytest.mark.anyio
+async def test_task_list_etag_is_stable_across_polls():
+    app = _build_app(FakeClient())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/api/tasks?limit=5&offset=0")
+        second = await client.get("/api/tasks?limit=5&offset=0", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200
+    assert first.json()["tasks"][0]["id"] == "t1"
+    assert second.status_code == 304
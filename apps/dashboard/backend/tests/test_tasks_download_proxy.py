@@ -24,7 +24,7 @@ async def test_tasks_download_proxies_file(monkeypatch):
         return AuthContext(user_id="user-1", claims={}, token="t", role="user")
 
     class FakeClient:
-        async def download_task_results(self, task_id: str, file_format: str | None = None):
+        async def download_task_results(self, task_id: str, file_format: str | None = None, conditional_headers=None):
             assert task_id == TASK_ID
             assert file_format == "csv"
             return DownloadedFile(
@@ -50,7 +50,7 @@ async def test_tasks_download_requires_content_type(monkeypatch):
         return AuthContext(user_id="user-1", claims={}, token="t", role="user")
 
     class FakeClient:
-        async def download_task_results(self, task_id: str, file_format: str | None = None):
+        async def download_task_results(self, task_id: str, file_format: str | None = None, conditional_headers=None):
             return DownloadedFile(content=b"data", content_type=None, content_disposition=None)
 
     app = _build_app(fake_user, FakeClient())
@@ -59,3 +59,30 @@ async def test_tasks_download_requires_content_type(monkeypatch):
         resp = await client.get(f"/api/tasks/{TASK_ID}/download")
 
     assert resp.status_code == 502
+
+
+@pytest.mark.anyio
+async def test_tasks_download_forwards_upstream_validators(monkeypatch):
+    async def fake_user():
+        return AuthContext(user_id="user-1", claims={}, token="t", role="user")
+
+    seen = {}
+
+    class FakeClient:
+        async def download_task_results(self, task_id: str, file_format: str | None = None, conditional_headers=None):
+            seen["conditional_headers"] = conditional_headers
+            if conditional_headers and conditional_headers.get("If-None-Match") == '"v1"':
+                return DownloadedFile(content=b"", etag='"v1"', not_modified=True)
+            return DownloadedFile(content=b"data", content_type="text/csv", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+    app = _build_app(fake_user, FakeClient())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get(f"/api/tasks/{TASK_ID}/download")
+        second = await client.get(f"/api/tasks/{TASK_ID}/download", headers={"If-None-Match": '"v1"'})
+
+    assert first.status_code == 200
+    assert first.headers["etag"] == '"v1"'
+    assert first.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert second.status_code == 304
+    assert seen["conditional_headers"] == {"If-None-Match": '"v1"'}
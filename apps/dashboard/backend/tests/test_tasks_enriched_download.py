@@ -0,0 +1,125 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+import httpx
+
+from app.api import tasks as tasks_module
+from app.api.tasks import router
+from app.clients.external import BatchFileUploadResponse, TaskEmailJob, TaskJobsResponse
+from app.core.auth import AuthContext
+from app.services import storage
+from app.services.email_classification import clear_classification_index, write_classification_index
+
+TASK_ID = "11111111-1111-1111-1111-111111111111"
+SOURCE_CSV = b"name,email\nAlice,Alice@Example.com\nBob,bob@example.com\nCarl,carl@example.com\n"
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("UPLOAD_KEEP_ORIGINALS", "true")
+    monkeypatch.setattr(storage, "_uploads_root", lambda: tmp_path)
+
+
+class FakeClient:
+    async def upload_batch_file(self, filename, content, webhook_url=None, email_column=None):
+        return BatchFileUploadResponse(task_id=TASK_ID, upload_id="u1", filename=filename, email_count=3)
+
+    async def list_task_jobs(self, task_id: str, limit: int, offset: int):
+        jobs = [
+            TaskEmailJob(
+                email_address="alice@example.com",
+                email={"status": "valid", "is_role_based": False, "validated_at": "2024-01-01T00:00:00Z"},
+            ),
+            TaskEmailJob(email_address="bob@example.com", email={"status": "invalid", "is_role_based": True}),
+        ]
+        return TaskJobsResponse(jobs=jobs[offset : offset + limit], count=len(jobs), limit=limit, offset=offset)
+
+
+def _build_app(client):
+    app = FastAPI()
+    app.include_router(router)
+
+    async def fake_user():
+        return AuthContext(user_id="user-1", claims={}, token="t", role="user")
+
+    app.dependency_overrides[tasks_module.get_current_user] = fake_user
+    app.dependency_overrides[tasks_module.get_user_external_client] = lambda: client
+    return app
+
+
+@pytest.mark.anyio
+async def test_enriched_download_merges_results_into_original_file(tmp_path):
+    app = _build_app(FakeClient())
+    metadata = [{"file_name": "emails.csv", "email_column": "B", "first_row_has_labels": True, "remove_duplicates": True}]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        upload = await client.post(
+            "/api/tasks/upload",
+            files=[("files", ("emails.csv", SOURCE_CSV, "text/csv"))],
+            data={"file_metadata": json.dumps(metadata)},
+        )
+        download = await client.get(f"/api/tasks/{TASK_ID}/download?mode=enriched")
+
+    assert upload.status_code == 200
+    assert download.status_code == 200
+    assert download.headers["content-type"].startswith("text/csv")
+    assert f"emails-verified-{TASK_ID}.csv" in download.headers["content-disposition"]
+    lines = download.text.splitlines()
+    assert lines == [
+        "name,email,verification_status,is_role_based,validated_at",
+        "Alice,Alice@Example.com,valid,false,2024-01-01T00:00:00Z",
+        "Bob,bob@example.com,invalid,true,",
+        "Carl,carl@example.com,,,",
+    ]
+    # The per-request file and its jobs export are removed once the response has been sent.
+    assert list((tmp_path / "user-1" / "outputs").iterdir()) == []
+
+
+@pytest.mark.anyio
+async def test_rows_kept_out_of_the_task_get_a_local_status(monkeypatch, tmp_path):
+    index_path = tmp_path / "classification.idx"
+    write_classification_index(index_path, ["mailinator.com"], [])
+    monkeypatch.setenv("EMAIL_CLASSIFICATION_INDEX_PATH", str(index_path))
+    monkeypatch.setenv("EMAIL_SYNTAX_PREFILTER", "true")
+    monkeypatch.setenv("EMAIL_SKIP_DISPOSABLE", "true")
+    source = SOURCE_CSV + b"Dave,dave@@example.com\nEve,eve@mailinator.com\n"
+    app = _build_app(FakeClient())
+    metadata = [{"file_name": "emails.csv", "email_column": "B", "first_row_has_labels": True}]
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            upload = await client.post(
+                "/api/tasks/upload",
+                files=[("files", ("emails.csv", source, "text/csv"))],
+                data={"file_metadata": json.dumps(metadata)},
+            )
+            download = await client.get(f"/api/tasks/{TASK_ID}/download?mode=enriched")
+    finally:
+        clear_classification_index()
+
+    assert upload.status_code == 200
+    uploaded = upload.json()[0]
+    assert (uploaded["rejected_count"], uploaded["skipped_disposable_count"]) == (1, 1)
+    assert download.text.splitlines()[3:] == [
+        "Carl,carl@example.com,,,",
+        "Dave,dave@@example.com,invalid_syntax,,",
+        "Eve,eve@mailinator.com,skipped_disposable,,",
+    ]
+
+
+@pytest.mark.anyio
+async def test_enriched_download_without_original_returns_404():
+    app = _build_app(FakeClient())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        missing = await client.get(f"/api/tasks/{TASK_ID}/download?mode=enriched")
+        invalid_mode = await client.get(f"/api/tasks/{TASK_ID}/download?mode=other")
+
+    assert missing.status_code == 404
+    assert invalid_mode.status_code == 400
@@ -8,15 +8,17 @@ from app.api import tasks as tasks_module
 from app.api.tasks import router
 from app.clients.external import BatchFileUploadResponse
 from app.core.auth import AuthContext
+from app.services import storage
 
 
 @pytest.fixture(autouse=True)
-def env(monkeypatch):
+def env(monkeypatch, tmp_path):
     monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
     monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
     monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
     monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
     monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setattr(storage, "_uploads_root", lambda: tmp_path)
 
 
 def _build_app(monkeypatch, fake_client):
@@ -63,7 +65,7 @@ async def test_upload_uses_email_count_for_usage(monkeypatch):
     async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
         resp = await client.post(
             "/api/tasks/upload",
-            files=[("files", ("emails.csv", b"email@example.com", "text/csv"))],
+            files=[("files", ("emails.csv", b"email\nfirst@example.com\nsecond@example.com\n", "text/csv"))],
             data=_upload_payload(),
         )
 
@@ -88,7 +90,7 @@ async def test_upload_missing_email_count_returns_502(monkeypatch):
     async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
         resp = await client.post(
             "/api/tasks/upload",
-            files=[("files", ("emails.csv", b"email@example.com", "text/csv"))],
+            files=[("files", ("emails.csv", b"email\nfirst@example.com\nsecond@example.com\n", "text/csv"))],
             data=_upload_payload(),
         )
 
@@ -115,9 +117,35 @@ async def test_upload_defaults_internal_webhook_url(monkeypatch):
     async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
         resp = await client.post(
             "/api/tasks/upload",
-            files=[("files", ("emails.csv", b"email@example.com", "text/csv"))],
+            files=[("files", ("emails.csv", b"email\nfirst@example.com\nsecond@example.com\n", "text/csv"))],
             data=_upload_payload(),
         )
 
     assert resp.status_code == 200
     assert captured["webhook_url"] == "http://test/api/tasks/webhooks/bulk-upload"
+
+
+@pytest.mark.anyio
+async def test_upload_sends_each_mailbox_upstream_once(monkeypatch):
+    monkeypatch.setenv("EMAIL_CANONICAL_DEDUP", "true")
+    captured = {}
+
+    class FakeClient:
+        async def upload_batch_file(self, filename, content, webhook_url=None, email_column=None):
+            captured["payload"] = content.read()
+            return BatchFileUploadResponse(status="ok", upload_id="u1", task_id="task-1", email_count=2)
+
+    source = b"email\nJohn.Doe+news@gmail.com\njohndoe@gmail.com\nsam@example.com\nSAM@example.com\n"
+    app = _build_app(monkeypatch, FakeClient())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post(
+            "/api/tasks/upload",
+            files=[("files", ("emails.csv", source, "text/csv"))],
+            data=_upload_payload(),
+        )
+
+    assert resp.status_code == 200
+    expected = b"email\r\nJohn.Doe+news@gmail.com\r\nsam@example.com\r\n"
+    assert captured["payload"] == expected
+    assert len(captured["payload"]) < len(source)
@@ -0,0 +1,139 @@
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import auth as auth_module
+from app.core import token_cache
+from app.core.auth import get_current_user
+from app.core.settings import get_settings
+from app.services import supabase_client as supabase_client_module
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+    original = auth_module._decode_supabase_jwt
+
+    def counting_decode(token, secret):
+        calls.append(token)
+        return original(token, secret)
+
+    monkeypatch.setattr(auth_module, "_decode_supabase_jwt", counting_decode)
+    return calls
+
+
+def _client():
+    app = FastAPI()
+
+    @app.get("/me")
+    def me(user=Depends(get_current_user)):
+        return {"user_id": user.user_id, "role": user.role}
+
+    return TestClient(app)
+
+
+def _token(expires_in=3600, secret="secret", **claims):
+    payload = {"sub": "user-123", "aud": "authenticated", "confirmed_at": "2024-01-01T00:00:00Z", **claims}
+    if expires_in is not None:
+        payload["exp"] = int(time.time()) + expires_in
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def test_repeated_requests_verify_the_token_once(decode_calls):
+    client = _client()
+    headers = {"Authorization": f"Bearer {_token(app_metadata={'role': 'admin'})}"}
+
+    responses = [client.get("/me", headers=headers) for _ in range(3)]
+
+    assert [resp.json() for resp in responses] == [{"user_id": "user-123", "role": "admin"}] * 3
+    assert len(decode_calls) == 1
+    assert token_cache.token_cache_stats() == {"hits": 2, "misses": 1, "size": 1}
+
+
+def test_confirmed_lookup_is_cached_but_unconfirmed_is_not(monkeypatch):
+    lookups = []
+    confirmed_at = [None]
+
+    def lookup_user(user_id):
+        lookups.append(user_id)
+        return SimpleNamespace(confirmed_at=confirmed_at[0], email_confirmed_at=None, email="user@test.com")
+
+    monkeypatch.setattr(supabase_client_module, "fetch_auth_user", lookup_user)
+    client = _client()
+    headers = {"Authorization": f"Bearer {_token(confirmed_at=None)}"}
+
+    assert client.get("/me", headers=headers).status_code == 403
+    confirmed_at[0] = "2024-01-01T00:00:00Z"
+    assert client.get("/me", headers=headers).status_code == 200
+    assert client.get("/me", headers=headers).status_code == 200
+
+    assert len(lookups) == 2
+
+
+def test_tokens_without_exp_or_near_expiry_are_not_cached(decode_calls):
+    client = _client()
+    for token in (_token(expires_in=None), _token(expires_in=10)):
+        client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        client.get("/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert len(decode_calls) == 4
+    assert token_cache.token_cache_stats()["size"] == 0
+
+
+def test_secret_rotation_and_disabled_cache_verify_again(monkeypatch, decode_calls):
+    client = _client()
+    headers = {"Authorization": f"Bearer {_token()}"}
+    client.get("/me", headers=headers)
+
+    monkeypatch.setattr(auth_module, "_fetch_jwks", lambda url: {"keys": []})
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "rotated")
+    get_settings.cache_clear()
+    assert client.get("/me", headers=headers).status_code == 401
+
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("AUTH_TOKEN_CACHE_SIZE", "0")
+    get_settings.cache_clear()
+    client.get("/me", headers=headers)
+    client.get("/me", headers=headers)
+
+    assert len(decode_calls) == 4
+
+
+def test_cached_claims_are_copied_for_each_caller():
+    claims = {"sub": "user-123", "exp": int(time.time()) + 3600, "app_metadata": {"role": "admin"}}
+    token_cache.store_verified_token(
+        "key", user_id="user-123", claims=claims, role_claim="admin", role_source="app_metadata", email_confirmed=True
+    )
+    claims["app_metadata"]["role"] = "user"
+
+    first = token_cache.get_verified_token("key")
+    first.claims["app_metadata"]["role"] = "owner"
+    first.email_confirmed = False
+
+    second = token_cache.get_verified_token("key")
+    assert second.claims["app_metadata"] == {"role": "admin"}
+    assert second.email_confirmed is True
+
+
+def test_stats_are_logged_periodically(monkeypatch, caplog):
+    monkeypatch.setattr(token_cache, "STATS_LOG_EVERY", 2)
+    caplog.set_level("INFO", logger=token_cache.__name__)
+
+    for _ in range(4):
+        token_cache.get_verified_token("missing")
+
+    records = [record for record in caplog.records if record.message == "auth.token_cache.stats"]
+    assert [(record.hits, record.misses, record.size) for record in records] == [(0, 2, 0), (0, 4, 0)]
@@ -0,0 +1,163 @@
+import json
+
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import tasks as tasks_module
+from app.api.tasks import router
+from app.clients.external import BatchFileUploadResponse
+from app.core.auth import AuthContext
+from app.core.settings import get_settings
+from app.services import storage, upload_dedup
+
+SOURCE_CSV = b"work_email,email\nalice@work.test,alice@example.com\nbob@work.test,bob@example.com\n"
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setattr(storage, "_uploads_root", lambda: tmp_path)
+
+
+class FakeClient:
+    def __init__(self, delay=0.0):
+        self.uploads = []
+        self.delay = delay
+
+    async def upload_batch_file(self, filename, content, webhook_url=None, email_column=None):
+        self.uploads.append((filename, email_column))
+        await anyio.sleep(self.delay)
+        number = len(self.uploads)
+        return BatchFileUploadResponse(
+            task_id=f"task-{number}", upload_id=f"upload-{number}", filename=filename, email_count=2
+        )
+
+
+def _build_app(client):
+    app = FastAPI()
+    app.include_router(router)
+
+    async def fake_user():
+        return AuthContext(user_id="user-1", claims={}, token="t", role="user")
+
+    app.dependency_overrides[tasks_module.get_current_user] = fake_user
+    app.dependency_overrides[tasks_module.get_user_external_client] = lambda: client
+    return app
+
+
+async def _upload(client, email_column="B", content=SOURCE_CSV, first_row_has_labels=True):
+    metadata = [
+        {
+            "file_name": "emails.csv",
+            "email_column": email_column,
+            "first_row_has_labels": first_row_has_labels,
+            "remove_duplicates": True,
+        }
+    ]
+    response = await client.post(
+        "/api/tasks/upload",
+        files=[("files", ("emails.csv", content, "text/csv"))],
+        data={"file_metadata": json.dumps(metadata)},
+    )
+    assert response.status_code == 200
+    return response.json()[0]
+
+
+@pytest.mark.anyio
+async def test_repeated_upload_returns_the_existing_task():
+    fake = FakeClient()
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await _upload(client)
+        repeated = await _upload(client)
+        other_column = await _upload(client, email_column="A")
+        other_content = await _upload(client, content=SOURCE_CSV + b"carl@work.test,carl@example.com\n")
+
+    assert repeated == first
+    assert (first["task_id"], first["upload_id"]) == ("task-1", "upload-1")
+    assert other_column["task_id"] == "task-2"
+    assert other_content["task_id"] == "task-3"
+    assert len(fake.uploads) == 3
+
+
+@pytest.mark.anyio
+async def test_uploads_parsed_differently_are_not_deduplicated(monkeypatch):
+    fake = FakeClient()
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await _upload(client)
+        without_labels = await _upload(client, first_row_has_labels=False)
+        monkeypatch.setenv("EMAIL_SKIP_DISPOSABLE", "true")
+        get_settings.cache_clear()
+        skipping_disposable = await _upload(client)
+        repeated = await _upload(client)
+
+    assert [first["task_id"], without_labels["task_id"], skipping_disposable["task_id"]] == [
+        "task-1",
+        "task-2",
+        "task-3",
+    ]
+    assert repeated == skipping_disposable
+    assert len(fake.uploads) == 3
+
+
+def test_fingerprint_covers_every_parse_option():
+    base = {"first_row_has_labels": True, "syntax_filter": True, "canonical_dedup": False, "run_length": 0}
+    fingerprint = upload_dedup.upload_fingerprint("user-1", "abc", "B", base)
+
+    assert upload_dedup.upload_fingerprint("user-1", "abc", "B", dict(reversed(base.items()))) == fingerprint
+    for key, value in base.items():
+        changed = {**base, key: not value if isinstance(value, bool) else 5}
+        assert upload_dedup.upload_fingerprint("user-1", "abc", "B", changed) != fingerprint
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_uploads_create_one_task():
+    fake = FakeClient(delay=0.05)
+    results = []
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def upload():
+            results.append(await _upload(client))
+
+        async with anyio.create_task_group() as group:
+            group.start_soon(upload)
+            group.start_soon(upload)
+
+    assert len(fake.uploads) == 1
+    assert results[0] == results[1]
+
+
+@pytest.mark.anyio
+async def test_dedup_window_zero_disables_the_index(monkeypatch):
+    monkeypatch.setenv("UPLOAD_DEDUP_WINDOW_SECONDS", "0")
+    fake = FakeClient()
+    transport = httpx.ASGITransport(app=_build_app(fake))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await _upload(client)
+        second = await _upload(client)
+
+    assert (first["task_id"], second["task_id"]) == ("task-1", "task-2")
+
+
+@pytest.mark.anyio
+async def test_recorded_uploads_expire_after_the_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(upload_dedup, "monotonic", lambda: now[0])
+    fingerprint = upload_dedup.upload_fingerprint("user-1", "abc", "B", {"first_row_has_labels": True})
+
+    assert await upload_dedup.claim_upload(fingerprint) is None
+    upload_dedup.record_upload(fingerprint, {"task_id": "task-1"}, 60)
+    upload_dedup.release_upload(fingerprint)
+    assert await upload_dedup.claim_upload(fingerprint) == {"task_id": "task-1"}
+
+    now[0] += 61
+    assert await upload_dedup.claim_upload(fingerprint) is None
+    upload_dedup.release_upload(fingerprint)
@@ -0,0 +1,182 @@
+import hashlib
+import hmac
+import json
+import sqlite3
+import time
+
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.api.tasks import router
+from app.services import webhook_inbox
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_API_BASE_URL", "https://api.test")
+    monkeypatch.setenv("SUPABASE_URL", "https://sb.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service_key")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "secret")
+    monkeypatch.setenv("SUPABASE_AUTH_COOKIE_NAME", "cookie_name")
+    monkeypatch.setenv("WEBHOOK_INBOX_PATH", str(tmp_path / "inbox.sqlite3"))
+    monkeypatch.setenv("WEBHOOK_INBOX_MAX_ATTEMPTS", "3")
+    monkeypatch.setenv("WEBHOOK_INBOX_POLL_SECONDS", "0.05")
+    webhook_inbox.clear_webhook_inbox_state()
+    yield
+    webhook_inbox.clear_webhook_inbox_state()
+
+
+def _event(task_id, marker=0):
+    payload = {"event_type": "email_verification_completed", "task_id": task_id, "data": {"marker": marker}}
+    return payload, json.dumps(payload).encode("utf-8")
+
+
+def _rows(tmp_path):
+    with sqlite3.connect(tmp_path / "inbox.sqlite3") as conn:
+        return conn.execute("SELECT task_id, status, attempts, last_error FROM webhook_inbox ORDER BY id").fetchall()
+
+
+@pytest.mark.anyio
+async def test_webhook_route_queues_verified_events_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("WEBHOOK_SECRET_KEY", "secret123")
+    payload, body = _event("task-1")
+    signature = "sha256=" + hmac.new(b"secret123", body, hashlib.sha256).hexdigest()
+    app = FastAPI()
+    app.include_router(router)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.post(
+            "/api/tasks/webhooks/bulk-upload", content=body, headers={"X-Webhook-Signature": signature}
+        )
+        repeated = await client.post(
+            "/api/tasks/webhooks/bulk-upload", content=body, headers={"X-Webhook-Signature": signature}
+        )
+        unsigned = await client.post("/api/tasks/webhooks/bulk-upload", content=_event("task-2")[1])
+
+    assert first.status_code == 202
+    assert first.json() == {"received": True, "queued": True, "event_id": 1}
+    assert repeated.status_code == 202
+    assert repeated.json() == {"received": True, "queued": False, "event_id": 1}
+    assert unsigned.status_code == 401
+    assert _rows(tmp_path) == [("task-1", "pending", 0, None)]
+
+
+@pytest.mark.anyio
+async def test_failed_events_are_retried_then_dead_lettered(tmp_path):
+    await webhook_inbox.enqueue_event(*_event("task-1"))
+    await webhook_inbox.enqueue_event(*_event("task-2"))
+
+    async def handler(payload):
+        if payload["task_id"] == "task-1":
+            raise HTTPException(status_code=503, detail="Unable to fetch task detail")
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    assert await webhook_inbox.process_next_event(handler) is True
+    assert await webhook_inbox.process_next_event(handler) is True
+    # The retry of task-1 is not due yet.
+    assert await webhook_inbox.process_next_event(handler) is False
+    assert _rows(tmp_path) == [
+        ("task-1", "pending", 1, "503: Unable to fetch task detail"),
+        ("task-2", "dead", 1, "401: Invalid webhook signature"),
+    ]
+
+    for _ in range(2):
+        event = webhook_inbox.claim_next_event(now=float("inf"))
+        webhook_inbox.fail_event(event, "still failing", retryable=True)
+    assert _rows(tmp_path)[0][:3] == ("task-1", "dead", 3)
+
+
+@pytest.mark.anyio
+async def test_events_of_one_task_are_handled_in_order(tmp_path):
+    await webhook_inbox.enqueue_event(*_event("task-1", 1))
+    await webhook_inbox.enqueue_event(*_event("task-1", 2))
+    await webhook_inbox.enqueue_event(*_event("task-2", 3))
+
+    first = webhook_inbox.claim_next_event()
+    second = webhook_inbox.claim_next_event()
+    assert (first.task_id, first.payload["data"]["marker"]) == ("task-1", 1)
+    assert (second.task_id, second.payload["data"]["marker"]) == ("task-2", 3)
+    assert webhook_inbox.claim_next_event() is None
+
+    webhook_inbox.complete_event(first.id)
+    assert webhook_inbox.claim_next_event().payload["data"]["marker"] == 2
+
+    # Both claims still hold a live lease, so a restarting process must not take them over.
+    assert webhook_inbox.recover_interrupted_events() == 0
+    assert webhook_inbox.recover_interrupted_events(now=time.time() + 3600) == 2
+    assert [row[1] for row in _rows(tmp_path)] == ["done", "pending", "pending"]
+
+
+@pytest.mark.anyio
+async def test_workers_drain_the_inbox(tmp_path):
+    handled = []
+
+    async def handler(payload):
+        handled.append(payload["task_id"])
+        return {"received": True, "processed": True}
+
+    async with webhook_inbox.run_webhook_inbox(handler):
+        await webhook_inbox.enqueue_event(*_event("task-1"))
+        await webhook_inbox.enqueue_event(*_event("task-2"))
+        with anyio.fail_after(5):
+            while len(handled) < 2:
+                await anyio.sleep(0.01)
+
+    assert sorted(handled) == ["task-1", "task-2"]
+    assert [row[1] for row in _rows(tmp_path)] == ["done", "done"]
+
+
+@pytest.mark.anyio
+async def test_lease_is_renewed_while_the_handler_runs(monkeypatch, tmp_path):
+    monkeypatch.setenv("WEBHOOK_INBOX_LEASE_SECONDS", "0.06")
+    await webhook_inbox.enqueue_event(*_event("task-1"))
+    leases = []
+
+    async def handler(payload):
+        for _ in range(3):
+            await anyio.sleep(0.05)
+            with sqlite3.connect(tmp_path / "inbox.sqlite3") as conn:
+                leases.append(conn.execute("SELECT lease_expires_at FROM webhook_inbox").fetchone()[0])
+        return {"processed": True}
+
+    assert await webhook_inbox.process_next_event(handler) is True
+    assert leases == sorted(leases) and leases[0] < leases[-1]
+    assert _rows(tmp_path) == [("task-1", "done", 1, None)]
+
+
+@pytest.mark.anyio
+async def test_expired_leases_are_claimed_again_while_running(tmp_path):
+    await webhook_inbox.enqueue_event(*_event("task-1", 1))
+    await webhook_inbox.enqueue_event(*_event("task-1", 2))
+    now = time.time()
+
+    stalled = webhook_inbox.claim_next_event(now=now)
+    assert webhook_inbox.claim_next_event(now=now) is None
+
+    reclaimed = webhook_inbox.claim_next_event(now=now + 3600)
+    assert (reclaimed.id, reclaimed.attempts) == (stalled.id, 2)
+    # The stalled worker finally gives up; its stale claim must not reset the new one.
+    webhook_inbox.fail_event(stalled, "timed out", retryable=True)
+    assert _rows(tmp_path)[0][:3] == ("task-1", "processing", 2)
+
+    webhook_inbox.complete_event(reclaimed.id)
+    assert webhook_inbox.claim_next_event(now=now + 3600).payload["data"]["marker"] == 2
+
+
+def test_existing_inboxes_gain_the_lease_column(tmp_path):
+    with sqlite3.connect(tmp_path / "inbox.sqlite3") as conn:
+        conn.execute(
+            "CREATE TABLE webhook_inbox (id INTEGER PRIMARY KEY AUTOINCREMENT, event_key TEXT NOT NULL UNIQUE,"
+            " task_id TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " received_at REAL NOT NULL, next_attempt_at REAL NOT NULL, finished_at REAL, last_error TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO webhook_inbox (event_key, task_id, payload, status, received_at, next_attempt_at)"
+            " VALUES ('k', 'task-1', '{}', 'processing', 0, 0)"
+        )
+
+    assert webhook_inbox.recover_interrupted_events() == 1
+    assert _rows(tmp_path) == [("task-1", "pending", 0, None)]